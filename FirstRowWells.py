@@ -3,46 +3,59 @@ import math
 import geopandas as gpd
 import numpy as np
 import pandas as pd
+from scipy.spatial import Delaunay
 from tqdm import tqdm
 
+from distance_store import distance_store, get_neighbours
+from geometry import candidate_pairs, segment_distance, well_segments
 
-def check_well_intersection(df_intersectionWells, MaxOverlapPercent):
+
+def descending_order(values):
+    """
+    Порядок сортировки по убыванию, совпадающий с DataFrame.sort_values(ascending=False) (в том числе
+    для равных значений)
+    :param values: массив значений
+    :return: массив индексов
+    """
+    return np.arange(len(values))[::-1][values[::-1].argsort(kind='quicksort')][::-1]
+
+
+def check_well_intersection(names, fi_t1_grad, fi_t3_grad, r_center, MaxOverlapPercent):
     """
     Проверка пересечений между скважинами в исходном массиве, для исключения перекрываемых скважин второго ряда
-    :param df_intersectionWells: массив скважин с исходными данными
+    :param names: имена скважин
+    :param fi_t1_grad: угол точки T1 скважин, град
+    :param fi_t3_grad: угол точки T3 скважин, град
+    :param r_center: расстояние до центра сектора скважин
     :param MaxOverlapPercent: максимальный процент от общей длины ствола скважины, который может быть скрыт при
                              пересечении, чтобы скважина осталась в первом ряду
     :return: список скважин за первым рядом, которые требуется удалить
     """
     list_dropWell = []
-    # df_intersectionWells = df_intersectionWells.sort_values(by=['distance'], ascending=False)
-    df_intersectionWells = df_intersectionWells.sort_values(by=['r_center'], ascending=False)
-
-    for i in range(df_intersectionWells.shape[0] - 1):
-        well_name = df_intersectionWells.index[i]
-
-        remoteFi_Max = max(
-            df_intersectionWells.iloc[i][["fi_t1_grad", "fi_t3_grad"]])  # максимальный угол дальней скважины
-        remoteFi_Min = min(
-            df_intersectionWells.iloc[i][["fi_t1_grad", "fi_t3_grad"]])  # минимальный угол дальней скважины
-        nearFi_Max = df_intersectionWells.iloc[i + 1:][
-            ["fi_t1_grad", "fi_t3_grad"]].values.max()  # максимальный угол ближней скважины
-        nearFi_Min = df_intersectionWells.iloc[i + 1:][
-            ["fi_t1_grad", "fi_t3_grad"]].values.min()  # минимальный угол ближней скважины
-
-        df_pilot = pd.DataFrame({"fi": pd.Series([remoteFi_Max, remoteFi_Min, nearFi_Max, nearFi_Min]),
-                                 "marker": pd.Series([2, 2, 1, 1])})
-        df_pilot = df_pilot.sort_values(by=["fi"], ascending=False)
-
-        position_code = df_pilot["marker"].to_string(index=False).replace("\n", "")
+    order = descending_order(r_center)
+    names, fi_t1_grad, fi_t3_grad = names[order], fi_t1_grad[order], fi_t3_grad[order]
+    fi_max = np.maximum(fi_t1_grad, fi_t3_grad)
+    fi_min = np.minimum(fi_t1_grad, fi_t3_grad)
+    # максимальный и минимальный угол ближних скважин (всех следующих за текущей)
+    near_max = np.maximum.accumulate(fi_max[::-1])[::-1]
+    near_min = np.minimum.accumulate(fi_min[::-1])[::-1]
+    marker = np.array([2, 2, 1, 1])
+
+    for i in range(len(names) - 1):
+        remoteFi_Max = fi_max[i]  # максимальный угол дальней скважины
+        remoteFi_Min = fi_min[i]  # минимальный угол дальней скважины
+        fi = np.array([remoteFi_Max, remoteFi_Min, near_max[i + 1], near_min[i + 1]])
+        order = descending_order(fi)
+
+        position_code = "".join(map(str, marker[order]))
         if position_code == "1221":
-            list_dropWell.append(well_name)
+            list_dropWell.append(names[i])
         elif position_code == "1122" or position_code == "2211":
             continue
         else:
-            OverlapPercent = (df_pilot["fi"].values[1] - df_pilot["fi"].values[2]) / (remoteFi_Max - remoteFi_Min) * 100
+            OverlapPercent = (fi[order[1]] - fi[order[2]]) / (remoteFi_Max - remoteFi_Min) * 100
             if OverlapPercent > MaxOverlapPercent:
-                list_dropWell.append(well_name)
+                list_dropWell.append(names[i])
     return list_dropWell
 
 
@@ -192,19 +205,21 @@ def first_row_of_well_geometry(df_WellOneArea, wellNumberInj,
 
         df_OnePoint = df_OnePoint.sort_values(by=['r_center'], ascending=False)
         # check well intersection
-        listNamesOnePointWells = list(df_OnePoint.index)
-        listNamesClean = listNamesOnePointWells
-        for well in listNamesOnePointWells:
-            if well in listNamesClean:
-                fi_min = min(df_OnePoint.loc[well]["fi_t1_grad"], df_OnePoint.loc[well]["fi_t3_grad"])
-                fi_max = max(df_OnePoint.loc[well]["fi_t1_grad"], df_OnePoint.loc[well]["fi_t3_grad"])
-                df_intersectionWells = df_OnePoint.loc[((df_OnePoint["fi_t1_grad"] <= fi_max) &
-                                                        (df_OnePoint["fi_t1_grad"] >= fi_min)) |
-                                                       ((df_OnePoint["fi_t3_grad"] <= fi_max) &
-                                                        (df_OnePoint["fi_t3_grad"] >= fi_min))]
-                if df_intersectionWells.shape[0] != 1:
-                    list_dropWell = check_well_intersection(df_intersectionWells, MaxOverlapPercent)
-                    listNamesClean = list(set(listNamesClean) - set(list_dropWell))
+        names = df_OnePoint.index.values
+        fi_t1_grad, fi_t3_grad = df_OnePoint["fi_t1_grad"].values, df_OnePoint["fi_t3_grad"].values
+        r_center = df_OnePoint["r_center"].values
+        setNamesClean = set(names)
+        for position, well in enumerate(names):
+            if well in setNamesClean:
+                fi_min = min(fi_t1_grad[position], fi_t3_grad[position])
+                fi_max = max(fi_t1_grad[position], fi_t3_grad[position])
+                mask = (((fi_t1_grad <= fi_max) & (fi_t1_grad >= fi_min)) |
+                        ((fi_t3_grad <= fi_max) & (fi_t3_grad >= fi_min)))
+                if mask.sum() != 1:
+                    list_dropWell = check_well_intersection(names[mask], fi_t1_grad[mask], fi_t3_grad[mask],
+                                                            r_center[mask], MaxOverlapPercent)
+                    setNamesClean -= set(list_dropWell)
+        listNamesClean = list(setNamesClean)
 
         '''# график после очистки
         df_OnePoint = df_OnePoint[df_OnePoint.index.isin(listNamesClean)]
@@ -225,7 +240,23 @@ def first_row_of_well_geometry(df_WellOneArea, wellNumberInj,
 
 
 def mean_radius(df_in_contour, verticalWellAngle, MaxOverlapPercent,
-                angle_horizontalT1, angle_horizontalT3, max_distance):
+                angle_horizontalT1, angle_horizontalT3, max_distance, first_row_method='angular', store=None,
+                first_row_cache=None):
+    """
+    Расчет среднего радиуса по объекту через среднее и минимальное расстояние до скважин первого ряда
+    :param df_in_contour: DataFrame скважин объекта
+    :param verticalWellAngle: угол для обозначения зоны вертикальных скважин на карте
+    :param MaxOverlapPercent: максимальный процент перекрытия от общей длины ствола скважины
+    :param angle_horizontalT1: угол расширения сектора для точки Т1 горизонтальной скважины
+    :param angle_horizontalT3: угол расширения сектора для точки Т3 горизонтальной скважины
+    :param max_distance: максимальное расстояние до скважин первого ряда
+    :param first_row_method: способ выделения первого ряда: angular - по секторам в полярной системе координат,
+    delaunay - естественные соседи по триангуляции Делоне (compare считается как angular)
+    :param store: хранилище расстояний объекта (distance_store), если None - строится по df_in_contour
+    :param first_row_cache: кэш первого ряда по секторам из графа соседей месторождения (neighbour_graph)
+    :return: средний радиус по объекту, DataFrame скважин со столбцом min_dist и DataFrame пар первого ряда
+    ['well', 'neighbour', 'distance']
+    """
     df_in_contour.set_index("wellName", inplace=True, drop=False)
     df_in_contour.insert(loc=df_in_contour.shape[1], column="distance", value=0)
     df_in_contour.insert(loc=df_in_contour.shape[1], column="mean_dist", value=0)
@@ -233,29 +264,195 @@ def mean_radius(df_in_contour, verticalWellAngle, MaxOverlapPercent,
     df_in_contour["min_dist"] = np.nan
     # df_in_contour["distance"], df_in_contour["mean_dist"], df_in_contour["min_dist"] = 0, 0, 0
     df_in_contour = gpd.GeoDataFrame(df_in_contour, geometry="GEOMETRY")
-    wells = df_in_contour.wellName.unique()
-    for well in tqdm(wells, "Calculation research radius", position=0, leave=True, colour='white'):
-        # Обновляем столбец distance
-        df_in_contour["distance"] = list(map(lambda x: df_in_contour.loc[well, "GEOMETRY"].distance(x),
-                                             df_in_contour.GEOMETRY))
-
-        # с помощью вызова другой функции получаем скажины окружения первого ряда
-        first_row_list = first_row_of_well_geometry(df_in_contour[df_in_contour['distance'] <= max_distance],
-                                                    well,
-                                                    verticalWellAngle, MaxOverlapPercent,
-                                                    angle_horizontalT1, angle_horizontalT3)
-        # в новом DataFrame оставляем скважины первого окружения
-        df_first_row = df_in_contour[df_in_contour["wellName"].isin(first_row_list)]
-        # считаем среднее значение по столбцу distance
-        if df_first_row["distance"].min() is not np.nan:
-            df_in_contour.loc[well, 'mean_dist'] = df_first_row["distance"].mean()  # среднее расстояние первого ряда
-            df_in_contour.loc[well, 'min_dist'] = df_first_row["distance"].min()  # расстояние до ближайшей скважины
-        else:
-            df_in_contour.loc[well, 'mean_dist'] = max_distance
-            df_in_contour.loc[well, 'min_dist'] = max_distance
+    if first_row_method == 'delaunay':
+        df_first_row = first_row_delaunay(df_in_contour, max_distance)
+    else:
+        df_first_row = first_row_angular(df_in_contour, verticalWellAngle, MaxOverlapPercent,
+                                         angle_horizontalT1, angle_horizontalT3, max_distance, store,
+                                         first_row_cache)
+    # среднее расстояние первого ряда и расстояние до ближайшей скважины, при отсутствии первого ряда - max_distance
+    df_distance = df_first_row.groupby('well')['distance'].agg(['mean', 'min']).reindex(df_in_contour.index)
+    df_in_contour['mean_dist'] = df_distance['mean'].fillna(max_distance).values
+    df_in_contour['min_dist'] = df_distance['min'].fillna(max_distance).values
     # среднее среднего от расстояния (или среднее расстояние между скважинами на объект)
     mean_rad = df_in_contour["mean_dist"].mean()
     df_in_contour.drop(columns=['distance', 'mean_dist'], inplace=True)
     df_in_contour = df_in_contour.reset_index(drop=True)
 
-    return mean_rad, df_in_contour
+    return mean_rad, df_in_contour, df_first_row
+
+
+def first_row_angular(df_in_contour, verticalWellAngle, MaxOverlapPercent,
+                      angle_horizontalT1, angle_horizontalT3, max_distance, store=None, first_row_cache=None):
+    """
+    Скважины первого ряда по секторам в полярной системе координат (first_row_of_well_geometry) для каждой скважины.
+    Скважины окружения в пределах max_distance берутся из хранилища расстояний, без расчета расстояний
+    до всех скважин. Первый ряд скважины зависит только от ее окружения, поэтому при заданном кэше
+    повторно не считается для пересекающихся контуров и других объектов с тем же окружением
+    :param df_in_contour: GeoDataFrame скважин объекта с индексом по wellName
+    :param store: хранилище расстояний объекта (distance_store), если None - строится по df_in_contour
+    :param first_row_cache: словарь {(скважина, скважины окружения): скважины первого ряда}, если None - не
+    используется
+    :return: DataFrame пар ['well', 'neighbour', 'distance']
+    """
+    if store is None:
+        store = distance_store(df_in_contour, max_distance)
+    if first_row_cache is None:
+        first_row_cache = {}
+    # для расчета по секторам достаточно типа и координат скважин, без геометрий
+    df_wells = pd.DataFrame(df_in_contour[["wellName", "well type", "coordinateX", "coordinateY",
+                                           "coordinateX3", "coordinateY3"]])
+
+    dict_first_row = {'well': [], 'neighbour': [], 'distance': []}
+    wells = df_in_contour.wellName.values
+    for position, well in enumerate(tqdm(wells, "Calculation research radius", position=0, leave=True,
+                                         colour='white')):
+        indices, distance = get_neighbours(store, position)
+        # скважины окружения с расстоянием до текущей (сама скважина с нулевым расстоянием) в порядке строк
+        mask = distance <= max_distance
+        position_area = np.concatenate([[position], indices[mask]])
+        distance = np.concatenate([[0], distance[mask]])
+        order = np.argsort(position_area)
+        position_area, distance = position_area[order], distance[order]
+        key = (well, tuple(wells[position_area]))
+        if key not in first_row_cache:
+            df_area = df_wells.iloc[position_area].copy()
+            df_area["distance"] = distance
+            # с помощью вызова другой функции получаем скажины окружения первого ряда
+            first_row_cache[key] = first_row_of_well_geometry(df_area, well,
+                                                              verticalWellAngle, MaxOverlapPercent,
+                                                              angle_horizontalT1, angle_horizontalT3)
+        # оставляем скважины первого окружения
+        mask = np.isin(wells[position_area], first_row_cache[key])
+        dict_first_row['well'] += [well] * mask.sum()
+        dict_first_row['neighbour'] += list(wells[position_area][mask])
+        dict_first_row['distance'] += list(distance[mask])
+    return pd.DataFrame(dict_first_row)
+
+
+def neighbour_graph(df_wells, max_distance):
+    """
+    Граф соседей по месторождению: пары скважин с общим объектом работы и расстоянием между стволами
+    не больше max_distance. Строится один раз после подготовки данных, расчеты по контурам и объектам
+    используют его подграф (get_neighbour_subgraph) и кэш первого ряда
+    :param df_wells: DataFrame скважин месторождения
+    :param max_distance: максимальное расстояние до скважин первого ряда
+    :return: словарь графа: edges - DataFrame ребер в обе стороны ['well', 'neighbour', 'distance'],
+    horizons - DataFrame общих объектов работы ребер ['edge', 'horizon'] (строка на ребро и объект),
+    first_row - кэш первого ряда по секторам (first_row_angular)
+    """
+    names = df_wells.wellName.values
+    x1, y1, x3, y3 = well_segments(df_wells)
+    # объекты работы скважин: строка на скважину и объект
+    s_horizons = df_wells.workHorizon.str.replace(" ", "").str.split(",").explode()
+    well_codes, horizon_names = pd.factorize(s_horizons.values)
+    well_horizon = np.unique(np.repeat(np.arange(len(names)), df_wells.workHorizon.str.split(",").str.len())
+                             * len(horizon_names) + well_codes)
+    if len(names) > 1:
+        pairs = candidate_pairs(x1, y1, x3, y3, max_distance)
+    else:
+        pairs = np.empty((0, 2), dtype=int)
+    distance = segment_distance(x1[pairs[:, 0]], y1[pairs[:, 0]], x3[pairs[:, 0]], y3[pairs[:, 0]],
+                                x1[pairs[:, 1]], y1[pairs[:, 1]], x3[pairs[:, 1]], y3[pairs[:, 1]])
+    pairs, distance = pairs[distance <= max_distance], distance[distance <= max_distance]
+
+    # общие объекты пары: объекты первой скважины, которые есть у второй
+    well_of_key, code_of_key = well_horizon // len(horizon_names), well_horizon % len(horizon_names)
+    start = np.searchsorted(well_of_key, pairs[:, 0])
+    count = np.searchsorted(well_of_key, pairs[:, 0], side='right') - start
+    pair_index = np.repeat(np.arange(len(pairs)), count)
+    codes = code_of_key[np.repeat(start, count) + np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)]
+    common = np.isin(pairs[pair_index, 1] * len(horizon_names) + codes, well_horizon)
+    pair_index, codes = pair_index[common], codes[common]
+    # пары без общего объекта исключаются, индексы пар пересчитываются
+    keep = np.bincount(pair_index, minlength=len(pairs)) > 0
+    pair_index = (np.cumsum(keep) - 1)[pair_index]
+    pairs, distance = pairs[keep], distance[keep]
+
+    edges = pd.DataFrame({'well': names[np.concatenate([pairs[:, 0], pairs[:, 1]])],
+                          'neighbour': names[np.concatenate([pairs[:, 1], pairs[:, 0]])],
+                          'distance': np.concatenate([distance, distance])})
+    horizons = pd.DataFrame({'edge': np.concatenate([pair_index, pair_index + len(pairs)]),
+                             'horizon': np.asarray(horizon_names, dtype=object)[np.concatenate([codes, codes])]})
+    return {'edges': edges, 'horizons': horizons, 'first_row': {}}
+
+
+def get_neighbour_subgraph(graph, well_names, horizon=None):
+    """
+    Индуцированный подграф соседей для набора скважин (контур/объект)
+    :param graph: граф соседей месторождения (neighbour_graph)
+    :param well_names: имена скважин подграфа
+    :param horizon: объект работы, общий для пары скважин (если None - не проверяется)
+    :return: DataFrame ребер подграфа
+    """
+    df_edges = graph['edges']
+    mask = df_edges['well'].isin(well_names).values & df_edges['neighbour'].isin(well_names).values
+    if horizon is not None:
+        mask_horizon = np.zeros(len(df_edges), dtype=bool)
+        mask_horizon[graph['horizons']['edge'].values[graph['horizons']['horizon'].values == horizon]] = True
+        mask &= mask_horizon
+    return df_edges[mask]
+
+
+def first_row_delaunay(df_in_contour, max_distance):
+    """
+    Скважины первого ряда как естественные соседи по триангуляции Делоне точек скважин: вертикальная скважина
+    представлена точкой T1, горизонтальная - точками T1, середины ствола и T3. Соседями считаются скважины,
+    точки которых соединены ребром триангуляции, при расстоянии между стволами не больше max_distance
+    :param df_in_contour: DataFrame скважин объекта
+    :param max_distance: максимальное расстояние до скважин первого ряда
+    :return: DataFrame пар ['well', 'neighbour', 'distance']
+    """
+    names = df_in_contour.wellName.values
+    x1, y1, x3, y3 = well_segments(df_in_contour)
+    horizontal = np.flatnonzero((df_in_contour["well type"] == "horizontal").values)
+    owner = np.concatenate([np.arange(len(names)), horizontal, horizontal])
+    points = np.column_stack([np.concatenate([x1, (x1[horizontal] + x3[horizontal]) / 2, x3[horizontal]]),
+                              np.concatenate([y1, (y1[horizontal] + y3[horizontal]) / 2, y3[horizontal]])])
+
+    if len(names) < 2:
+        edges = np.empty((0, 2), dtype=int)
+    elif points.shape[0] < 3:
+        edges = np.array([[0, 1]])
+    else:
+        # QJ - все точки, в том числе совпадающие и лежащие на одной прямой, становятся вершинами триангуляции
+        simplices = Delaunay(points, qhull_options='QJ').simplices
+        edges = np.concatenate([simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [0, 2]]])
+    pairs = owner[edges]
+    pairs = np.unique(np.sort(pairs[pairs[:, 0] != pairs[:, 1]], axis=1), axis=0)
+    well = np.concatenate([pairs[:, 0], pairs[:, 1]])
+    neighbour = np.concatenate([pairs[:, 1], pairs[:, 0]])
+
+    distance = segment_distance(x1[well], y1[well], x3[well], y3[well],
+                                x1[neighbour], y1[neighbour], x3[neighbour], y3[neighbour])
+    mask = distance <= max_distance
+    return pd.DataFrame({'well': names[well[mask]], 'neighbour': names[neighbour[mask]], 'distance': distance[mask]})
+
+
+def compare_first_row(df_in_contour, df_angular, max_distance):
+    """
+    Сравнение первого ряда скважин, выделенного по секторам (angular) и по триангуляции Делоне (delaunay).
+    Первый ряд по секторам берется из расчета среднего радиуса (mean_radius), повторно не считается
+    :param df_in_contour: DataFrame скважин объекта
+    :param df_angular: DataFrame пар первого ряда по секторам ['well', 'neighbour', 'distance']
+    :param max_distance: максимальное расстояние до скважин первого ряда
+    :return: DataFrame по скважинам с размером первого ряда, совпадением и средним/минимальным расстоянием
+    для каждого способа
+    """
+    df_wells = gpd.GeoDataFrame(df_in_contour.set_index("wellName", drop=False), geometry="GEOMETRY")
+    df_wells["distance"] = 0
+    dict_methods = {'angular': df_angular, 'delaunay': first_row_delaunay(df_wells, max_distance)}
+    df_compare = pd.DataFrame({'wellName': df_wells.wellName.values}, index=df_wells.index)
+    dict_neighbours = {}
+    for method, df_first_row in dict_methods.items():
+        dict_neighbours[method] = df_first_row.groupby('well')['neighbour'].agg(set).reindex(df_wells.index).apply(
+            lambda x: x if isinstance(x, set) else set())
+        df_distance = df_first_row.groupby('well')['distance'].agg(['mean', 'min']).reindex(df_wells.index)
+        df_compare[f'count_{method}'] = dict_neighbours[method].apply(len)
+        df_compare[f'mean_dist_{method}'] = df_distance['mean'].fillna(max_distance)
+        df_compare[f'min_dist_{method}'] = df_distance['min'].fillna(max_distance)
+    df_compare['count_common'] = list(map(lambda x, y: len(x & y), dict_neighbours['angular'],
+                                          dict_neighbours['delaunay']))
+    df_compare['jaccard'] = list(map(lambda x, y: len(x & y) / len(x | y) if len(x | y) else 1,
+                                     dict_neighbours['angular'], dict_neighbours['delaunay']))
+    return df_compare.reset_index(drop=True)
@@ -0,0 +1,165 @@
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+import warnings
+
+import matplotlib
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+import calculation_wells
+import main
+from map_render import map_figure, save_figure
+from synthetic_field import synthetic_field
+
+warnings.filterwarnings('ignore')
+pd.options.mode.chained_assignment = None  # default='warn'
+
+# этапы расчета и выгрузки, время которых суммируется по всем вызовам: модуль, функция. Функции заменяются
+# в модуле, из которого их вызывает main.func_main (этапы func_main) или calculation_wells.calculation
+BENCHMARK_STAGES = [(main, 'upload_input_data'), (main, 'upload_gdis_data'), (main, 'neighbour_graph'),
+                    (main, 'preparing_reservoir_properties'), (main, 'check_intersection_area'),
+                    (main, 'calculation'), (calculation_wells, 'mean_radius'),
+                    (calculation_wells, 'critical_coefficients'), (calculation_wells, 'calc_contour'),
+                    (calculation_wells, 'calc_regular_mesh'), (calculation_wells, 'calc_mesh_by_holes'),
+                    (main, 'save_run'), (main, 'write_results'), (main, 'write_to_excel'),
+                    (main, 'write_cluster_mesh'), (main, 'visualization'), (main, 'mesh_visualization'),
+                    (main, 'html_maps'), (main, 'export_results')]
+# способы поиска первого ряда, которые замеряются (first_row_method)
+BENCHMARK_METHODS = ['angular', 'delaunay']
+# способ angular ищет первый ряд по каждой скважине отдельно и растет быстрее кол-ва скважин, поэтому
+# замеряется только на месторождениях до этого кол-ва скважин
+ANGULAR_MAX_WELLS = 2000
+
+
+def run_benchmark(path, list_wells, scenario='optimize', methods=None, angular_max_wells=ANGULAR_MAX_WELLS,
+                  **field_parameters):
+    """
+    Замеры времени этапов расчета на синтетических месторождениях разного размера: для каждого кол-ва скважин
+    и способа поиска первого ряда создается месторождение (synthetic_field) и выполняется расчет main.func_main.
+    Результаты записываются в path: benchmark_<сценарий>.csv (время этапов) и benchmark_<сценарий>.png
+    (время этапов от кол-ва скважин)
+    :param path: папка для месторождений и результатов
+    :param list_wells: список кол-ва скважин
+    :param scenario: сценарий расчета (calculation_scenario)
+    :param methods: способы поиска первого ряда (first_row_method), если None - BENCHMARK_METHODS
+    :param angular_max_wells: максимальное кол-во скважин для способа angular
+    :param field_parameters: параметры synthetic_field и параметры расчета
+    :return: DataFrame времени этапов: wells, scenario, method, stage, seconds, calls
+    """
+    os.makedirs(path, exist_ok=True)
+    list_times = []
+    for method in methods or BENCHMARK_METHODS:
+        for wells in list_wells:
+            if method == 'angular' and wells > angular_max_wells:
+                logger.info(f'Skip {wells} wells for {method}: more than {angular_max_wells} wells')
+                continue
+            path_field = os.path.abspath(os.path.join(path, f'{scenario}_{method}_{wells}'))
+            logger.info(f'Synthetic field: {wells} wells, scenario {scenario}, first row {method}')
+            path_parameters = synthetic_field(path_field, wells, calculation_scenario=scenario,
+                                              first_row_method=method, **field_parameters)
+            dict_times = benchmark_pipeline(path_field, path_parameters)
+            for stage, (seconds, calls) in dict_times.items():
+                logger.info(f'{wells} wells, {method}, {stage}: {seconds:.2f} s ({calls} calls)')
+                list_times.append({'wells': wells, 'scenario': scenario, 'method': method, 'stage': stage,
+                                   'seconds': round(seconds, 3), 'calls': calls})
+
+    df_times = pd.DataFrame(list_times)
+    df_times.to_csv(os.path.join(path, f'benchmark_{scenario}.csv'), sep=';', index=False, encoding='utf-8')
+    scaling_curves(df_times, os.path.join(path, f'benchmark_{scenario}.png'))
+    return df_times
+
+
+def benchmark_pipeline(path_field, path_parameters):
+    """
+    Расчет синтетического месторождения main.func_main с замером времени этапов: функции из BENCHMARK_STAGES
+    на время расчета заменяются функциями с замером времени.
+    Результаты расчета записываются в папку output месторождения (перед расчетом очищается)
+    :param path_field: папка месторождения
+    :param path_parameters: путь к файлу параметров
+    :return: словарь {этап: [время, с; кол-во вызовов]}
+    """
+    dict_times = {}
+    list_replaced = [(module, name, getattr(module, name)) for module, name in BENCHMARK_STAGES]
+    for module, name, function in list_replaced:
+        setattr(module, name, timed_function(function, name, dict_times))
+    path_cwd = os.getcwd()
+    shutil.rmtree(os.path.join(path_field, 'output'), ignore_errors=True)
+    os.makedirs(os.path.join(path_field, 'output'))
+    os.chdir(path_field)
+    start = time.perf_counter()
+    try:
+        main.func_main(path_parameters, path_field)
+    finally:
+        os.chdir(path_cwd)
+        for module, name, function in list_replaced:
+            setattr(module, name, function)
+    dict_times['total'] = [time.perf_counter() - start, 1]
+    return dict_times
+
+
+def timed_function(function, stage, dict_times):
+    """
+    Функция с замером времени: время всех вызовов суммируется в dict_times по названию этапа
+    :param function: функция
+    :param stage: название этапа
+    :param dict_times: словарь {этап: [время, с; кол-во вызовов]}
+    :return: функция с теми же параметрами и результатом
+    """
+
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            times = dict_times.setdefault(stage, [0., 0])
+            times[0] += time.perf_counter() - start
+            times[1] += 1
+
+    return timed
+
+
+def scaling_curves(df_times, path):
+    """
+    График масштабирования: время этапов от кол-ва скважин в логарифмическом масштабе
+    :param df_times: DataFrame времени этапов (run_benchmark)
+    :param path: путь к картинке
+    :return: None
+    """
+    figure, ax = map_figure(figsize=(12, 8))
+    colors = matplotlib.colormaps['tab20']
+    # цвет линии - этап, тип линии - способ поиска первого ряда
+    stages = list(df_times['stage'].unique())
+    line_styles = dict(zip(df_times['method'].unique(), ['-', '--', ':', '-.']))
+    for (method, stage), df_stage in df_times.groupby(['method', 'stage'], sort=False):
+        df_stage = df_stage.sort_values('wells')
+        ax.plot(df_stage['wells'], np.maximum(df_stage['seconds'], 1e-3), marker='o',
+                color=colors(stages.index(stage) % 20), ls=line_styles[method], lw=3 if stage == 'total' else 1.5,
+                label=f'{stage}, {method}')
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_xlabel('Кол-во скважин')
+    ax.set_ylabel('Время, с')
+    ax.grid(True, which='both', alpha=0.3)
+    ax.legend(loc='upper left', fontsize=8)
+    ax.set_title(f'Время этапов расчета, сценарий {", ".join(df_times["scenario"].unique())}')
+    save_figure(figure, path, dpi=100)
+    pass
+
+
+if __name__ == '__main__':
+    # процессы построения карт запускаются и из собранного .exe
+    multiprocessing.freeze_support()
+    # Замеры: python benchmark.py [папка] [кол-во скважин через запятую] [сценарий] [способы первого ряда]
+    path_benchmark = sys.argv[1] if len(sys.argv) > 1 else 'benchmark'
+    wells_list = [int(x) for x in sys.argv[2].split(',')] if len(sys.argv) > 2 else [1000, 10000, 50000]
+    calculation_scenario = sys.argv[3] if len(sys.argv) > 3 else 'optimize'
+    methods_list = sys.argv[4].split(',') if len(sys.argv) > 4 else None
+
+    # в консоль выводятся только сообщения замеров
+    logger.remove()
+    logger.add(sys.stderr, level='INFO', format="{message}", filter=__name__)
+    print(run_benchmark(path_benchmark, wells_list, calculation_scenario, methods_list).to_string(index=False))
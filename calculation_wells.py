@@ -1,16 +1,26 @@
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 from loguru import logger
 from shapely.ops import unary_union
 from tqdm import tqdm
 
-from FirstRowWells import mean_radius
-from functions import get_time_coef, get_property, dict_keys
-from geometry import intersect_number, optimization, check_intersection_area, add_shapely_types
+from FirstRowWells import compare_first_row, get_neighbour_subgraph, mean_radius
+from coverage_engine import critical_coefficients, get_covered_wells, greedy_selection, \
+    intersect_number_by_coverage
+from distance_store import distance_store, get_distances
+from functions import get_property, dict_keys
+from geometry import intersect_number, optimization, check_intersection_area, add_shapely_types, \
+    buffered_hull_area
+from raster_coverage import coverage_area, covered_area
+from regular_mesh_by_holes import calc_mesh_by_holes
+from research_metrics import fond_percentages, research_metrics, time_coef_table
+from result_builder import add_result, build_result, result_builder
+from well_registry import contour_members, get_intersection_ids
 from wells_clustering import calc_regular_mesh
 
 
-def calculation(polygon, df_in_contour, contour_name, path_property, list_exception, dict_parameters):
+def calculation(polygon, df_in_contour, contour_name, path_property, list_exception, dict_parameters, graph=None):
     """
     Основная функция расчета
     :param polygon: контур, заданный пользователем
@@ -19,9 +29,16 @@ def calculation(polygon, df_in_contour, contour_name, path_property, list_except
     :param path_property: путь к справочнику с PVT свойствами
     :param list_exception: список исключаемых скважин
     :param dict_parameters: словарь с параметрами расчета
-    :return: словарь с результирующим DataFrame по каждому ключу
+    :param graph: граф соседей месторождения (neighbour_graph), если None - соседи ищутся по скважинам
+    каждого объекта
+    :return: словарь, по каждому ключу - результирующий DataFrame, контур и индекс скважин контура (well_id);
+    словарь отчетов контура {имя контура: {'coverage_curve': кривые охвата, 'first_row': сравнение первого ряда}}
     """
     dict_result = dict_keys(dict_parameters['mult_coef'], contour_name)
+    # части результата по объектам собираются в один DataFrame на ключ после расчета всех объектов
+    builder = result_builder(dict_result)
+    list_curves = []
+    list_first_row = []
     list_objects = list(set(df_in_contour.workHorizon.str.replace(" ", "").str.split(",").explode()))
     list_objects.sort()
     # list_objects = ['БС12']
@@ -38,28 +55,52 @@ def calculation(polygon, df_in_contour, contour_name, path_property, list_except
         else:
             mean_oilrate = df_horizon[df_horizon['fond'] == 'ДОБ']['oilRate'].mean() * dict_parameters[
                 'percent_oilrate'] / 100
+        # подграф соседей по скважинам объекта внутри контура
+        df_graph_horizon = None if graph is None else get_neighbour_subgraph(graph, df_horizon.wellName.values,
+                                                                             horizon)
+        # расстояния между стволами скважин объекта в пределах max_distance, общие для расчета первого ряда,
+        # разделения скважин по годам и алгоритма по дыркам
+        store = distance_store(df_horizon, dict_parameters['max_distance'], df_graph_horizon)
         # расчет среднего и минимального радиуса первого окружения по объекту
-        mean_rad, df_horizon = mean_radius(df_horizon, dict_parameters['verticalWellAngle'],
-                                           dict_parameters['MaxOverlapPercent'],
-                                           dict_parameters['angle_horizontalT1'],
-                                           dict_parameters['angle_horizontalT3'], dict_parameters['max_distance'])
+        mean_rad, df_horizon, df_first_row = mean_radius(df_horizon, dict_parameters['verticalWellAngle'],
+                                                         dict_parameters['MaxOverlapPercent'],
+                                                         dict_parameters['angle_horizontalT1'],
+                                                         dict_parameters['angle_horizontalT3'],
+                                                         dict_parameters['max_distance'],
+                                                         dict_parameters['first_row_method'], store,
+                                                         None if graph is None else graph['first_row'])
+        # сравнение первого ряда по секторам (из расчета среднего радиуса) и по триангуляции Делоне
+        if dict_parameters['first_row_method'] == 'compare':
+            df_compare = compare_first_row(df_horizon, df_first_row, dict_parameters['max_distance'])
+            df_compare.insert(loc=0, column='current_horizon', value=horizon)
+            list_first_row += [df_compare]
         logger.info(f'Research radius for horizon {horizon} calculated')
         # площадь многоугольника построенного по крайним скважинам, попавшим на расчет
-        obj_square = unary_union(list(df_horizon['GEOMETRY'].explode())).convex_hull
-        obj_square = (
-            obj_square.buffer(mean_rad)).area  # площадь охватывающая все скважины объекта, попавшие на расчет
+        obj_square = buffered_hull_area(df_horizon, mean_rad)  # площадь охватывающая все скважины объекта
+        # критические коэффициенты охвата по парам скважин объекта, общие для всех коэффициентов из mult_coef
+        max_coef = max(list(dict_parameters['mult_coef']) + [dict_parameters['limit_radius_coef']])
+        if dict_parameters['coverage_curve'] is not None:
+            max_coef = max(max_coef, dict_parameters['coverage_curve'][1])
+        if dict_parameters['calculation_scenario'] == 'holes':
+            # алгоритм по дыркам использует кольца охвата до 3R
+            max_coef = max(max_coef, 3 * max(dict_parameters['mult_coef']))
+        calc_option = True if dict_parameters['calculation_scenario'] in ['optimize', 'holes'] else dict_parameters[
+            'calc_option']
+        df_coverage = critical_coefficients(df_horizon, mean_rad, dict_parameters['percent'], max_coef, calc_option)
+
+        if (dict_parameters['coverage_curve'] is not None) and (
+                dict_parameters['calculation_scenario'] == 'optimize'):
+            df_prod_wells, df_piez_wells, df_inj_wells = split_fonds(df_horizon, mean_oilrate, dict_parameters)
+            if not df_prod_wells.empty:
+                list_curves += [calc_coverage_curve(df_prod_wells, df_piez_wells, df_inj_wells, horizon, mean_rad,
+                                                    path_property, list_exception, dict_parameters, df_coverage)]
 
         for key, coeff in zip(dict_result, dict_parameters['mult_coef']):
             # coeff = 2.5
             logger.info(f'Add shapely types with coefficient = {coeff}')
             df_horizon = add_shapely_types(df_horizon, mean_rad, coeff)
             # выделение продуктивных, нагнетательных и исследуемых скважин для объекта
-            df_prod_wells = df_horizon.loc[(df_horizon['fond'] == 'ДОБ') &
-                                           (df_horizon['oilRate'] <= mean_oilrate)]
-            if dict_parameters['limit_oilrate'] != 0:
-                df_prod_wells = df_prod_wells[df_prod_wells['oilRate'] <= dict_parameters['limit_oilrate']]
-            df_piez_wells = df_horizon.loc[df_horizon['fond'] == 'ПЬЕЗ']
-            df_inj_wells = df_horizon.loc[df_horizon['fond'] == 'НАГ']
+            df_prod_wells, df_piez_wells, df_inj_wells = split_fonds(df_horizon, mean_oilrate, dict_parameters)
             logger.info(f'Key of dictionary: {key}, Mult coefficient: {coeff}')
             df_result = pd.DataFrame()
 
@@ -69,117 +110,239 @@ def calculation(polygon, df_in_contour, contour_name, path_property, list_except
                     continue
                 df_result = calc_contour(df_prod_wells, df_piez_wells, df_inj_wells,
                                          df_result, horizon, mean_rad, coeff, key, obj_square,
-                                         path_property, list_exception, dict_parameters)
+                                         path_property, list_exception, dict_parameters, df_coverage, store)
             elif dict_parameters['calculation_scenario'] == 'regular':
                 logger.info(f'Selected second scenario')
                 df_result = calc_regular_mesh(df_prod_wells, df_piez_wells, df_inj_wells, df_result, horizon,
-                                              path_property, dict_parameters, obj_square, mean_rad, coeff)
-
+                                              path_property, dict_parameters, obj_square, mean_rad, coeff,
+                                              df_coverage)
+            elif dict_parameters['calculation_scenario'] == 'holes':
+                logger.info(f'Selected third scenario')
+                df_result = calc_mesh_by_holes(df_horizon, horizon, path_property, dict_parameters, obj_square,
+                                               mean_rad, coeff, df_coverage, store)
             else:
                 raise NameError(
                     f'Wrong marker name: {dict_parameters['calculation_scenario']}. Check parameters.yml file')
 
             df_result['mean_oilrate'] = mean_oilrate
             logger.info(f'Write to result dictionary by key {key}')
-            dict_result[key] = [pd.concat([dict_result[key][0], df_result],
-                                          axis=0, sort=False).reset_index(drop=True), polygon]
-    return dict_result
+            add_result(builder[key], df_result)
+
+    # индекс скважин контура передается в результат для выгрузки и построения карт
+    contour_ids = contour_members(df_in_contour, polygon)
+    for key in dict_result:
+        dict_result[key] = [build_result(builder[key]), polygon, contour_ids]
+
+    # кривые охвата и сравнение первого ряда выгружаются вместе с остальными результатами (main.write_results)
+    dict_reports = {}
+    if list_curves:
+        dict_reports['coverage_curve'] = pd.concat(list_curves, axis=0, sort=False).reset_index(drop=True)
+    if list_first_row:
+        dict_reports['first_row'] = pd.concat(list_first_row, axis=0, sort=False).reset_index(drop=True)
+    return dict_result, {contour_name: dict_reports} if dict_reports else {}
+
+
+def split_fonds(df_horizon, mean_oilrate, dict_parameters):
+    """
+    Выделение продуктивных, нагнетательных и пьезометрических скважин объекта
+    :param df_horizon: DataFrame скважин текущего объекта
+    :param mean_oilrate: ограничение по дебиту нефти добывающих скважин (процент от среднего по объекту)
+    :param dict_parameters: словарь с параметрами расчета
+    :return: DataFrame добывающих, пьезометрических и нагнетательных скважин
+    """
+    df_prod_wells = df_horizon.loc[(df_horizon['fond'] == 'ДОБ') &
+                                   (df_horizon['oilRate'] <= mean_oilrate)]
+    if dict_parameters['limit_oilrate'] != 0:
+        df_prod_wells = df_prod_wells[df_prod_wells['oilRate'] <= dict_parameters['limit_oilrate']]
+    df_piez_wells = df_horizon.loc[df_horizon['fond'] == 'ПЬЕЗ']
+    df_inj_wells = df_horizon.loc[df_horizon['fond'] == 'НАГ']
+    return df_prod_wells, df_piez_wells, df_inj_wells
+
 
+def calc_coverage_curve(df_prod_wells, df_piez_wells, df_inj_wells, horizon, mean_rad, path_property,
+                        list_exception, dict_parameters, df_coverage):
+    """
+    Расчет кривых охвата добывающего фонда, размера опорной сети и потерь в зависимости от коэффициента k
+    на плотной сетке значений. Пересечения для каждого k берутся из таблицы критических коэффициентов,
+    поэтому выбор сети (пьезометры, нагнетательные, одиночные) повторяется без геометрических расчетов
+    :param df_prod_wells: добывающие скважины по текущему объекту
+    :param df_piez_wells: пьезометры по текущему объекту
+    :param df_inj_wells: нагнетательные скважины по текущему объекту
+    :param horizon: объект, по которому идет расчет
+    :param mean_rad: средний радиус по объекту
+    :param path_property: путь к справочнику с PVT свойствами
+    :param list_exception: список исключаемых из расчета скважин
+    :param dict_parameters: словарь с параметрами расчета
+    :param df_coverage: DataFrame критических коэффициентов охвата по парам скважин объекта
+    :return: DataFrame со строкой на каждое значение k
+    """
+    logger.info(f'Coverage curve for {horizon}')
+    start, stop, step = dict_parameters['coverage_curve']
+    list_coef = np.round(np.arange(start, stop + step / 2, step), 6)
+    percent = dict_parameters['percent']
 
-def piez_calc(df_piez_wells, hor_prod_wells, df_result, percent):
+    # коэффициент времени исследования не зависит от k, поэтому считается один раз на скважину
+    dict_property = get_property(path_property)
+    df_wells = pd.concat([df_piez_wells, df_inj_wells, df_prod_wells], axis=0, sort=False)
+    df_wells = df_wells.drop_duplicates(subset=['well_id']).set_index('well_id', drop=False)
+    df_wells['time_coef'] = time_coef_table(df_wells, dict_property)[:, 0]
+    df_wells['oil'] = np.where(df_wells['gasStatus'].astype(str) == 'газоконденсатная',
+                               df_wells['oilRate'] + df_wells['condRate'], df_wells['oilRate'])
+    df_wells['gas'] = np.where(df_wells['gasStatus'].astype(str) == 'газонагнетательная',
+                               df_wells['injectivity_day'], df_wells['gasRate'])
+
+    list_curve = []
+    for coeff in tqdm(list_coef, "Coverage curve", position=0, leave=True, colour='white', ncols=80):
+        list_result = []
+        isolated_wells, _, hor_prod_wells, list_result = piez_calc(df_piez_wells.copy(), df_prod_wells.copy(),
+                                                                   list_result, percent, df_coverage, coeff)
+        if len(isolated_wells):
+            isolated_wells, hor_prod_wells, _, list_result = inj_calc(isolated_wells, hor_prod_wells,
+                                                                      df_inj_wells.copy(), list_result, percent,
+                                                                      df_coverage, coeff)
+            if len(isolated_wells):
+                _, _, list_result = single_calc(list_exception, isolated_wells, hor_prod_wells, list_result,
+                                                percent, df_coverage, coeff)
+        df_result = build_result(list_result)
+
+        list_selected = list(df_result['well_id']) if not df_result.empty else []
+        set_covered = set(get_intersection_ids(df_result['intersection'])) if not df_result.empty else set()
+        set_covered = (set_covered | set(list_selected)) & set(df_prod_wells['well_id'])
+        df_selected = df_wells.loc[list_selected]
+        research_time = (df_selected['min_dist'] * coeff) ** 2 * df_selected['time_coef']
+        # скважины в слепой зоне: охвачены при k, но не охвачены выбранными скважинами при limit_radius_coef
+        invisible_count = 0
+        if (coeff > dict_parameters['limit_radius_coef']) and not df_result.empty:
+            invisible_count = len(set(get_invisible_wells(df_result, df_prod_wells, df_coverage,
+                                                          dict_parameters['limit_radius_coef'])) & set_covered)
+
+        list_curve.append({'current_horizon': horizon,
+                           'coef': coeff,
+                           'radius': mean_rad * coeff,
+                           'coverage': len(set_covered) / df_prod_wells.shape[0],
+                           'well_count': len(list_selected),
+                           'piez_count': sum(df_selected['fond'] == 'ПЬЕЗ'),
+                           'inj_count': sum(df_selected['fond'] == 'НАГ'),
+                           'prod_count': sum(df_selected['fond'] == 'ДОБ'),
+                           'invisible_count': invisible_count,
+                           'mean_time': research_time.mean(),
+                           'oil_loss': (df_selected['oil'] * research_time).sum(),
+                           'gas_loss': (df_selected['gas'] * research_time).sum(),
+                           'injection_loss': (df_selected['injectivity'] * research_time).sum()})
+
+    return pd.DataFrame(list_curve)
+
+
+def piez_calc(df_piez_wells, hor_prod_wells, list_result, percent, df_coverage=None, coeff=None):
     """
     Функция обрабатывает DataFrame из пьезометров, подающийся на вход
     :param percent: процент длины траектории скважины для включения в зону охвата
+    :param df_coverage: DataFrame критических коэффициентов охвата по парам скважин (если None - геометрический расчет)
+    :param coeff: коэффициент, при котором пересечения выбираются из df_coverage
     :param df_piez_wells: DataFrame из пьезометров, выделенный из входного файла
     :param hor_prod_wells: DataFrame из добывающих скважин
-    :param df_result: В функцию подается DataFrame df_result для добавления в общий результат расчета пьезометров
+    :param list_result: список частей результата по объекту, в который добавляются выбранные пьезометры
     :return: Возвращаются: 1) список скважин, не имеющих пересечений;
                            2) DataFrame пьезометров;
                            3) DataFrame добывающих;
-                           4) Общий DataFrame со всеми результатами расчета по объекту
+                           4) список частей результата по объекту
     """
     logger.info("Calculation of piezometers")
     if not df_piez_wells.empty:
 
         # check_intersection
-        hor_prod_wells, df_piez_wells = intersect_number(hor_prod_wells, df_piez_wells, percent)
+        if df_coverage is None:
+            hor_prod_wells, df_piez_wells = intersect_number(hor_prod_wells, df_piez_wells, percent)
+        else:
+            hor_prod_wells, df_piez_wells = intersect_number_by_coverage(hor_prod_wells, df_piez_wells,
+                                                                         df_coverage, coeff)
 
         # !!!OPTIMIZATION!!!
         list_piez_wells = optimization(hor_prod_wells, df_piez_wells)
 
         # final list of piezometers to result_df
-        df_result = pd.concat([df_result, df_piez_wells[df_piez_wells.wellName.isin(list_piez_wells)]],
-                              axis=0, sort=False).reset_index(drop=True)
+        add_result(list_result, df_piez_wells[df_piez_wells.well_id.isin(list_piez_wells)])
 
         # wells without communication with piezometer
-        isolated_wells = hor_prod_wells[hor_prod_wells.number == 0].wellName.values
+        isolated_wells = hor_prod_wells[hor_prod_wells.number == 0].well_id.values
         hor_prod_wells.drop(["intersection", "number"], axis=1, inplace=True)
     else:
-        isolated_wells = hor_prod_wells.wellName.values
-    return isolated_wells, df_piez_wells, hor_prod_wells, df_result
+        isolated_wells = hor_prod_wells.well_id.values
+    return isolated_wells, df_piez_wells, hor_prod_wells, list_result
 
 
-def inj_calc(isolated_wells, hor_prod_wells, df_inj_wells, df_result, percent):
+def inj_calc(isolated_wells, hor_prod_wells, df_inj_wells, list_result, percent, df_coverage=None, coeff=None):
     """
     Функция обарабатывает DataFrame нагнетательных скважин
     :param percent: процент длины траектории скважины для включения в зону охвата
-    :param isolated_wells: Список скважин, не имеюших пересечений
+    :param df_coverage: DataFrame критических коэффициентов охвата по парам скважин (если None - геометрический расчет)
+    :param coeff: коэффициент, при котором пересечения выбираются из df_coverage
+    :param isolated_wells: Список well_id скважин, не имеюших пересечений
     :param hor_prod_wells: DataFrame добывающих скважин
     :param df_inj_wells: DataFrame нагнетательных скважин
-    :param df_result: Результирующий DataFrame, к которому добавится результат обработки DataFrame нагнетательных скв.
+    :param list_result: список частей результата по объекту, в который добавляются выбранные нагнетательные скв.
     :return: Возвращаются: 1) список скважин, не имеющих пересечений;
                            2) DataFrame нагнетательных;
                            3) DataFrame добывающих;
-                           4) Общий DataFrame со всеми результатами расчета по объекту
+                           4) список частей результата по объекту
     """
     logger.info("Calculation of injection wells")
-    hor_prod_wells = hor_prod_wells[hor_prod_wells.wellName.isin(isolated_wells)]
+    hor_prod_wells = hor_prod_wells[hor_prod_wells.well_id.isin(isolated_wells)]
 
     if not df_inj_wells.empty:
 
         # check_intersection
-        hor_prod_wells, df_inj_wells = intersect_number(hor_prod_wells, df_inj_wells, percent)
+        if df_coverage is None:
+            hor_prod_wells, df_inj_wells = intersect_number(hor_prod_wells, df_inj_wells, percent)
+        else:
+            hor_prod_wells, df_inj_wells = intersect_number_by_coverage(hor_prod_wells, df_inj_wells,
+                                                                        df_coverage, coeff)
 
         # !!!OPTIMIZATION!!!
         list_inj_wells = optimization(hor_prod_wells, df_inj_wells)
 
         # final list of injection to result_df
-        df_result = pd.concat([df_result, df_inj_wells[df_inj_wells.wellName.isin(list_inj_wells)]],
-                              axis=0, sort=False).reset_index(drop=True)
+        add_result(list_result, df_inj_wells[df_inj_wells.well_id.isin(list_inj_wells)])
 
         # wells without communication with injection wells
-        isolated_wells = hor_prod_wells[hor_prod_wells.number == 0].wellName.values
+        isolated_wells = hor_prod_wells[hor_prod_wells.number == 0].well_id.values
 
         hor_prod_wells.drop(["intersection", "number"], axis=1, inplace=True)
     else:
-        isolated_wells = hor_prod_wells.wellName.values
+        isolated_wells = hor_prod_wells.well_id.values
 
-    return isolated_wells, hor_prod_wells, df_inj_wells, df_result
+    return isolated_wells, hor_prod_wells, df_inj_wells, list_result
 
 
-def single_calc(list_exception, isolated_wells, hor_prod_wells, df_result, percent):
+def single_calc(list_exception, isolated_wells, hor_prod_wells, list_result, percent, df_coverage=None, coeff=None):
     """
     Функция обарабатывает DataFrame одиночных скважин
     :param list_exception: список исключаемых из расчета скважин
     :param percent: процент длины траектории скважины для включения в зону охвата
-    :param isolated_wells: Список скважин, не имеюших пересечений
+    :param df_coverage: DataFrame критических коэффициентов охвата по парам скважин (если None - геометрический расчет)
+    :param coeff: коэффициент, при котором пересечения выбираются из df_coverage
+    :param isolated_wells: Список well_id скважин, не имеюших пересечений
     :param hor_prod_wells: DataFrame добывающих скважин
-    :param df_result: Результирующий DataFrame, к которому добавится результат обработки DataFrame одиночных скв.
-    :return: Возвращаются: 1) список скважин, не имеющих пересечений;
+    :param list_result: список частей результата по объекту, в который добавляются выбранные одиночные скв.
+    :return: Возвращаются: 1) список well_id скважин, не имеющих пересечений;
                            2) DataFrame добывающих;
-                           3) Общий DataFrame со всеми результатами расчета по объекту
+                           3) список частей результата по объекту
     """
     logger.info("Calculation of single wells")
     single_wells = []
     df_prod_wells = hor_prod_wells.copy()
-    hor_prod_wells = hor_prod_wells[hor_prod_wells.wellName.isin(isolated_wells)]
+    hor_prod_wells = hor_prod_wells[hor_prod_wells.well_id.isin(isolated_wells)]
 
     # check_intersection
-    hor_prod_wells.insert(loc=hor_prod_wells.shape[1], column="intersection",
-                          value=list(map(lambda x, y:
-                                         check_intersection_area(x, hor_prod_wells[hor_prod_wells.wellName != y],
-                                                                 percent, True),
-                                         hor_prod_wells.AREA, hor_prod_wells.wellName)))
+    if df_coverage is None:
+        list_intersection = list(map(lambda x, y:
+                                     check_intersection_area(x, hor_prod_wells[hor_prod_wells.well_id != y],
+                                                             percent, True, 'well_id'),
+                                     hor_prod_wells.AREA, hor_prod_wells.well_id))
+    else:
+        list_intersection = get_covered_wells(df_coverage, hor_prod_wells.well_id.values,
+                                              hor_prod_wells.well_id.values, coeff)
+    hor_prod_wells.insert(loc=hor_prod_wells.shape[1], column="intersection", value=list_intersection)
     hor_prod_wells.insert(loc=hor_prod_wells.shape[1], column="number",
                           value=list(map(lambda x: len(x), hor_prod_wells['intersection'])))
 
@@ -187,31 +350,27 @@ def single_calc(list_exception, isolated_wells, hor_prod_wells, df_result, perce
     list_prod_exception = list(set(list_exception).intersection(hor_prod_wells['wellName'].explode().unique()))
     hor_prod_wells = hor_prod_wells[~hor_prod_wells['wellName'].isin(list_prod_exception)]
 
-    single_wells += list(hor_prod_wells[hor_prod_wells['number'] == 0].wellName)
+    single_wells += list(hor_prod_wells[hor_prod_wells['number'] == 0].well_id)
 
     df_optim = hor_prod_wells[hor_prod_wells.number > 0]
 
     # !!!OPTIMIZATION!!!
     if not df_optim.empty:
         df_optim = df_optim.sort_values(by=['oilRate'], ascending=True)
-        list_wells = df_optim.wellName.values
-        while len(list_wells) != 0:
-            single_wells += [list_wells[0]]
-            list_exeption = [list_wells[0]] + \
-                            list(df_optim[df_optim['wellName'] == list_wells[0]]['intersection'].explode().unique())
-            list_wells = [x for x in list_wells if x not in list_exeption]
+        single_wells += greedy_selection(df_optim.well_id.values, df_optim['intersection'].values)
 
     # final list of injection to result DataFrame
     clean_single_wells = []
-    df = hor_prod_wells[hor_prod_wells['wellName'].isin(single_wells)]
+    df = hor_prod_wells[hor_prod_wells['well_id'].isin(single_wells)]
 
     # delete duplicates
-    clean_single_wells += list(set(df['wellName']).difference(set(df['intersection'].explode().unique())))
-    df = df[df.wellName.isin(clean_single_wells)]
+    clean_single_wells += list(set(df['well_id']).difference(set(get_intersection_ids(df['intersection']))))
+    df = df[df.well_id.isin(clean_single_wells)]
 
-    list_exception_intersect = list(set(list_prod_exception).difference(set(df['intersection'].explode().unique())))
+    list_exception_intersect = list(set(df_prod_wells[df_prod_wells['wellName'].isin(list_prod_exception)].well_id)
+                                    .difference(set(get_intersection_ids(df['intersection']))))
     if len(list_exception_intersect):
-        df_exception = df_prod_wells[df_prod_wells['wellName'].isin(list_exception_intersect)]
+        df_exception = df_prod_wells[df_prod_wells['well_id'].isin(list_exception_intersect)]
         df_exception['intersection'] = 0
         df_exception['number'] = 0
         df_exception['intersection'] = df_exception['intersection'].apply(lambda x: 'Не охвачены исследованием!!!')
@@ -220,18 +379,20 @@ def single_calc(list_exception, isolated_wells, hor_prod_wells, df_result, perce
 
     # delete duplicates
     clean_wells = []
-    clean_wells += list(set(df['wellName']).difference(set(df['intersection'].explode().unique())))
-    df = df[df.wellName.isin(clean_wells)]
+    clean_wells += list(set(df['well_id']).difference(set(get_intersection_ids(df['intersection']))))
+    df = df[df.well_id.isin(clean_wells)]
 
-    df_result = pd.concat([df_result, df], axis=0, sort=False).reset_index(drop=True)
+    add_result(list_result, df)
 
-    return clean_wells, hor_prod_wells, df_result
+    return clean_wells, hor_prod_wells, list_result
 
 
 def calc_contour(df_prod_wells, df_piez_wells, df_inj_wells, df_result, horizon, mean_rad, coeff, key,
-                 obj_square, path_property, list_exception, dict_parameters):
+                 obj_square, path_property, list_exception, dict_parameters, df_coverage=None, store=None):
     """
     Функция для расчета скважин, включающая в себя все функции расчета отдельных типов скважин
+    :param df_coverage: DataFrame критических коэффициентов охвата по парам скважин объекта
+    :param store: хранилище расстояний объекта (distance_store)
     :param dict_parameters: словарь с параметрами (коэффициенты на радиус, углы перекрытия и тд)
     :param list_exception: список исключаемых из расчета скважин
     "слепых" зон и скважин в них
@@ -245,42 +406,48 @@ def calc_contour(df_prod_wells, df_piez_wells, df_inj_wells, df_result, horizon,
     df_result = calc_horizon(list_exception, path_property, dict_parameters['percent'], mean_rad, coeff,
                              horizon, obj_square, dict_parameters['min_research_time'],
                              dict_parameters['max_research_time'], df_piez_wells, df_prod_wells,
-                             df_inj_wells, df_result)
+                             df_inj_wells, df_result, df_coverage, coeff,
+                             cell_size=dict_parameters['raster_cell_size'])
     df_result['year_of_survey'] = 0  # для скважин первой итерации расчета год исследования ставится текущий
 
     if (coeff > dict_parameters['limit_radius_coef']) and (dict_parameters['separation_by_years'] is not None):
         df_result_invisible = pd.DataFrame()
         # выделение охваченных исследованиями добывающих скважин результата первой итерации расчета из исходного
         # DataFrame добывающих скважин
-        df_prod_intersection = df_prod_wells[df_prod_wells['wellName'].isin(list(
-            set(df_result['intersection'].explode().unique())))]
+        df_prod_intersection = df_prod_wells[df_prod_wells['well_id'].isin(get_intersection_ids(
+            df_result['intersection']))]
 
-        list_invisible_wells = get_invisible_wells(df_result.copy(), df_prod_intersection,
-                                                   dict_parameters['percent'], mean_rad, dict_parameters[
-                                                       'limit_radius_coef'])  # список скважин в слепой зоне
+        list_invisible_wells = get_invisible_wells(df_result, df_prod_intersection, df_coverage,
+                                                   dict_parameters['limit_radius_coef'])  # список скважин в слепой зоне
         if not list_invisible_wells:
             logger.info(f'Write to result dictionary by key {key}, there are not invisible wells')
             return df_result
         # выделение DataFrame добывающих скважин в слепых зонах из исходного DataFrame продуктивных
         df_prod_recalc = add_shapely_types(
-            df_prod_intersection[df_prod_intersection['wellName'].isin(list_invisible_wells)],
+            df_prod_intersection[df_prod_intersection['well_id'].isin(list_invisible_wells)],
             mean_rad, dict_parameters['limit_radius_coef'])
-        # обновление столбца AREA с максимально допустимым R в DataFrame скважин, попавших на первую итерацию расчета
-        df_piez_recalc = add_shapely_types(df_piez_wells, mean_rad, dict_parameters['limit_radius_coef'])
-        df_inj_recalc = add_shapely_types(df_inj_wells, mean_rad, dict_parameters['limit_radius_coef'])
+        # на вторую итерацию попадают только пьезометры и нагнетательные, охватывающие скважины в слепой зоне
+        # при максимально допустимом R, для них обновляется столбец AREA
+        set_near_zones = set(df_coverage[(df_coverage['k_crit'] <= dict_parameters['limit_radius_coef']) &
+                                         (df_coverage['well'].isin(list_invisible_wells))]['zone'])
+        df_piez_recalc = add_shapely_types(df_piez_wells[df_piez_wells['well_id'].isin(set_near_zones)],
+                                           mean_rad, dict_parameters['limit_radius_coef'])
+        df_inj_recalc = add_shapely_types(df_inj_wells[df_inj_wells['well_id'].isin(set_near_zones)],
+                                          mean_rad, dict_parameters['limit_radius_coef'])
         df_result_invisible = calc_horizon(list_exception, path_property, dict_parameters['percent'], mean_rad,
                                            coeff, horizon, obj_square, dict_parameters['min_research_time'],
                                            dict_parameters['max_research_time'], df_piez_recalc, df_prod_recalc,
-                                           df_inj_recalc, df_result_invisible)
+                                           df_inj_recalc, df_result_invisible, df_coverage,
+                                           dict_parameters['limit_radius_coef'],
+                                           [df_piez_wells.shape[0], df_inj_wells.shape[0], df_prod_recalc.shape[0]],
+                                           dict_parameters['raster_cell_size'])
         if dict_parameters['separation_by_years'] == 1:
             df_result_invisible['year_of_survey'] = 1
-            df_result = pd.concat([df_result, df_result_invisible],
-                                  axis=0, sort=False).reset_index(drop=True)
+            df_result = build_result([df_result, df_result_invisible])
         elif dict_parameters['separation_by_years'] == 2:
-            df_first_year, df_second_year = separation_gdis(df_result_invisible)
+            df_first_year, df_second_year = separation_gdis(df_result_invisible, store)
             df_first_year['year_of_survey'], df_second_year['year_of_survey'] = 1, 2
-            df_result = pd.concat([df_result, df_first_year, df_second_year],
-                                  axis=0, sort=False).reset_index(drop=True)
+            df_result = build_result([df_result, df_first_year, df_second_year])
         else:
             pass
 
@@ -289,7 +456,7 @@ def calc_contour(df_prod_wells, df_piez_wells, df_inj_wells, df_result, horizon,
 
 def calc_horizon(list_prod_exception, path_property, percent, mean_rad, coeff, horizon,
                  obj_square, min_time_research, max_time_research, df_piez_wells, df_prod_wells, df_inj_wells,
-                 df_result):
+                 df_result, df_coverage=None, coverage_coef=None, fond_count=None, cell_size=None):
     """
     Функция для расчета результирующего DataFrame по объекту
     :param obj_square: площадь объекта месторождения по краевым скважинам
@@ -304,55 +471,44 @@ def calc_horizon(list_prod_exception, path_property, percent, mean_rad, coeff, h
     :param df_prod_wells: добывающие скважины по текущему объекту
     :param df_inj_wells: нагнетательные скважины по текущему объекту
     :param df_result: пустой DataFrame, в который записывается результат расчета
+    :param df_coverage: DataFrame критических коэффициентов охвата по парам скважин объекта
+    :param coverage_coef: коэффициент радиуса, при котором определяются пересечения скважин
+    :param fond_count: кол-во пьезометров, нагнетательных и добывающих для расчета их доли в опорной сети,
+    по умолчанию берется по входным DataFrame
+    :param cell_size: размер ячейки растровой сетки для расчета площади охвата, если None - площадь считается
+    по объединению полигонов зон
     :return: результирующий DataFrame по объекту
     """
-    inj_count = df_inj_wells.shape[0]
-    prod_count = df_prod_wells.shape[0]
-    piez_count = df_piez_wells.shape[0]
+    piez_count, inj_count, prod_count = fond_count if fond_count is not None else (
+        df_piez_wells.shape[0], df_inj_wells.shape[0], df_prod_wells.shape[0])
 
     logger.info(f'Calculation for {horizon}')
+    list_result = [df_result]
     # I. Piezometric wells_____________________________________________________________________________________
 
-    isolated_wells, df_piez_wells, hor_prod_wells, df_result = piez_calc(df_piez_wells,
-                                                                         df_prod_wells.copy(),
-                                                                         df_result, percent)
+    isolated_wells, df_piez_wells, hor_prod_wells, list_result = piez_calc(df_piez_wells,
+                                                                           df_prod_wells.copy(),
+                                                                           list_result, percent,
+                                                                           df_coverage, coverage_coef)
 
     # II. Injection wells______________________________________________________________________________________
     if len(isolated_wells):
-        isolated_wells, hor_prod_wells, df_inj_wells, df_result = inj_calc(isolated_wells,
-                                                                           hor_prod_wells,
-                                                                           df_inj_wells,
-                                                                           df_result, percent)
+        isolated_wells, hor_prod_wells, df_inj_wells, list_result = inj_calc(isolated_wells,
+                                                                             hor_prod_wells,
+                                                                             df_inj_wells,
+                                                                             list_result, percent,
+                                                                             df_coverage, coverage_coef)
 
         # III. Single wells____________________________________________________________________________________
         if len(isolated_wells):
-            single_wells, hor_prod_wells, df_result = single_calc(list_prod_exception,
-                                                                  isolated_wells,
-                                                                  hor_prod_wells,
-                                                                  df_result, percent)
-
-    df_result['mean_radius'] = mean_rad * coeff  # столбец с текущим средним радиусом по объекту, домножается на коэфф.
-    df_result['min_dist'] = df_result['min_dist'] * coeff
-    # коэффициент для расчета времени исследования
-    dict_property = get_property(path_property)
-    df_result['time_coef/objects'] = df_result.apply(
-        lambda x: get_time_coef(dict_property, x.workHorizon, x.water_cut, x.oilfield, x.gasStatus), axis=1)
-    df_result['time_coef'] = list(map(lambda x: x[0], df_result['time_coef/objects']))
-    # df_result['mu'] = list(map(lambda x: x[1], df_result['time_coef/objects']))
-    # df_result['ct'] = list(map(lambda x: x[2], df_result['time_coef/objects']))
-    # df_result['phi'] = list(map(lambda x: x[3], df_result['time_coef/objects']))
-    df_result['k'] = list(map(lambda x: x[4], df_result['time_coef/objects']))  # проницаемость
-    df_result['gas_visc'] = list(map(lambda x: x[5], df_result['time_coef/objects']))  # вязкость газа в пл. условиях
-    df_result['pressure'] = list(map(lambda x: x[6], df_result['time_coef/objects']))  # пл. давление кгс/см2
-    df_result['default_count'] = list(map(lambda x: x[7], df_result['time_coef/objects']))  # кол-во объектов
-    # со свойствами по умолчанию
-    df_result['obj_count'] = list(map(lambda x: x[8], df_result['time_coef/objects']))
-    df_result['percent_of_default'] = list(map(lambda x: 100 * x[5] / x[6], df_result['time_coef/objects']))  # процент
-    # объектов со свойствами по умолчанию
-    df_result.drop(['time_coef/objects'], axis=1, inplace=True)
-    df_result['current_horizon'] = horizon  # добавления столбца объектов для понимания, по какому идет расчет
-    df_result['research_time'] = (df_result['min_dist'] * df_result['min_dist']
-                                  * df_result['time_coef'])  # время исследования в сут через min расстояние
+            single_wells, hor_prod_wells, list_result = single_calc(list_prod_exception,
+                                                                    isolated_wells,
+                                                                    hor_prod_wells,
+                                                                    list_result, percent,
+                                                                    df_coverage, coverage_coef)
+    df_result = build_result(list_result)
+
+    df_result = research_metrics(df_result, get_property(path_property), mean_rad, coeff, horizon)
 
     # # filter and delete wells, which don't fit the parameters limit research time
     # df_result = df_result.loc[
@@ -366,68 +522,58 @@ def calc_horizon(list_prod_exception, path_property, percent, mean_rad, coeff, h
     #         x['well type'] == 'horizontal' and x['research_time'] < 2 * min_time_research) else x['research_time'],
     #                                              axis=1)
 
-    df_result['oil_loss'] = 0
-    df_result['gas_loss'] = 0
-    df_result['injection_loss'] = 0
-    df_result['oil_loss'] = df_result.apply(
-        lambda x: (x.oilRate + x.condRate) * x.research_time if (
-                str(x.gasStatus) == 'газоконденсатная') else x.oilRate * x.research_time, axis=1)  # потери по нефти
-    df_result['gas_loss'] = df_result.apply(lambda x: (x.injectivity_day * x.research_time) if (
-            str(x.gasStatus) == 'газонагнетательная') else x.gasRate * x.research_time, axis=1)  # потери по газу
-    df_result['injection_loss'] = df_result['injectivity'] * df_result['research_time']  # потери по закачке воды
-    df_result['coverage_percentage'] = unary_union(list(df_result['AREA'].explode())).area / obj_square
+    if cell_size is None:
+        df_result['coverage_percentage'] = unary_union(list(df_result['AREA'].explode())).area / obj_square
+    else:
+        df_result['coverage_percentage'] = covered_area(coverage_area(
+            df_result, mean_rad * (coeff if coverage_coef is None else coverage_coef), cell_size)) / obj_square
     # процент скважин в опорной сети из скважин на объекте по каждому типу
-    df_result['percent_piez_wells'] = 0
-    if df_piez_wells.shape[0] != 0:
-        df_result['percent_piez_wells'] = df_result[df_result['fond'] == 'ПЬЕЗ'].shape[0] / piez_count
-    df_result['percent_inj_wells'] = 0
-    if df_inj_wells.shape[0] != 0:
-        df_result['percent_inj_wells'] = df_result[df_result['fond'] == 'НАГ'].shape[0] / inj_count
-    df_result['percent_prod_wells'] = 0
-    if df_prod_wells.shape[0] != 0:
-        df_result['percent_prod_wells'] = df_result[df_result['fond'] == 'ДОБ'].shape[0] / prod_count
+    df_result = fond_percentages(df_result, {'ПЬЕЗ': piez_count if not df_piez_wells.empty else 0,
+                                             'НАГ': inj_count if not df_inj_wells.empty else 0,
+                                             'ДОБ': prod_count if not df_prod_wells.empty else 0})
 
     return df_result
 
 
-def get_invisible_wells(df_recalc, df_prod, percent, radius, coeff):
+def get_invisible_wells(df_result, df_prod, df_coverage, coeff):
     """
-    Функция получения скважин в слепой зоне при k > 1.5 (k*R)
-    :param coeff: коэффициент домножения радиуса
-    :param df_recalc: копия результирующего DataFrame для выделения скважин в слепой зоне
+    Функция получения скважин в слепой зоне при k > limit_radius_coef: скважины, охваченные выбранными скважинами
+    при k*R, но не охваченные ими при limit_radius_coef*R. Охват при limit_radius_coef берется из таблицы
+    критических коэффициентов основного расчета, без перестроения зон
+    :param df_result: результирующий DataFrame первой итерации расчета
     :param df_prod: DataFrame добывающих скважин
-    :param percent: процент перекрытия зоной охвата, при котором скважина попадает в нее
-    :param radius: максимальный радиус охвата в слепой зоне
-    :return: возвращает список скважин для дообследования и DataFrame с обновленным столбцом пересечений
+    :param df_coverage: DataFrame критических коэффициентов охвата по парам скважин объекта
+    :param coeff: максимально допустимый коэффициент домножения радиуса (limit_radius_coef)
+    :return: возвращает список well_id скважин для дообследования
     """
     logger.info("Search invisible wells")
-    df_recalc['intersection_kR'] = df_recalc['intersection']
-    df_recalc['intersection'] = 0
-    df_recalc['AREA'] = 0
-    df_recalc = add_shapely_types(df_recalc, radius, coeff)
-    df_recalc['intersection'] = list(map(lambda x: check_intersection_area(x, df_prod, percent, True),
-                                         df_recalc.AREA))
-    intersect_kR, intersect_R = (set(df_recalc['intersection_kR'].explode().unique()),
-                                 set(df_recalc['intersection'].explode().unique()))
-    intersect_kR = {x for x in intersect_kR if pd.notna(x)}
-    intersect_R = {x for x in intersect_R if pd.notna(x)}
+    intersect_kR = set(get_intersection_ids(df_result['intersection']))
+    # выбранная скважина охватывает сама себя при любом радиусе
+    intersect_R = set(df_result['well_id']).union(*get_covered_wells(df_coverage, df_result['well_id'].values,
+                                                                     df_prod['well_id'].values, coeff))
     list_invisible_wells = list(intersect_kR - intersect_R)
 
     return list_invisible_wells
 
 
-def separation_gdis(df_invisible):
+def separation_gdis(df_invisible, store=None):
     """
     Функция разделения скважин в слепых зонах на 2 года
     :param df_invisible: DataFrame скважин, которые попали в слепую зону
+    :param store: хранилище расстояний объекта (distance_store), если None - расстояния считаются по координатам
     :return: Возвращает два DataFrame, по которым распределены скважины в слепой зоне(каждая вторая)
     """
     logger.info("Separation invisible wells")
     df_invisible = gpd.GeoDataFrame(df_invisible, geometry='GEOMETRY')
-    df_invisible['dist_from_0'] = list(map(lambda x: x.distance(df_invisible['GEOMETRY'].iloc[0]),
-                                           df_invisible['GEOMETRY']))
-    df_invisible.sort_values(by=['dist_from_0'], ascending=True)
-    list_separation = list(set(df_invisible.wellName.explode().unique()))
+    if df_invisible.empty:
+        return df_invisible, df_invisible
+    if store is None:
+        store = distance_store(df_invisible, 0)
+    positions = store['names'].get_indexer(df_invisible['wellName'])
+    df_invisible['dist_from_0'] = get_distances(store, positions[0], positions)
+    # скважины распределяются через одну по удалению от первой скважины
+    df_invisible = df_invisible.sort_values(by=['dist_from_0'], ascending=True, kind='stable')
+    list_separation = list(df_invisible.wellName.explode().unique())
     list_first_year = []
 
     for i in tqdm(range(0, len(list_separation), 2), "Separation", position=0, leave=True,
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from geometry import candidate_pairs, point_segment_distance, well_segments
+from well_registry import to_csr
+
+
+def critical_coefficients(df_wells, mean_rad, percent, max_coef, calc_option=True):
+    """
+    Расчет минимального коэффициента k, при котором зона охвата скважины-источника (радиус k * mean_rad) охватывает
+    скважину-цель на заданный процент длины траектории. Охват при любом k далее определяется фильтром k_crit <= k,
+    поэтому геометрия по объекту считается один раз для всех коэффициентов из mult_coef и limit_radius_coef
+    :param df_wells: DataFrame скважин объекта (все фонды)
+    :param mean_rad: средний радиус по объекту
+    :param percent: процент длины траектории скважины для включения в зону охвата
+    :param max_coef: максимальный коэффициент, до которого сохраняются пары скважин
+    :param calc_option: флаг переключения сценария охвата скважин (False - учитывается только точка T1)
+    :return: DataFrame пар ['zone', 'well', 'k_crit'] с k_crit <= max_coef
+    (zone, well - well_id скважин-источников и скважин-целей)
+    """
+    ids = df_wells.well_id.values
+    x1, y1, x3, y3 = well_segments(df_wells)
+    max_radius = max_coef * mean_rad
+    if len(ids) < 2 or not max_radius > 0:
+        return pd.DataFrame({'zone': pd.Series(dtype=np.int32), 'well': pd.Series(dtype=np.int32),
+                             'k_crit': pd.Series(dtype=float)})
+
+    pairs = candidate_pairs(x1, y1, x3, y3, max_radius)
+    zone = np.concatenate([pairs[:, 0], pairs[:, 1]])
+    well = np.concatenate([pairs[:, 1], pairs[:, 0]])
+
+    radius = critical_radius(x1[zone], y1[zone], x3[zone], y3[zone],
+                             x1[well], y1[well], x3[well], y3[well], percent, calc_option)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        k_crit = radius / mean_rad
+    mask = k_crit <= max_coef
+    logger.info(f'Critical coefficients: {mask.sum()} pairs of {len(ids)} wells')
+    return pd.DataFrame({'zone': ids[zone[mask]], 'well': ids[well[mask]], 'k_crit': k_crit[mask]})
+
+
+def critical_radius(zx1, zy1, zx3, zy3, wx1, wy1, wx3, wy3, percent, calc_option=True, iterations=60):
+    """
+    Минимальный радиус зоны вокруг траектории-источника, при котором доля траектории-цели внутри зоны >= percent.
+    Расстояние от точек цели до источника выпуклая функция вдоль отрезка, поэтому внутри зоны всегда лежит
+    непрерывный участок, и искомый радиус - минимум max(d(s), d(s + p)) по положению участка s (тернарный поиск)
+    :param zx1, zy1, zx3, zy3: координаты траекторий скважин-источников
+    :param wx1, wy1, wx3, wy3: координаты траекторий скважин-целей
+    :param percent: процент длины траектории скважины для включения в зону охвата
+    :param calc_option: флаг переключения сценария охвата скважин (False - учитывается только точка T1)
+    :param iterations: кол-во итераций тернарного поиска
+    :return: массив критических радиусов для каждой пары
+    """
+    def distance(t):
+        return point_segment_distance(wx1 + t * (wx3 - wx1), wy1 + t * (wy3 - wy1), zx1, zy1, zx3, zy3)
+
+    radius = distance(np.zeros(len(wx1)))
+    part = percent / 100
+    segment = (np.hypot(wx3 - wx1, wy3 - wy1) > 0)
+    if not calc_option or not segment.any():
+        return radius
+    if part > 1:
+        return np.where(segment, np.inf, radius)
+
+    lo, hi = np.zeros(len(wx1)), np.full(len(wx1), 1 - part)
+    for _ in range(iterations):
+        m1 = lo + (hi - lo) / 3
+        m2 = hi - (hi - lo) / 3
+        left = np.maximum(distance(m1), distance(m1 + part)) < np.maximum(distance(m2), distance(m2 + part))
+        hi = np.where(left, m2, hi)
+        lo = np.where(left, lo, m1)
+    s = (lo + hi) / 2
+    return np.where(segment, np.maximum(distance(s), distance(s + part)), radius)
+
+
+def get_covered_wells(df_coverage, zone_ids, well_ids, coeff):
+    """
+    Скважины из well_ids, охваченные зоной каждой скважины из zone_ids при коэффициенте coeff
+    (аналог check_intersection_area по каждой зоне)
+    :param df_coverage: DataFrame критических коэффициентов по парам скважин
+    :param zone_ids: well_id скважин-источников
+    :param well_ids: well_id скважин-целей
+    :param coeff: коэффициент кратного увеличения радиуса
+    :return: список массивов well_id охваченных скважин в порядке well_ids, по одному на каждую зону
+    """
+    return group_pairs(df_coverage, 'zone', 'well', zone_ids, well_ids, coeff)
+
+
+def get_covering_zones(df_coverage, well_ids, zone_ids, coeff):
+    """
+    Скважины из zone_ids, зоны которых охватывают каждую скважину из well_ids при коэффициенте coeff
+    (аналог check_intersection_point по каждой скважине)
+    :param df_coverage: DataFrame критических коэффициентов по парам скважин
+    :param well_ids: well_id скважин-целей
+    :param zone_ids: well_id скважин-источников
+    :param coeff: коэффициент кратного увеличения радиуса
+    :return: список массивов well_id скважин-источников в порядке zone_ids, по одному на каждую скважину-цель
+    """
+    return group_pairs(df_coverage, 'well', 'zone', well_ids, zone_ids, coeff)
+
+
+def intersect_number_by_coverage(df_prod, df_inj_piez, df_coverage, coeff):
+    """
+    Аналог geometry.intersect_number: столбцы 'intersection' и 'number' заполняются по таблице критических
+    коэффициентов без повторных геометрических проверок
+    :param df_prod: добывающие
+    :param df_inj_piez: нагнетательные/пьезометры
+    :param df_coverage: DataFrame критических коэффициентов по парам скважин
+    :param coeff: коэффициент кратного увеличения радиуса
+    :return: возвращаются DataFrame с кол-вом пересечений
+    """
+    if ("intersection" not in df_inj_piez) & ("number" not in df_inj_piez):
+        df_inj_piez.insert(loc=df_inj_piez.shape[1], column="intersection", value=0)
+        df_inj_piez.insert(loc=df_inj_piez.shape[1], column="number", value=0)
+
+    if ("intersection" not in df_prod) & ("number" not in df_prod):
+        df_prod.insert(loc=df_prod.shape[1], column="intersection", value=0)
+        df_prod.insert(loc=df_prod.shape[1], column="number", value=0)
+
+    df_inj_piez["intersection"] = get_covered_wells(df_coverage, df_inj_piez.well_id.values,
+                                                    df_prod.well_id.values, coeff)
+    df_inj_piez["number"] = df_inj_piez['intersection'].apply(lambda x: np.size(x))
+    df_inj_piez = df_inj_piez[df_inj_piez.number > 0]
+    df_prod["intersection"] = get_covering_zones(df_coverage, df_prod.well_id.values,
+                                                 df_inj_piez.well_id.values, coeff)
+    df_prod["number"] = df_prod['intersection'].apply(lambda x: np.size(x))
+    return df_prod, df_inj_piez
+
+
+def group_pairs(df_coverage, key_column, value_column, key_ids, value_ids, coeff):
+    """
+    Группировка пар с k_crit <= coeff по скважинам key_ids
+    :return: список массивов well_id из value_ids (в исходном порядке value_ids) для каждой скважины из key_ids,
+    массивы - срезы одного общего массива int32
+    """
+    key_ids, value_ids = np.asarray(key_ids, dtype=np.int32), np.asarray(value_ids, dtype=np.int32)
+    df_pairs = df_coverage[df_coverage['k_crit'] <= coeff]
+    key_position = pd.Index(key_ids).get_indexer(df_pairs[key_column])
+    value_position = pd.Index(value_ids).get_indexer(df_pairs[value_column])
+    mask = (key_position >= 0) & (value_position >= 0)
+    key_position, value_position = key_position[mask], value_position[mask]
+    order = np.lexsort((value_position, key_position))
+    counts = np.bincount(key_position, minlength=len(key_ids))
+    return np.split(value_ids[value_position[order]], np.cumsum(counts)[:-1]) if len(key_ids) else []
+
+
+def greedy_selection(well_ids, list_intersection):
+    """
+    Жадный выбор скважин: в порядке well_ids выбирается первая не исключенная скважина, все охваченные ею
+    скважины исключаются. Охват хранится как разреженная матрица смежности (CSR) на целочисленных индексах,
+    исключенные скважины - булевой маской, поэтому проход линейный по числу скважин и пересечений
+    :param well_ids: well_id скважин в порядке приоритета выбора
+    :param list_intersection: массивы well_id охваченных скважин для каждой скважины из well_ids
+    :return: список well_id выбранных скважин в порядке выбора
+    """
+    well_ids = np.asarray(well_ids, dtype=np.int32)
+    indptr, indices = to_csr(list_intersection)
+    indices = pd.Index(well_ids).get_indexer(indices)
+
+    excluded = np.zeros(len(well_ids), dtype=bool)
+    selected = []
+    for i in range(len(well_ids)):
+        if excluded[i]:
+            continue
+        selected.append(i)
+        neighbours = indices[indptr[i]:indptr[i + 1]]
+        excluded[neighbours[neighbours >= 0]] = True
+    return list(well_ids[selected])
@@ -1,4 +1,6 @@
+import multiprocessing
 import os
+import queue
 import sys
 
 import matplotlib
@@ -9,11 +11,97 @@ from matplotlib.backends.backend_qt5agg import FigureCanvasAgg as FigureCanvas,
     NavigationToolbar2QT as NavigationToolbar
 from matplotlib.figure import Figure
 from functions import get_path
-# from main import func_main
+from main import calculation_process
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
+# размер миниатюр галереи карт, пикселей
+THUMBNAIL_SIZE = 200
+# папки карт в output, которые выводятся в галерее: опорная сеть (optimize) и регулярная сетка (mesh)
+GALLERY_FOLDERS = ('pictures', 'mesh')
+
+
+class CalculationWorker(QThread):
+    """
+    Расчет в отдельном процессе (main.calculation_process): поток только передает в окно сообщения журнала
+    расчета, поэтому окно не блокируется и расчет не делит GIL с интерфейсом
+    """
+    message = pyqtSignal(str)
+    done = pyqtSignal(int)
+
+    def __init__(self, path_parameters, parent=None):
+        super().__init__(parent)
+        self.path_parameters = path_parameters
+
+    def run(self):
+        context = multiprocessing.get_context('spawn')
+        messages = context.Queue()
+        process = context.Process(target=calculation_process, args=(messages, self.path_parameters))
+        process.start()
+        while process.is_alive() or not messages.empty():
+            try:
+                self.message.emit(str(messages.get(timeout=0.2)).rstrip())
+            except queue.Empty:
+                pass
+        process.join()
+        self.done.emit(process.exitcode)
+
+
+class MapView(QGraphicsView):
+    """
+    Просмотр карты: масштаб колесом мыши, сдвиг перетаскиванием
+    """
+
+    def wheelEvent(self, event):
+        factor = 1.25 if event.angleDelta().y() > 0 else 0.8
+        self.scale(factor, factor)
+
+
+class ImageLoader(QThread):
+    """
+    Загрузка картинок в фоне по очереди запросов: миниатюры (с кэшем уменьшенных копий на диске) или карта
+    в полном разрешении. QImage можно создавать вне основного потока, QPixmap создается в окне
+    """
+    loaded = pyqtSignal(str, QImage)
+
+    def __init__(self, thumbnail_path=None, parent=None):
+        super().__init__(parent)
+        # папка кэша миниатюр (None - картинки загружаются в полном разрешении)
+        self.thumbnail_path = thumbnail_path
+        self.requests = queue.Queue()
+
+    def request(self, path):
+        self.requests.put(path)
+
+    def stop(self):
+        self.requests.put(None)
+        self.wait()
+
+    def run(self):
+        while True:
+            path = self.requests.get()
+            if path is None:
+                break
+            # при быстром листании загружается только последняя запрошенная карта
+            if self.thumbnail_path is None and not self.requests.empty():
+                continue
+            image = self.load_thumbnail(path) if self.thumbnail_path is not None else QImage(path)
+            if not image.isNull():
+                self.loaded.emit(path, image)
+
+    def load_thumbnail(self, path):
+        cache = os.path.join(self.thumbnail_path, os.path.basename(path))
+        if os.path.exists(cache) and os.path.getmtime(cache) >= os.path.getmtime(path):
+            return QImage(cache)
+        reader = QImageReader(path)
+        reader.setScaledSize(reader.size().scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE, Qt.KeepAspectRatio))
+        image = reader.read()
+        if not image.isNull():
+            os.makedirs(self.thumbnail_path, exist_ok=True)
+            image.save(cache)
+        return image
+
 
 class MainWindow(QMainWindow):
 
@@ -25,7 +113,7 @@ class MainWindow(QMainWindow):
         self.setGeometry(0, 0, 1920, 1080)
         self.createActions()
         self.create_menu_bar()
-        # self.image_viewer()
+        self.image_viewer()
         # self.plot_image()
         self.btns()
         self.createActions()
@@ -178,50 +266,139 @@ class MainWindow(QMainWindow):
         # layout_pvt.setText(' ,'.join(str(layout_pvt.text()).split(',')))
 
         # Кнопка запуска расчета
-        calc_button = QPushButton('Расчет', self)
+        self.calc_button = QPushButton('Расчет', self)
         # calc_button.setStyleSheet()
         # calc_button.setFixedSize(100, 20)
-        calc_button.move(10, 600)
-        # calc_button.clicked.connect(lambda: self.run_main_func())
-
-    # def run_main_func(self):
-    #     if __name__ == '__main__':
-    #         func_main()
+        self.calc_button.move(10, 600)
+        self.calc_button.clicked.connect(lambda: self.run_main_func())
+        # Журнал расчета
+        self.calc_log = QPlainTextEdit(self)
+        self.calc_log.setReadOnly(True)
+        self.calc_log.setGeometry(10, 635, 370, 400)
+
+    def run_main_func(self):
+        # Расчет в отдельном процессе, сообщения журнала выводятся в окно по мере расчета
+        self.calc_button.setEnabled(False)
+        self.calc_log.clear()
+        self.worker = CalculationWorker(str(get_path() + '/conf_files/parameters.yml'), self)
+        self.worker.message.connect(self.calc_log.appendPlainText)
+        self.worker.done.connect(self.calculation_done)
+        self.worker.start()
+
+    def calculation_done(self, exitcode):
+        self.calc_log.appendPlainText('Расчет завершен' if exitcode == 0 else f'Ошибка расчета (код {exitcode})')
+        self.calc_button.setEnabled(True)
+        self.update_gallery()
 
     def image_viewer(self):
 
-        # Create a QLabel for displaying images
-        self.image_label = QLabel(self)
-        self.image_label.setGeometry(400, 15, 650, 650)
-        self.image_label.setScaledContents(True)
-
-        scene = QGraphicsScene()
-        view = QGraphicsView(scene)
-        view.move(400, 15)
+        # Галерея миниатюр карт: миниатюры загружаются в фоне только для видимых строк и кэшируются
+        # уменьшенными копиями в output/thumbnails
+        self.output_path = str(get_path() + '/output')
+        self.gallery = QListWidget(self)
+        self.gallery.setGeometry(400, 15, 240, 1000)
+        self.gallery.setIconSize(QSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+        self.gallery.setWordWrap(True)
+        self.gallery.setUniformItemSizes(True)
+        self.gallery.currentRowChanged.connect(lambda row: self.load_image())
+        self.gallery.verticalScrollBar().valueChanged.connect(lambda value: self.request_thumbnails())
+        self.thumbnail_loader = ImageLoader(str(get_path() + '/output/thumbnails'), self)
+        self.thumbnail_loader.loaded.connect(self.set_thumbnail)
+        self.thumbnail_loader.start()
+
+        # Карта в полном разрешении: загружается в фоне при выборе, до загрузки показывается миниатюра.
+        # QGraphicsView рисует только видимую часть карты при приближении
+        self.scene = QGraphicsScene(self)
+        self.view = MapView(self.scene, self)
+        self.view.setGeometry(650, 15, 1000, 1000)
+        self.view.setDragMode(QGraphicsView.ScrollHandDrag)
+        self.view.setTransformationAnchor(QGraphicsView.AnchorUnderMouse)
+        self.image_item = self.scene.addPixmap(QPixmap())
+        self.image_item.setTransformationMode(Qt.SmoothTransformation)
+        self.image_loader = ImageLoader(parent=self)
+        self.image_loader.loaded.connect(self.set_image)
+        self.image_loader.start()
 
         # Create "Previous" and "Next" buttons
         previous_button = QPushButton("Previous", self)
-        previous_button.move(1075, 50)
+        previous_button.move(1675, 50)
         next_button = QPushButton("Next", self)
-        next_button.move(1075, 80)
+        next_button.move(1675, 80)
 
         # Create "Zoom in" and "Zoom out" buttons
         zoom_in_button = QPushButton("Zoom +", self)
-        zoom_in_button.move(1075, 110)
+        zoom_in_button.move(1675, 110)
         zoom_in_button.clicked.connect(lambda: self.zoom_in())
         zoom_out_button = QPushButton("Zoom -", self)
-        zoom_out_button.move(1075, 140)
+        zoom_out_button.move(1675, 140)
+        zoom_out_button.clicked.connect(lambda: self.zoom_out())
 
         # Load images and initialize image index
-        self.image_paths = os.listdir(str(get_path() + '/output/pictures/'))
-        self.image_index = 0
-        self.load_image()
+        self.image_paths = []
+        self.update_gallery()
 
-        scene.addWidget(self.image_label)
         # Connect button clicks to navigation methods
         previous_button.clicked.connect(self.previous_image)
         next_button.clicked.connect(self.next_image)
 
+    def update_gallery(self):
+        # Список карт папок output/pictures и output/mesh (пути относительно output), миниатюры запрашиваются
+        # при прокрутке
+        self.image_paths = []
+        for folder in GALLERY_FOLDERS:
+            folder_path = os.path.join(self.output_path, folder)
+            os.makedirs(folder_path, exist_ok=True)
+            self.image_paths += [os.path.join(folder, f) for f in sorted(os.listdir(folder_path))
+                                 if f.lower().endswith('.png')]
+        image_names = [os.path.basename(image_path) for image_path in self.image_paths]
+        # миниатюры карт прошлых расчетов удаляются
+        thumbnail_path = self.thumbnail_loader.thumbnail_path
+        if os.path.isdir(thumbnail_path):
+            for f in set(os.listdir(thumbnail_path)).difference(image_names):
+                os.remove(os.path.join(thumbnail_path, f))
+        self.thumbnails = {}
+        self.image_rows = {name: row for row, name in enumerate(image_names)}
+        self.gallery.clear()
+        placeholder = QPixmap(THUMBNAIL_SIZE, THUMBNAIL_SIZE)
+        placeholder.fill(Qt.white)
+        for name in image_names:
+            self.gallery.addItem(QListWidgetItem(QIcon(placeholder), name))
+        self.requested_thumbnails = set()
+        if self.image_paths:
+            self.gallery.setCurrentRow(0)
+        QTimer.singleShot(0, self.request_thumbnails)
+
+    def request_thumbnails(self):
+        # Запрос миниатюр только для видимых строк галереи
+        viewport = self.gallery.viewport().rect()
+        for row, image_path in enumerate(self.image_paths):
+            if row in self.requested_thumbnails:
+                continue
+            if self.gallery.visualItemRect(self.gallery.item(row)).intersects(viewport):
+                self.requested_thumbnails.add(row)
+                self.thumbnail_loader.request(os.path.join(self.output_path, image_path))
+
+    def set_thumbnail(self, path, image):
+        name = os.path.basename(path)
+        self.thumbnails[name] = image
+        if name in self.image_rows:
+            self.gallery.item(self.image_rows[name]).setIcon(QIcon(QPixmap.fromImage(image)))
+
+    def set_image(self, path, image):
+        if 0 <= self.image_index < len(self.image_paths) and \
+                os.path.basename(path) == os.path.basename(self.image_paths[self.image_index]):
+            self.show_pixmap(QPixmap.fromImage(image))
+
+    def show_pixmap(self, pixmap):
+        # Картинка заменяется с сохранением масштаба карты на экране (миниатюра -> полное разрешение)
+        old_width = self.image_item.pixmap().width()
+        self.image_item.setPixmap(pixmap)
+        self.scene.setSceneRect(QRectF(pixmap.rect()))
+        if old_width and pixmap.width():
+            self.view.scale(old_width / pixmap.width(), old_width / pixmap.width())
+        else:
+            self.view.fitInView(self.image_item, Qt.KeepAspectRatio)
+
     def plot_image(self):
         # add matplotlib figure
         fig = Figure(figsize=(5, 5))
@@ -247,32 +424,41 @@ class MainWindow(QMainWindow):
         self.widget.setGeometry(400, 400, 500, 100)
         self.widget.show()
 
+    @property
+    def image_index(self):
+        return self.gallery.currentRow()
+
     def load_image(self):
-        # Load and display the current image
+        # Load and display the current image: сначала миниатюра, карта в полном разрешении загружается в фоне
         if 0 <= self.image_index < len(self.image_paths):
             image_path = self.image_paths[self.image_index]
-            # return QPixmap('{}\\{}'.format(str(get_path() + '/output/pictures'), image_path))
-            # scaled_pixmap = pixmap.scaled()
-            self.image_label.setPixmap(QPixmap('{}\\{}'.format(str(get_path() + '/output/pictures'), image_path)))
-            self.image_label.setScaledContents(True)
+            self.view.resetTransform()
+            self.image_item.setPixmap(QPixmap())
+            thumbnail = self.thumbnails.get(os.path.basename(image_path))
+            if thumbnail is not None:
+                self.show_pixmap(QPixmap.fromImage(thumbnail))
+            self.image_loader.request(os.path.join(self.output_path, image_path))
 
     def previous_image(self):
         # Show the previous image
         if self.image_index > 0:
-            self.image_index -= 1
-            self.load_image()
+            self.gallery.setCurrentRow(self.image_index - 1)
 
     def next_image(self):
         # Show the next image
         if self.image_index < len(self.image_paths) - 1:
-            self.image_index += 1
-            self.load_image()
+            self.gallery.setCurrentRow(self.image_index + 1)
 
     def zoom_in(self):
-        size = self.load_image().size()
-        scaled_pixmap = self.load_image().scaled(1.25 * size)
-        self.image_label.setPixmap(scaled_pixmap)
-        # self.image_label.setScaledContents(True)
+        self.view.scale(1.25, 1.25)
+
+    def zoom_out(self):
+        self.view.scale(0.8, 0.8)
+
+    def closeEvent(self, event):
+        self.thumbnail_loader.stop()
+        self.image_loader.stop()
+        super().closeEvent(event)
 
     def createActions(self):
         # download action
@@ -298,7 +484,10 @@ class MainWindow(QMainWindow):
         self.referenceAction.triggered.connect(lambda: os.startfile(str(get_path() + '/README.txt')))
 
 
-app = QApplication(sys.argv)
-window = MainWindow()
-window.show()
-app.exec()
+if __name__ == '__main__':
+    # процесс расчета запускается и из собранного .exe
+    multiprocessing.freeze_support()
+    app = QApplication(sys.argv)
+    window = MainWindow()
+    window.show()
+    app.exec()
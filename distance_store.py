@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+
+from geometry import candidate_pairs, segment_distance, well_segments
+
+
+def distance_store(df_wells, radius, df_graph=None):
+    """
+    Хранилище расстояний между стволами скважин объекта: пары скважин с расстоянием не больше radius
+    в виде разреженной симметричной матрицы float32 (CSR). Используется при расчете первого ряда (mean_radius),
+    разделении скважин в слепых зонах по годам (separation_gdis) и в алгоритме по дыркам (holes_calc_fond)
+    :param df_wells: DataFrame скважин объекта, порядок строк задает индексы скважин в хранилище
+    :param radius: максимальное хранимое расстояние
+    :param df_graph: ребра графа соседей (get_neighbour_subgraph), если заданы - расстояния берутся из них
+    без повторного расчета (для radius не больше max_distance графа)
+    :return: словарь хранилища: имена скважин, матрица расстояний, радиус и координаты стволов
+    """
+    names = pd.Index(df_wells.wellName.values)
+    x1, y1, x3, y3 = well_segments(df_wells)
+    if df_graph is not None:
+        df_graph = df_graph[df_graph['distance'] <= radius]
+        rows, cols = names.get_indexer(df_graph['well']), names.get_indexer(df_graph['neighbour'])
+        mask = (rows >= 0) & (cols >= 0)
+        rows, cols, distance = rows[mask], cols[mask], df_graph['distance'].values[mask]
+    elif len(names) > 1:
+        pairs = candidate_pairs(x1, y1, x3, y3, radius)
+        distance = segment_distance(x1[pairs[:, 0]], y1[pairs[:, 0]], x3[pairs[:, 0]], y3[pairs[:, 0]],
+                                    x1[pairs[:, 1]], y1[pairs[:, 1]], x3[pairs[:, 1]], y3[pairs[:, 1]])
+        pairs, distance = pairs[distance <= radius], distance[distance <= radius]
+        rows = np.concatenate([pairs[:, 0], pairs[:, 1]])
+        cols = np.concatenate([pairs[:, 1], pairs[:, 0]])
+        distance = np.concatenate([distance, distance])
+    else:
+        rows, cols, distance = np.array([], dtype=int), np.array([], dtype=int), np.array([])
+
+    # строки CSR формируются напрямую, чтобы сохранить нулевые расстояния (совпадающие стволы)
+    order = np.lexsort((cols, rows))
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(names)))])
+    matrix = csr_matrix((distance[order].astype(np.float32), cols[order].astype(np.int32), indptr),
+                        shape=(len(names), len(names)))
+    return {'names': names, 'matrix': matrix, 'radius': radius, 'segments': np.column_stack([x1, y1, x3, y3])}
+
+
+def get_neighbours(store, position):
+    """
+    Скважины в пределах радиуса хранилища от скважины
+    :param store: хранилище расстояний
+    :param position: индекс скважины в хранилище
+    :return: индексы соседних скважин (по возрастанию) и расстояния до них
+    """
+    matrix = store['matrix']
+    start, end = matrix.indptr[position], matrix.indptr[position + 1]
+    return matrix.indices[start:end], matrix.data[start:end]
+
+
+def get_distances(store, position, positions):
+    """
+    Расстояния от скважины до набора скважин. Пары за пределами радиуса хранилища считаются точно по координатам
+    стволов, без сохранения
+    :param store: хранилище расстояний
+    :param position: индекс скважины в хранилище
+    :param positions: индексы скважин, до которых нужны расстояния
+    :return: массив расстояний в порядке positions
+    """
+    positions = np.asarray(positions, dtype=int)
+    indices, data = get_neighbours(store, position)
+    place = np.minimum(np.searchsorted(indices, positions), max(len(indices) - 1, 0))
+    found = (indices[place] == positions) if len(indices) else np.zeros(len(positions), dtype=bool)
+    distance = np.where(found, data[place] if len(indices) else 0, np.nan).astype(float)
+    distance[positions == position] = 0
+
+    missing = np.isnan(distance)
+    if missing.any():
+        x1, y1, x3, y3 = store['segments'].T
+        distance[missing] = segment_distance(x1[positions[missing]], y1[positions[missing]],
+                                             x3[positions[missing]], y3[positions[missing]],
+                                             x1[position], y1[position], x3[position], y3[position])
+    return distance
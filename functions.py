@@ -193,7 +193,7 @@ def dict_keys(list_r, contour_name):
     :return: словарь с ключами из коэффициентов и имени текущего контура
     """
     list_keys = [f'{contour_name}, k = {x}' for x in list_r]
-    dict_result = dict.fromkeys(list_keys, [pd.DataFrame(), None])
+    dict_result = dict.fromkeys(list_keys, [pd.DataFrame(), None, None])
     return dict_result
 
 
@@ -222,6 +222,44 @@ def upload_parameters(path):
     exception = None if exception == "нет" else exception
     dict_parameters['exception_file'] = exception
 
+    curve = dict_parameters.get('coverage_curve', "нет")
+    curve = None if curve == "нет" else [float(x) for x in curve]
+    dict_parameters['coverage_curve'] = curve
+
+    cell_size = dict_parameters.get('raster_cell_size', "нет")
+    cell_size = None if cell_size == "нет" else float(cell_size)
+    dict_parameters['raster_cell_size'] = cell_size
+
+    geometry_threads = dict_parameters.get('geometry_threads', 1)
+    dict_parameters['geometry_threads'] = None if geometry_threads == "авто" else int(geometry_threads)
+
+    render_processes = dict_parameters.get('render_processes', 1)
+    dict_parameters['render_processes'] = None if render_processes == "авто" else int(render_processes)
+    render_memory = dict_parameters.get('render_memory', "нет")
+    dict_parameters['render_memory'] = None if render_memory == "нет" else int(render_memory)
+    dict_parameters['render_cache'] = dict_parameters.get('render_cache', "да") == "да"
+    dict_parameters['html_maps'] = dict_parameters.get('html_maps', "нет") == "да"
+
+    excel_backend = dict_parameters.get('excel_backend', 'xlwings')
+    if excel_backend not in ['xlwings', 'openpyxl']:
+        raise NameError(f'Wrong excel_backend: {excel_backend}. Check parameters.yml file')
+    dict_parameters['excel_backend'] = excel_backend
+    # фоновая запись возможна только без Excel: xlwings работает с COM только из основного потока
+    excel_background = dict_parameters.get('excel_background', "нет")
+    dict_parameters['excel_background'] = excel_background == "да" and excel_backend == 'openpyxl'
+
+    export_formats = dict_parameters.get('export_formats', "нет")
+    export_formats = [] if export_formats == "нет" else [str(x).lower() for x in export_formats]
+    for export_format in export_formats:
+        if export_format not in ['parquet', 'gpkg', 'geojson']:
+            raise NameError(f'Wrong export format: {export_format}. Check parameters.yml file')
+    dict_parameters['export_formats'] = export_formats
+
+    first_row_method = dict_parameters.get('first_row_method', 'angular')
+    if first_row_method not in ['angular', 'delaunay', 'compare']:
+        raise NameError(f'Wrong first_row_method: {first_row_method}. Check parameters.yml file')
+    dict_parameters['first_row_method'] = first_row_method
+
     list_order = dict_parameters['list_order_fond']
     list_order = (list_order.upper()).split(', ')
     dict_parameters['list_order_fond'] = list_order
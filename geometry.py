@@ -1,80 +1,53 @@
 import geopandas as gpd
 import numpy as np
 import pandas as pd
-from shapely.geometry import LineString, Point, Polygon
+from scipy.spatial import ConvexHull, QhullError, cKDTree
+import shapely
+from shapely.geometry import Polygon
 
-
-def get_polygon_well(R_well, type_well, *coordinates):
-    """
-    Создание зоны вокруг скважины с заданным радиусом
-    :param R_well: радиус создания зоны
-    :param type_well: тип скважины
-    :param coordinates: координаты устье/забой
-    :return: возвращает геометрический объект зоны вокруг скважины
-    """
-    if type_well == "vertical":
-        well_polygon = Point(coordinates[0], coordinates[1]).buffer(R_well)
-        return well_polygon
-    elif type_well == "horizontal":
-        t1 = Point(coordinates[0], coordinates[1])
-        t3 = Point(coordinates[2], coordinates[3])
-        well_polygon = LineString([t1, t3]).buffer(R_well, join_style=1)
-        return well_polygon
-    else:
-        raise NameError(f'Wrong well type: {type_well}. Allowed values: vertical or horizontal')
+from geometry_pool import buffer_geometries, covered_share, covering_share
 
 
-def check_intersection_area(area, df_points, percent, calc_option):
+def check_intersection_area(area, df_points, percent, calc_option, column='wellName'):
     """
     Проверка входят ли скважины из df_point в зону другой скважины area
     :param percent: процент попадания скважины в зону охвата area
     :param calc_option: флаг переключения сценария охвата скважин
     :param area: координаты зоны вокруг конкретной скважины
     :param df_points: данные из которых берется геометрия скважин(точки/линии)
+    :param column: столбец, значения которого возвращаются (wellName - имена, well_id - идентификаторы скважин)
     :return: возвращаются имена скважин, которые входят в данную зону area
     """
     if calc_option:
         '''Столбец GEOMETRY позволит включать скважины в зону охвата,
         если скважина попадает в нее на определенное кол-во процентов'''
-        df_points = gpd.GeoDataFrame(df_points, geometry="GEOMETRY")
-        df_points = df_points[(df_points["GEOMETRY"].intersects(area))]
-        df_points['part_in'] = list(map(lambda x: area.intersection(x).length / x.length if x.length != 0 else 1,
-                                        df_points["GEOMETRY"]))
-        df_points = df_points[df_points['part_in'] >= percent / 100]
-        df_points.drop(columns=['part_in'], axis=1, inplace=True)
-        return df_points.wellName.values
+        part_in = covered_share(area, df_points["GEOMETRY"].values)
+        return df_points[column].values[part_in >= percent / 100]
     elif not calc_option:
         '''столбец POINT будет включать в зону охвата только те скважины,
         у которых точка входа в пласт попадает в зону охвата'''
-        df_points = gpd.GeoDataFrame(df_points, geometry="POINT")
-        df_points = df_points[df_points["POINT"].intersects(area)]
-        return df_points.wellName.values
+        points = np.asarray(df_points["POINT"].values, dtype=object)
+        return df_points[column].values[shapely.intersects(area, points)]
     else:
         raise TypeError(f'Wrong calculation option type: {calc_option}. Expected values: True or False')
 
 
-def check_intersection_point(point, df_areas, percent, calc_option):
+def check_intersection_point(point, df_areas, percent, calc_option, column='wellName'):
     """
     Функция позволяет узнать, перечесение со сколькими зонами имеет определенная скважина
     :param calc_option: флаг переключения сценария охвата скважин
     :param percent: процент попадания скважины в зону охвата
     :param point: геометрия скважины(точка/линия)
     :param df_areas: DataFrame со столбцом зон вокруг скважин
+    :param column: столбец, значения которого возвращаются (wellName - имена, well_id - идентификаторы скважин)
     :return: перечесение со сколькими зонами имеет определенная скважина
     """
     if calc_option:
-        df_areas = gpd.GeoDataFrame(df_areas, geometry="AREA")
-        df_areas = df_areas[df_areas["AREA"].intersects(point)]
-        df_areas['part_in'] = list(
-            map(lambda x: point.intersection(x).length / point.length if point.length != 0 else 1,
-                df_areas.AREA))
-        df_areas = df_areas[df_areas['part_in'] >= percent / 100]
-        df_areas.drop(columns=['part_in'])
-        return df_areas.wellName.values
+        part_in = covering_share(point, df_areas["AREA"].values)
+        return df_areas[column].values[part_in >= percent / 100]
     elif not calc_option:
-        df_areas = gpd.GeoDataFrame(df_areas, geometry="AREA")
-        df_areas = df_areas[df_areas["AREA"].intersects(point)]
-        return df_areas.wellName.values
+        areas = np.asarray(df_areas["AREA"].values, dtype=object)
+        return df_areas[column].values[shapely.intersects(areas, point)]
     else:
         raise TypeError(f'Wrong calculation option type: {calc_option}. Expected values: True or False')
 
@@ -82,7 +55,7 @@ def check_intersection_point(point, df_areas, percent, calc_option):
 def intersect_number(df_prod, df_inj_piez, percent):
     """
     Функция добавляет в DataFrame столбец 'intersection', в него записываются
-    имена скважин из другого DataFrame, с которыми пересекается текущая, затем добавляется столбец 'number',
+    well_id скважин из другого DataFrame, с которыми пересекается текущая, затем добавляется столбец 'number',
     в который заносится кол-во пересечений конкретной скважины с остальными
     :param percent: процент попадания скважины в зону охвата
     :param df_prod: добывающие
@@ -97,11 +70,11 @@ def intersect_number(df_prod, df_inj_piez, percent):
         df_prod.insert(loc=df_prod.shape[1], column="intersection", value=0)
         df_prod.insert(loc=df_prod.shape[1], column="number", value=0)
 
-    df_inj_piez["intersection"] = list(map(lambda x: check_intersection_area(x, df_prod, percent, True),
+    df_inj_piez["intersection"] = list(map(lambda x: check_intersection_area(x, df_prod, percent, True, 'well_id'),
                                            df_inj_piez.AREA))
     df_inj_piez["number"] = df_inj_piez['intersection'].apply(lambda x: np.size(x))
     df_inj_piez = df_inj_piez[df_inj_piez.number > 0]
-    df_prod["intersection"] = list(map(lambda x: check_intersection_point(x, df_inj_piez, percent, True),
+    df_prod["intersection"] = list(map(lambda x: check_intersection_point(x, df_inj_piez, percent, True, 'well_id'),
                                        df_prod.GEOMETRY))
     df_prod["number"] = df_prod['intersection'].apply(lambda x: np.size(x))
     return df_prod, df_inj_piez
@@ -115,7 +88,7 @@ def optimization(df_prod, df_inj_piez):
     как в список пересечений, так и в список исключений, из df_optim
     :param df_prod: DataFrame добывающих скважин
     :param df_inj_piez: DataFrame нагнетательных/пьезометров
-    :return: Возвращает обновленный список нагнетательных/пьезометров
+    :return: Возвращает обновленный список well_id нагнетательных/пьезометров
     """
     list_inj_piez_wells = []
     # выделяем из столбца пересечений DataFrame продуктивных скважин строки, где добывающие охвачены только 1
@@ -123,10 +96,10 @@ def optimization(df_prod, df_inj_piez):
     list_inj_piez_wells += list(df_prod[df_prod['number'] == 1]['intersection'].explode().unique())
     # по выделенному списку пьезометров из DataFrame пьезометрических скважин выделяем добывающие, которые охвачены ими
     list_prod_wells = df_inj_piez[
-        df_inj_piez['wellName'].isin(list_inj_piez_wells)]['intersection'].explode().unique()
+        df_inj_piez['well_id'].isin(list_inj_piez_wells)]['intersection'].explode().unique()
     # создаем dataframe оптимизации из DataFrame пьезометров, исключая те пьезометры, которые единственные охватывают
     # одну из добывающих скважин, их в любом случае включаем в опорную сеть
-    df_optim = df_inj_piez[~df_inj_piez['wellName'].isin(list_inj_piez_wells)]
+    df_optim = df_inj_piez[~df_inj_piez['well_id'].isin(list_inj_piez_wells)]
     # из столбца пересечений DataFrame оптимизации удаляются все добывающие, которые охвачены только 1 пьезометром
     df_optim.intersection = list(
         map(lambda x: list(set(x).difference(set(list_prod_wells))), df_optim['intersection']))
@@ -141,13 +114,13 @@ def optimization(df_prod, df_inj_piez):
         df_optim = df_optim.sort_values(by=['number'], ascending=True)
         # на каждой итерации создается набор исключений, кроме итерируемой скважины,
         # он сравнивается с набором скважин, входящих в список пересечений выше
-        for well in df_optim.wellName.values:
-            set_exception = set(df_optim[df_optim['wellName'] != well]['intersection'].explode().unique())
+        for well in df_optim.well_id.values:
+            set_exception = set(df_optim[df_optim['well_id'] != well]['intersection'].explode().unique())
             # при совпадении наборов исключений и пересечений из df_optim исключается итерируемая скважина
             # и добавляется к списку нагн./пьез.
             if set_exception == set_visible_wells:
-                df_optim = df_optim[df_optim.wellName != well]
-        list_inj_piez_wells += list(df_optim.wellName.values)
+                df_optim = df_optim[df_optim.well_id != well]
+        list_inj_piez_wells += list(df_optim.well_id.values)
 
     return list_inj_piez_wells
 
@@ -158,22 +131,14 @@ def add_shapely_types(df_input, mean_rad, coeff):
     :param coeff: коэффициент домножения радиуса
     :param df_input: DataFrame, полученный из исходного файла
     :param mean_rad: средний радиус окружения для итерируемого объекта
-    :return: Возвращается DataFrame с добавленными столбцами геометрии и площади влияния каждой скважины
+    :return: Возвращается DataFrame с добавленными столбцами геометрии и площади влияния каждой скважины,
+    радиус зоны хранится в столбце area_radius (для восстановления зон сохраненного расчета, run_store)
     """
     if 'AREA' not in df_input:
         df_input.insert(loc=df_input.shape[1], column="AREA", value=0)
 
-    df_input["AREA"] = df_input["AREA"].where(
-        df_input["well type"] != "vertical", list(map(lambda x, y: get_polygon_well(
-            mean_rad * coeff, "vertical", x, y), df_input.coordinateX, df_input.coordinateY)))
-    df_input["AREA"] = df_input["AREA"].where(df_input["well type"] != "horizontal",
-                                              list(map(lambda x, y, x1, y1:
-                                                       get_polygon_well(
-                                                           mean_rad * coeff, "horizontal", x, y, x1, y1),
-                                                       df_input.coordinateX,
-                                                       df_input.coordinateY,
-                                                       df_input.coordinateX3,
-                                                       df_input.coordinateY3)))
+    df_input["AREA"] = buffer_geometries(well_geometries(df_input), mean_rad * coeff)
+    df_input["area_radius"] = mean_rad * coeff
 
     return df_input
 
@@ -182,12 +147,126 @@ def add_shapely_circle(df_input, mean_rad, coeff):
     if 'AREA' not in df_input:
         df_input.insert(loc=df_input.shape[1], column="AREA", value=0)
 
-    df_input["AREA"] = list(map(lambda x, y: get_polygon_well(
-        mean_rad * coeff, "vertical", x, y), df_input.coordinateX, df_input.coordinateY))
+    df_input["AREA"] = buffer_geometries(shapely.points(df_input.coordinateX.values.astype(float),
+                                                        df_input.coordinateY.values.astype(float)), mean_rad * coeff)
 
     return df_input
 
 
+def point_segment_distance(px, py, ax, ay, bx, by):
+    """
+    Векторизованный расчет расстояния от точек до отрезков (для вертикальных скважин отрезок вырожден в точку)
+    :param px, py: координаты точек
+    :param ax, ay: координаты начала отрезков
+    :param bx, by: координаты конца отрезков
+    :return: массив расстояний от каждой точки до соответствующего отрезка
+    """
+    dx, dy = bx - ax, by - ay
+    length_2 = dx * dx + dy * dy
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = np.where(length_2 > 0, ((px - ax) * dx + (py - ay) * dy) / length_2, 0)
+    t = np.clip(t, 0, 1)
+    return np.hypot(px - ax - t * dx, py - ay - t * dy)
+
+
+def segment_distance(ax, ay, bx, by, cx, cy, dx, dy):
+    """
+    Векторизованный расчет минимального расстояния между отрезками AB и CD
+    (аналог shapely .distance для точек и двухточечных траекторий скважин)
+    :return: массив расстояний между соответствующими отрезками
+    """
+    distance = np.minimum.reduce([point_segment_distance(ax, ay, cx, cy, dx, dy),
+                                  point_segment_distance(bx, by, cx, cy, dx, dy),
+                                  point_segment_distance(cx, cy, ax, ay, bx, by),
+                                  point_segment_distance(dx, dy, ax, ay, bx, by)])
+    # пересекающиеся отрезки: концы каждого отрезка лежат по разные стороны от другого
+    d1 = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax)
+    d2 = (bx - ax) * (dy - ay) - (by - ay) * (dx - ax)
+    d3 = (dx - cx) * (ay - cy) - (dy - cy) * (ax - cx)
+    d4 = (dx - cx) * (by - cy) - (dy - cy) * (bx - cx)
+    crossing = (d1 * d2 < 0) & (d3 * d4 < 0)
+    return np.where(crossing, 0, distance)
+
+
+def candidate_pairs(x1, y1, x3, y3, radius):
+    """
+    Кандидаты в пары стволов с расстоянием не больше radius. Стволы делятся на части длиной не больше radius,
+    пары ищутся по серединам частей: расстояние между стволами не меньше расстояния между серединами частей
+    за вычетом длины части, поэтому радиус поиска не зависит от самой длинной скважины объекта
+    :param x1, y1, x3, y3: координаты траекторий скважин
+    :param radius: максимальное расстояние между стволами
+    :return: массив пар индексов стволов [i, j], i < j, без повторов
+    """
+    if len(x1) < 2:
+        return np.empty((0, 2), dtype=int)
+    length = np.hypot(x3 - x1, y3 - y1)
+    count = np.maximum(np.ceil(length / radius), 1).astype(int) if radius > 0 else np.ones(len(x1), dtype=int)
+    owner = np.repeat(np.arange(len(x1)), count)
+    # середина части: (номер части + 0.5) / кол-во частей вдоль ствола
+    t = (np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count) + 0.5) / count[owner]
+    points = np.column_stack([x1[owner] + t * (x3 - x1)[owner], y1[owner] + t * (y3 - y1)[owner]])
+    pairs = cKDTree(points).query_pairs(radius + (length / count).max(), output_type='ndarray')
+    pairs = np.sort(owner[pairs], axis=1)
+    # повторы пар (несколько частей одного ствола) удаляются по ключу i * n + j
+    key = np.unique(pairs[pairs[:, 0] != pairs[:, 1]] @ np.array([len(x1), 1], dtype=np.int64))
+    return np.column_stack([key // len(x1), key % len(x1)])
+
+
+def well_segments(df_wells):
+    """
+    Координаты траекторий скважин в виде массивов отрезков T1-T3
+    :param df_wells: DataFrame скважин со столбцами координат и типом скважины
+    :return: массивы x1, y1, x3, y3 (для вертикальных скважин T3 совпадает с T1)
+    """
+    vertical = (df_wells["well type"] == "vertical").values
+    x1 = df_wells.coordinateX.values.astype(float)
+    y1 = df_wells.coordinateY.values.astype(float)
+    x3 = np.where(vertical, x1, df_wells.coordinateX3.values.astype(float))
+    y3 = np.where(vertical, y1, df_wells.coordinateY3.values.astype(float))
+    return x1, y1, x3, y3
+
+
+def buffered_hull_area(df_wells, radius):
+    """
+    Площадь выпуклой оболочки по точкам T1/T3 скважин, расширенной на radius (аналог
+    unary_union(...).convex_hull.buffer(radius).area без построения геометрии):
+    площадь оболочки + периметр * radius + pi * radius^2
+    :param df_wells: DataFrame скважин
+    :param radius: радиус расширения оболочки
+    :return: площадь расширенной выпуклой оболочки, м2
+    """
+    x1, y1, x3, y3 = well_segments(df_wells)
+    points = np.unique(np.column_stack([np.concatenate([x1, x3]), np.concatenate([y1, y3])]), axis=0)
+    if len(points) == 0:
+        return 0
+    try:
+        hull = ConvexHull(points)
+        # для двумерной оболочки volume - площадь, area - периметр
+        hull_area, perimeter = hull.volume, hull.area
+    except (QhullError, ValueError):
+        # вырожденная оболочка (одна точка или точки на одной прямой): отрезок длиной L, периметр 2L
+        centered = points - points.mean(axis=0)
+        direction = np.linalg.svd(centered, full_matrices=False)[2][0]
+        projection = centered @ direction
+        hull_area, perimeter = 0, 2 * (projection.max() - projection.min())
+    return hull_area + perimeter * radius + np.pi * radius ** 2
+
+
+def well_geometries(df_wells):
+    """
+    Массив геометрий стволов скважин: точки для вертикальных скважин и отрезки T1-T3 для горизонтальных
+    :param df_wells: DataFrame скважин
+    :return: массив геометрий shapely в порядке строк df_wells
+    """
+    x1, y1, x3, y3 = well_segments(df_wells)
+    horizontal = (df_wells["well type"] == "horizontal").values
+    geometries = shapely.points(x1, y1)
+    if horizontal.any():
+        geometries[horizontal] = shapely.linestrings(
+            np.stack([np.column_stack([x1, y1]), np.column_stack([x3, y3])], axis=1)[horizontal])
+    return geometries
+
+
 def load_contour(contour_path):
     """
     Загрузка файла с координатами контура и построение многоугольника
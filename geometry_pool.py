@@ -0,0 +1,89 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import shapely
+
+# настройки пула потоков геометрических операций (задаются из parameters.yml через set_geometry_threads)
+GEOMETRY_POOL = {'threads': 1, 'min_batch': 2000}
+
+
+def set_geometry_threads(threads, min_batch=2000):
+    """
+    Настройка пула потоков для векторизованных операций shapely
+    :param threads: кол-во потоков (1 - однопоточный расчет, None - по числу ядер процессора)
+    :param min_batch: минимальный размер части массива, передаваемой в отдельный поток
+    :return: кол-во потоков
+    """
+    GEOMETRY_POOL['threads'] = max(int(threads if threads is not None else (os.cpu_count() or 1)), 1)
+    GEOMETRY_POOL['min_batch'] = min_batch
+    return GEOMETRY_POOL['threads']
+
+
+def run_batched(func, *arrays):
+    """
+    Выполнение векторизованной функции shapely над массивами геометрий: при большом размере массива и кол-ве потоков
+    больше 1 массивы делятся на части, которые считаются в пуле потоков (shapely 2.x отпускает GIL)
+    :param func: векторизованная функция от массивов одинаковой длины, возвращающая массив той же длины
+    :param arrays: массивы аргументов
+    :return: массив результатов в исходном порядке
+    """
+    size = len(arrays[0])
+    parts = min(GEOMETRY_POOL['threads'], size // GEOMETRY_POOL['min_batch'])
+    if parts <= 1:
+        return func(*arrays)
+    bounds = np.linspace(0, size, parts + 1).astype(int)
+    with ThreadPoolExecutor(max_workers=parts) as executor:
+        results = list(executor.map(lambda start, end: func(*[array[start:end] for array in arrays]),
+                                    bounds[:-1], bounds[1:]))
+    return np.concatenate(results)
+
+
+def buffer_geometries(geometries, radius):
+    """
+    Зоны заданного радиуса вокруг геометрий стволов скважин: круги для вертикальных, области вокруг ствола
+    со скругленными концами для горизонтальных
+    :param geometries: массив геометрий стволов (точки/отрезки)
+    :param radius: радиус зон (одно значение или массив по геометриям)
+    :return: массив полигонов зон
+    """
+    def _buffer(part, part_radius):
+        return shapely.buffer(part, part_radius, quad_segs=16, join_style='round')
+
+    geometries = np.asarray(geometries, dtype=object)
+    return run_batched(_buffer, geometries, np.broadcast_to(np.asarray(radius, dtype=float), geometries.shape))
+
+
+def covered_share(area, geometries):
+    """
+    Доля длины каждой геометрии, попадающая в зону area (для точек - 1, если точка в зоне, иначе 0)
+    :param area: зона охвата (одна геометрия)
+    :param geometries: массив геометрий стволов скважин
+    :return: массив долей
+    """
+    def _share(part):
+        share = np.zeros(len(part))
+        intersects = shapely.intersects(area, part)
+        length = shapely.length(part[intersects])
+        share[intersects] = np.where(length != 0, shapely.length(shapely.intersection(area, part[intersects]))
+                                     / np.where(length != 0, length, 1), 1)
+        return share
+
+    return run_batched(_share, np.asarray(geometries, dtype=object))
+
+
+def covering_share(geometry, areas):
+    """
+    Доля длины геометрии ствола, попадающая в каждую из зон areas
+    :param geometry: геометрия ствола скважины
+    :param areas: массив зон вокруг скважин
+    :return: массив долей
+    """
+    def _share(part):
+        share = np.zeros(len(part))
+        intersects = shapely.intersects(part, geometry)
+        share[intersects] = (shapely.length(shapely.intersection(geometry, part[intersects])) / geometry.length
+                             if geometry.length != 0 else 1)
+        return share
+
+    return run_batched(_share, np.asarray(areas, dtype=object))
@@ -0,0 +1,393 @@
+import html
+import json
+import os
+
+import numpy as np
+import shapely
+from matplotlib.colors import to_hex
+
+from map_render import geometry_parts, render_maps
+
+# кол-во уровней детализации интерактивной карты: на каждом следующем уровне допуск упрощения геометрии
+# в 2 раза меньше, а сетка тайлов в 2 раза мельче
+HTML_LEVELS = 4
+# размер окна карты в пикселях, при котором допуск упрощения первого уровня равен пикселю
+HTML_VIEW = 1024
+# штрихи границ зон по типу линии matplotlib (в пикселях)
+HTML_DASH = {'-': [], ':': [2, 3], '-.': [8, 3, 2, 3]}
+
+
+def html_maps(tasks, path='output/html'):
+    """
+    Интерактивные карты (автономный HTML, работает без интернета) по тем же заданиям, что и картинки
+    (well_map_tasks, mesh_map_tasks): карта на каждый объект и сценарий. Как и картинки, перестраиваются
+    только карты с измененными заданиями
+    :param tasks: задания карт
+    :param path: папка для карт
+    :return: кол-во построенных карт
+    """
+    return render_maps(write_html_map, html_tasks(tasks, path), "HTML maps", path)
+
+
+def html_tasks(tasks, path):
+    """
+    Задания интерактивных карт: имя файла как у картинки, расширение .html
+    :param tasks: задания карт
+    :param path: папка для карт
+    :return: генератор заданий
+    """
+    for task in tasks:
+        name = os.path.splitext(os.path.basename(task['path']))[0]
+        yield dict(task, path=os.path.join(path, f'{name}.html'))
+
+
+def write_html_map(task):
+    """
+    Запись интерактивной карты: данные карты встраиваются в HTML вместе со скриптом просмотра
+    :param task: задание карты
+    :return: путь к файлу карты
+    """
+    data = json.dumps(html_map_data(task), ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+    with open(task['path'], 'w', encoding='utf-8') as f:
+        f.write(HTML_TEMPLATE.replace('__TITLE__', html.escape(task['title'])).replace('__DATA__', data))
+    return task['path']
+
+
+def html_map_data(task):
+    """
+    Данные интерактивной карты. Координаты переводятся в целые числа (шаг в 2 раза меньше допуска упрощения
+    последнего уровня) относительно левого нижнего угла карты и записываются приращениями.
+    На каждом уровне детализации геометрия упрощается с допуском в пиксель экрана и раскладывается по тайлам
+    по центру охватывающего прямоугольника, поэтому при просмотре рисуются только видимые тайлы одного уровня
+    :param task: задание карты: слои (area_layer, well_layer, label_layer, контур) и заголовок
+    :return: словарь для JSON
+    """
+    list_layers = [layer for layer in task['layers'] if layer['kind'] != 'labels']
+    list_labels = [layer for layer in task['layers'] if layer['kind'] == 'labels']
+    list_geometries = [geometry_parts(layer['geometry']) for layer in list_layers]
+
+    list_bounds = [shapely.total_bounds(geometries) for geometries in list_geometries if len(geometries)]
+    list_bounds += [np.r_[layer['x'].min(), layer['y'].min(), layer['x'].max(), layer['y'].max()].astype(float)
+                    for layer in list_labels if len(layer['x'])]
+    bounds = np.array(list_bounds) if list_bounds else np.array([[0., 0., 1., 1.]])
+    origin = bounds[:, :2].min(axis=0)
+    size = max((bounds[:, 2:].max(axis=0) - origin).max(), 1.)
+    quantum = size / (HTML_VIEW * 2 ** HTML_LEVELS)
+
+    list_groups = list(dict.fromkeys(layer.get('name') or layer['kind'] for layer in task['layers']))
+    list_styles = [html_style(layer, list_groups) for layer in list_layers + list_labels]
+    list_levels = [level_data(list_geometries, size / (HTML_VIEW * 2 ** level), 2 ** level, size, origin, quantum)
+                   for level in range(HTML_LEVELS)]
+    return {'size': HTML_VIEW * 2 ** HTML_LEVELS, 'view': HTML_VIEW, 'groups': list_groups, 'styles': list_styles,
+            'levels': list_levels,
+            'labels': label_data(list_labels, len(list_layers), 2 ** (HTML_LEVELS - 1), size, origin, quantum)}
+
+
+def html_style(layer, list_groups):
+    """
+    Оформление слоя интерактивной карты
+    :param layer: словарь слоя
+    :param list_groups: названия слоев (слои с одинаковым названием включаются и выключаются вместе)
+    :return: словарь оформления
+    """
+    style = {'kind': layer['kind'], 'group': list_groups.index(layer.get('name') or layer['kind'])}
+    if layer['kind'] == 'areas':
+        style.update(fill=to_hex(layer['color']), stroke=to_hex(layer['edgecolor']), dash=HTML_DASH[layer['ls']])
+    else:
+        style.update(stroke=to_hex(layer['color']), marker=layer.get('marker', 'o'))
+    return style
+
+
+def level_data(list_geometries, tolerance, count, size, origin, quantum):
+    """
+    Уровень детализации: упрощенная геометрия слоев по тайлам
+    :param list_geometries: массивы геометрий слоев
+    :param tolerance: допуск упрощения геометрии
+    :param count: кол-во тайлов по стороне карты
+    :param size: размер карты
+    :param origin: левый нижний угол карты
+    :param quantum: шаг целочисленных координат
+    :return: словарь уровня: тайлы {"i,j": {номер слоя: [объекты]}}, pad - наибольший полуразмер объекта
+    (на сколько расширять видимую область при выборе тайлов)
+    """
+    dict_tiles = {}
+    pad = 0.
+    for index, geometries in enumerate(list_geometries):
+        if not len(geometries):
+            continue
+        # упрощение только для отображения (Дуглас-Пекер без сохранения топологии), схлопнувшиеся объекты
+        # остаются без упрощения
+        simplified = geometries.copy()
+        is_point = shapely.get_type_id(geometries) == 0
+        simplified[~is_point] = shapely.simplify(geometries[~is_point], tolerance, preserve_topology=False)
+        is_empty = shapely.is_empty(simplified)
+        simplified[is_empty] = geometries[is_empty]
+        geometries = simplified
+        bounds = shapely.bounds(geometries)
+        pad = max(pad, (bounds[:, 2:] - bounds[:, :2]).max() / 2)
+        tiles = np.clip(((bounds[:, :2] + bounds[:, 2:]) / 2 - origin) // (size / count), 0, count - 1).astype(int)
+        for (tile_x, tile_y), feature in zip(tiles, encode_features(geometries, origin, quantum)):
+            dict_tiles.setdefault(f'{tile_x},{tile_y}', {}).setdefault(index, []).append(feature)
+    return {'count': count, 'pad': int(np.ceil(pad / quantum)), 'tiles': dict_tiles}
+
+
+def encode_features(geometries, origin, quantum):
+    """
+    Координаты объектов в целых числах приращениями: объект - список частей (кольца полигона, линия или точка),
+    часть - плоский список [x0, y0, dx1, dy1, ...]
+    :param geometries: массив простых геометрий
+    :param origin: левый нижний угол карты
+    :param quantum: шаг целочисленных координат
+    :return: список объектов
+    """
+    is_polygon = shapely.get_type_id(geometries) == 3
+    rings, ring_polygon = shapely.get_rings(geometries[is_polygon], return_index=True)
+    owners = np.concatenate([np.flatnonzero(is_polygon)[ring_polygon], np.flatnonzero(~is_polygon)])
+    order = np.argsort(owners, kind='stable')
+    parts, owners = np.concatenate([rings, geometries[~is_polygon]])[order], owners[order]
+
+    coords, coord_part = shapely.get_coordinates(parts, return_index=True)
+    coords = np.round((coords - origin) / quantum).astype(np.int64)
+    part_start = np.searchsorted(coord_part, np.arange(len(parts) + 1))
+    delta = coords.copy()
+    delta[1:] -= coords[:-1]
+    delta[part_start[:-1]] = coords[part_start[:-1]]
+    flat = delta.ravel().tolist()
+    list_parts = [flat[2 * start:2 * end] for start, end in zip(part_start[:-1], part_start[1:])]
+    owner_start = np.searchsorted(owners, np.arange(len(geometries) + 1))
+    return [list_parts[start:end] for start, end in zip(owner_start[:-1], owner_start[1:])]
+
+
+def label_data(list_labels, first_style, count, size, origin, quantum):
+    """
+    Подписи скважин по тайлам последнего уровня: [порядок вывода, x, y, подпись, номер оформления].
+    Прореживание наложений выполняется при просмотре в порядке вывода (как на картинках)
+    :param list_labels: слои подписей в порядке приоритета
+    :param first_style: номер оформления первого слоя подписей
+    :param count: кол-во тайлов по стороне карты
+    :param size: размер карты
+    :param origin: левый нижний угол карты
+    :param quantum: шаг целочисленных координат
+    :return: словарь подписей: тайлы {"i,j": [подписи]}
+    """
+    dict_tiles = {}
+    rank = 0
+    for style, layer in enumerate(list_labels, start=first_style):
+        xy = np.column_stack([layer['x'], layer['y']]).astype(float) - origin
+        tiles = np.clip(xy // (size / count), 0, count - 1).astype(int)
+        coords = np.round(xy / quantum).astype(np.int64).tolist()
+        for (tile_x, tile_y), (x, y), label in zip(tiles, coords, layer['label']):
+            dict_tiles.setdefault(f'{tile_x},{tile_y}', []).append([rank, x, y, str(label), style])
+            rank += 1
+    return {'count': count, 'tiles': dict_tiles}
+
+
+HTML_TEMPLATE = """<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<title>__TITLE__</title>
+<style>
+html, body {margin: 0; height: 100%; overflow: hidden; font-family: sans-serif}
+#map {position: absolute; left: 0; top: 0; width: 100%; height: 100%; background: #fff; cursor: grab}
+#panel {position: absolute; right: 8px; top: 8px; max-height: 90%; overflow: auto; padding: 6px 8px;
+        font-size: 12px; background: rgba(255, 255, 255, 0.9); border: 1px solid #999}
+#panel h3 {margin: 0 0 4px; font-size: 13px}
+#panel label {display: block; white-space: nowrap}
+.swatch {display: inline-block; width: 12px; height: 10px; margin: 0 4px; border: 1px solid #333;
+         vertical-align: middle}
+#info {position: absolute; left: 8px; bottom: 8px; font-size: 11px; color: #555;
+       background: rgba(255, 255, 255, 0.8)}
+</style>
+</head>
+<body>
+<canvas id="map"></canvas>
+<div id="panel"><h3>__TITLE__</h3></div>
+<div id="info">Колесо мыши - масштаб, перетаскивание - сдвиг, двойной щелчок - вся карта</div>
+<script>
+const DATA = __DATA__;
+const canvas = document.getElementById('map');
+const ctx = canvas.getContext('2d');
+const visible = DATA.groups.map(() => true);
+const FONT = 11;
+// экранные координаты: sx = ox + x * scale, sy = oy - y * scale
+let scale = 1, ox = 0, oy = 0, ratio = 1, pending = false, drag = null;
+
+function resize() {
+    ratio = window.devicePixelRatio || 1;
+    canvas.width = canvas.clientWidth * ratio;
+    canvas.height = canvas.clientHeight * ratio;
+}
+
+function fit() {
+    const w = canvas.clientWidth, h = canvas.clientHeight;
+    scale = 0.95 * Math.min(w, h) / DATA.size;
+    ox = (w - DATA.size * scale) / 2;
+    oy = h - (h - DATA.size * scale) / 2;
+}
+
+function request() {
+    if (!pending) {
+        pending = true;
+        requestAnimationFrame(draw);
+    }
+}
+
+function levelIndex() {
+    // уровень, на котором допуск упрощения не больше пикселя экрана
+    const level = Math.ceil(Math.log2(scale * DATA.size / DATA.view));
+    return Math.max(0, Math.min(DATA.levels.length - 1, level));
+}
+
+function visibleTiles(count, pad) {
+    const w = canvas.clientWidth, h = canvas.clientHeight, tile = DATA.size / count;
+    const index = v => Math.max(0, Math.min(count - 1, Math.floor(v / tile)));
+    const keys = [];
+    for (let i = index(-ox / scale - pad); i <= index((w - ox) / scale + pad); i++) {
+        for (let j = index((oy - h) / scale - pad); j <= index(oy / scale + pad); j++) {
+            keys.push(i + ',' + j);
+        }
+    }
+    return keys;
+}
+
+function trace(path, part) {
+    let x = part[0], y = part[1];
+    path.moveTo(ox + x * scale, oy - y * scale);
+    for (let k = 2; k < part.length; k += 2) {
+        x += part[k];
+        y += part[k + 1];
+        path.lineTo(ox + x * scale, oy - y * scale);
+    }
+}
+
+function marker(path, part, style) {
+    const x = ox + part[0] * scale, y = oy - part[1] * scale, r = 3;
+    if (style.marker === '^') {
+        path.moveTo(x, y - 1.2 * r);
+        path.lineTo(x + r, y + 0.8 * r);
+        path.lineTo(x - r, y + 0.8 * r);
+        path.closePath();
+    } else {
+        path.moveTo(x + r, y);
+        path.arc(x, y, r, 0, 2 * Math.PI);
+    }
+}
+
+function drawLabels() {
+    const cell = 4 * FONT, cells = new Map(), list = [];
+    for (const key of visibleTiles(DATA.labels.count, 0)) {
+        for (const label of DATA.labels.tiles[key] || []) {
+            if (visible[DATA.styles[label[4]].group]) list.push(label);
+        }
+    }
+    list.sort((a, b) => a[0] - b[0]);
+    ctx.font = FONT + 'px sans-serif';
+    for (const [rank, x, y, text, index] of list) {
+        const x0 = ox + x * scale + 3, y1 = oy - y * scale - 3;
+        const box = [x0, y1 - FONT, x0 + 0.6 * FONT * text.length, y1];
+        const keys = [];
+        for (let i = Math.floor(box[0] / cell); i <= Math.floor(box[2] / cell); i++) {
+            for (let j = Math.floor(box[1] / cell); j <= Math.floor(box[3] / cell); j++) keys.push(i + ',' + j);
+        }
+        // подпись, которая накладывается на уже выведенную, не выводится
+        const overlap = keys.some(key => (cells.get(key) || []).some(
+            other => box[0] < other[2] && other[0] < box[2] && box[1] < other[3] && other[1] < box[3]));
+        if (overlap) continue;
+        for (const key of keys) {
+            if (!cells.has(key)) cells.set(key, []);
+            cells.get(key).push(box);
+        }
+        ctx.fillStyle = DATA.styles[index].stroke;
+        ctx.fillText(text, x0, y1);
+    }
+}
+
+function draw() {
+    pending = false;
+    ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+    ctx.clearRect(0, 0, canvas.clientWidth, canvas.clientHeight);
+    const level = DATA.levels[levelIndex()];
+    const keys = visibleTiles(level.count, level.pad);
+    DATA.styles.forEach((style, index) => {
+        if (style.kind === 'labels' || !visible[style.group]) return;
+        // слой рисуется одним контуром: линии и кольца полигонов, отдельно маркеры точек
+        const lines = new Path2D(), points = new Path2D();
+        for (const key of keys) {
+            for (const feature of (level.tiles[key] || {})[index] || []) {
+                for (const part of feature) {
+                    if (part.length === 2) marker(points, part, style); else trace(lines, part);
+                }
+            }
+        }
+        ctx.setLineDash(style.dash || []);
+        if (style.kind === 'areas') {
+            ctx.fillStyle = style.fill;
+            ctx.fill(lines);
+        }
+        ctx.strokeStyle = style.stroke;
+        ctx.lineWidth = style.kind === 'areas' ? 1 : 1.5;
+        ctx.stroke(lines);
+        ctx.fillStyle = style.stroke;
+        ctx.fill(points);
+    });
+    ctx.setLineDash([]);
+    drawLabels();
+}
+
+const panel = document.getElementById('panel');
+DATA.groups.forEach((name, group) => {
+    const style = DATA.styles.find(s => s.group === group);
+    const label = document.createElement('label');
+    const box = document.createElement('input');
+    const swatch = document.createElement('span');
+    box.type = 'checkbox';
+    box.checked = true;
+    box.onchange = () => {
+        visible[group] = box.checked;
+        request();
+    };
+    swatch.className = 'swatch';
+    swatch.style.background = style.fill || style.stroke;
+    label.append(box, swatch, name);
+    panel.append(label);
+});
+
+canvas.addEventListener('wheel', e => {
+    e.preventDefault();
+    const k = Math.exp(-e.deltaY * 0.0015);
+    ox = e.offsetX - (e.offsetX - ox) * k;
+    oy = e.offsetY - (e.offsetY - oy) * k;
+    scale *= k;
+    request();
+}, {passive: false});
+canvas.addEventListener('mousedown', e => {
+    drag = [e.clientX, e.clientY];
+    canvas.style.cursor = 'grabbing';
+});
+window.addEventListener('mouseup', () => {
+    drag = null;
+    canvas.style.cursor = 'grab';
+});
+window.addEventListener('mousemove', e => {
+    if (!drag) return;
+    ox += e.clientX - drag[0];
+    oy += e.clientY - drag[1];
+    drag = [e.clientX, e.clientY];
+    request();
+});
+canvas.addEventListener('dblclick', () => {
+    fit();
+    request();
+});
+window.addEventListener('resize', () => {
+    resize();
+    request();
+});
+resize();
+fit();
+draw();
+</script>
+</body>
+</html>
+"""
@@ -1,25 +1,117 @@
+import multiprocessing
 import os
 import warnings
+from queue import Queue
 
 import geopandas as gpd
 import pandas as pd
 from loguru import logger
 
+from FirstRowWells import neighbour_graph
 from calculation_wells import calculation
 from dictionaries import dict_constant
 from functions import upload_parameters, get_path
 from geometry import check_intersection_area, load_contour
-from mapping import mesh_visualization, visualization
+from geometry_pool import set_geometry_threads
+from html_map import html_maps
+from map_render import init_render_process, set_render_processes
+from mapping import curve_visualization, mesh_map_tasks, mesh_visualization, visualization, well_map_tasks
 from preparing_data import upload_input_data, upload_gdis_data, preparing_reservoir_properties
-from print_in_excel import write_cluster_mesh, write_to_excel
+from print_in_excel import write_cluster_mesh, write_coverage_curve, write_first_row_comparison, write_in_background, \
+    write_to_excel
+from result_export import export_results
+from run_store import save_run
 
 warnings.filterwarnings('ignore')
 pd.options.mode.chained_assignment = None  # default='warn'
 
-if __name__ == '__main__':
 
+def excel_writer(df_input, dict_result, dict_parameters, result_queue=None):
+    """
+    Функция записи в Excel для сценария расчета и ее аргументы
+    :param df_input: исходный DataFrame скважин
+    :param dict_result: словарь результатов расчета (при записи из очереди заполняется по мере расчета)
+    :param dict_parameters: словарь с параметрами расчета
+    :param result_queue: очередь словарей результатов контуров, если None - пишется готовый dict_result
+    :return: функция записи, список позиционных аргументов и словарь именованных аргументов
+    """
+    if dict_parameters['calculation_scenario'] == 'optimize':
+        return write_to_excel, [df_input, dict_result], dict(backend=dict_parameters['excel_backend'],
+                                                              result_queue=result_queue, **dict_constant)
+    return write_cluster_mesh, [df_input, dict_result], dict(backend=dict_parameters['excel_backend'],
+                                                              result_queue=result_queue)
+
+
+def write_results(df_input, df_out_contour, dict_result, dict_parameters, dict_reports=None, excel_thread=None):
+    """
+    Выгрузка результатов расчета: запись в Excel, построение карт (картинки и интерактивные HTML) и выгрузка
+    в Parquet/GeoPackage/GeoJSON, кривые охвата и сравнение первого ряда по контурам.
+    Используется после расчета и при построении по сохраненному расчету (render.py)
+    :param df_input: исходный DataFrame скважин
+    :param df_out_contour: DataFrame скважин вне контуров
+    :param dict_result: словарь результатов расчета
+    :param dict_parameters: словарь с параметрами расчета
+    :param dict_reports: словарь отчетов по контурам (calculation): кривые охвата и сравнение первого ряда
+    :param excel_thread: поток записи в Excel, запущенный во время расчета (func_main), если None - запись
+    выполняется здесь
+    :return: функция сохраняет файлы в папку output
+    """
+    # Print in Excel and MAP drawing__________________________________________________________________________________
+    write_excel, excel_args, excel_kwargs = excel_writer(df_input, dict_result, dict_parameters)
+    if (excel_thread is None) and dict_parameters['excel_background']:
+        # запись в Excel (все сценарии в одном файле) идет в отдельном потоке одновременно с построением карт
+        excel_thread = write_in_background(write_excel, *excel_args, **excel_kwargs)
+
+    # задания карт строятся один раз: для картинок и интерактивных карт используются одни и те же задания,
+    # без интерактивных карт задания передаются в построение генератором, не занимая память
+    if dict_parameters['calculation_scenario'] == 'optimize':
+        df_input_prod = df_input.loc[df_input['fond'] == 'ДОБ']
+        map_tasks = well_map_tasks(df_input_prod, dict_result)
+        if dict_parameters['html_maps']:
+            map_tasks = list(map_tasks)
+        visualization(df_input_prod, dict_result, map_tasks)
+    else:
+        map_tasks = mesh_map_tasks(df_out_contour, dict_result)
+        if dict_parameters['html_maps']:
+            map_tasks = list(map_tasks)
+        mesh_visualization(df_out_contour, dict_result, map_tasks)
+    if dict_parameters['html_maps']:
+        # интерактивные карты по тем же слоям, что и картинки
+        html_maps(map_tasks)
+
+    if excel_thread is None:
+        # Start print in Excel
+        write_excel(*excel_args, **excel_kwargs)
+    else:
+        excel_thread.join()
+
+    # Coverage curves and first row comparison by contours_____________________________________________________________
+    for contour_name, dict_report in (dict_reports or {}).items():
+        if 'coverage_curve' in dict_report:
+            write_coverage_curve(dict_report['coverage_curve'], contour_name)
+            curve_visualization(dict_report['coverage_curve'], contour_name)
+        if 'first_row' in dict_report:
+            write_first_row_comparison(dict_report['first_row'], contour_name)
+
+    # Export results to Parquet/GeoPackage/GeoJSON____________________________________________________________________
+    if dict_parameters['export_formats']:
+        export_results(df_input, dict_result, dict_parameters['export_formats'])
+    pass
+
+
+def func_main(path_parameters='conf_files/parameters.yml', application_path=None):
+    """
+    Расчет опорной сети по параметрам из файла: загрузка данных, расчет по контурам и вне контуров, сохранение
+    расчета (output/run) и выгрузка результатов (write_results)
+    :param path_parameters: путь к файлу параметров расчета
+    :param application_path: папка с папкой контуров contours, если None - папка программы (get_path)
+    :return: функция сохраняет результаты в папку output
+    """
     # Upload parameters
-    dict_parameters = upload_parameters('conf_files/parameters.yml')
+    dict_parameters = upload_parameters(path_parameters)
+    set_geometry_threads(dict_parameters['geometry_threads'])
+    set_render_processes(dict_parameters['render_processes'], dict_parameters['render_memory'],
+                         dict_parameters['render_cache'])
 
     # Upload files and initial data preparation_________________________________________________________________________
     df_input, date, list_exception = upload_input_data(dict_constant, dict_parameters)
@@ -31,8 +123,12 @@ if __name__ == '__main__':
         df_input = upload_gdis_data(df_input, date, dict_parameters)
 
     # add logs to file
-    logger.add('output/logfile.log', level='INFO', format="{message}")
+    log_id = logger.add('output/logfile.log', level='INFO', format="{message}")
     logger.info("Starting calculation")
+
+    # граф соседей по месторождению, общий для всех контуров и объектов
+    logger.info("Neighbour graph of wells")
+    graph = neighbour_graph(df_input, dict_parameters['max_distance'])
     # path to file with properties for current object
     logger.info("Checking for properties")
     path_property = 'conf_files/reservoir_properties.json'
@@ -43,23 +139,32 @@ if __name__ == '__main__':
 
     # path to folder with contours
     logger.info("CHECKING FOR CONTOURS")
-    application_path = get_path()
+    if application_path is None:
+        application_path = get_path()
     logger.info(f"path: {application_path}")
     logger.info("check the content of contours")
 
     # get path and names of contour files with coordinates
-    contours_path = application_path + "\\contours"
+    contours_path = os.path.join(application_path, "contours")
     contours_content = os.listdir(path=contours_path)
 
     well_out_contour = set(df_input.wellName.values)
     dict_result = {}
+    dict_reports = {}
     list_wells_in_contour = []
 
+    # фоновая запись в Excel начинается до расчета: листы пишутся по мере расчета контуров, отчет - последним
+    result_queue, excel_thread = None, None
+    if dict_parameters['excel_background']:
+        result_queue = Queue()
+        write_excel, excel_args, excel_kwargs = excel_writer(df_input, {}, dict_parameters, result_queue)
+        excel_thread = write_in_background(write_excel, *excel_args, **excel_kwargs)
+
     if contours_content:
         logger.info(f"contours: {len(contours_content)}")
         for contour in contours_content:
             contour_name = contour.replace(".txt", "")
-            contour_path = contours_path + f"\\{contour}"
+            contour_path = os.path.join(contours_path, contour)
             polygon = load_contour(contour_path)
             df_points = gpd.GeoDataFrame(df_input, geometry="POINT")
             wells_in_contour = set(check_intersection_area(polygon, df_points,
@@ -69,8 +174,12 @@ if __name__ == '__main__':
             if df_in_contour.empty:
                 continue
 
-            dict_result.update(calculation(polygon, df_in_contour, contour_name, path_property,
-                                           list_exception, dict_parameters))
+            result, reports = calculation(polygon, df_in_contour, contour_name, path_property,
+                                          list_exception, dict_parameters, graph)
+            dict_result.update(result)
+            if result_queue is not None:
+                result_queue.put(result)
+            dict_reports.update(reports)
             well_out_contour = well_out_contour.difference(wells_in_contour)
 
     else:
@@ -82,20 +191,46 @@ if __name__ == '__main__':
     if not df_out_contour.empty:
         contour_name = 'out_contour'
         # расчет для скважин вне контура
-        dict_result.update(calculation(polygon, df_out_contour, contour_name, path_property,
-                                       list_exception, dict_parameters))
-
-    # MAP drawing_____________________________________________________________________________________________________
-    if dict_parameters['calculation_scenario'] == 'optimize':
-        df_input_prod = df_input.loc[df_input['fond'] == 'ДОБ']
-        visualization(df_input_prod, dict_parameters['percent'], dict_result)
-        # Start print in Excel
-        write_to_excel(dict_parameters['percent'], df_input, dict_result, **dict_constant)
-    else:
-        mesh_visualization(df_out_contour, dict_result)
-        # Start print in Excel
-        write_cluster_mesh(df_input, dict_result, dict_parameters['percent'])
+        result, reports = calculation(polygon, df_out_contour, contour_name, path_property,
+                                      list_exception, dict_parameters, graph)
+        dict_result.update(result)
+        dict_reports.update(reports)
+        if result_queue is not None:
+            result_queue.put(result)
+    if result_queue is not None:
+        # все контуры рассчитаны, запись завершается листом отчета
+        result_queue.put(None)
+
+    # сохранение расчета для повторного построения карт и отчетов (render.py)
+    save_run('output/run', df_input, df_out_contour, dict_result, dict_parameters, dict_reports)
+    write_results(df_input, df_out_contour, dict_result, dict_parameters, dict_reports, excel_thread)
 
     logger.info("End of calculation")
+    logger.remove(log_id)
 
     pass
+
+
+def calculation_process(queue, path_parameters='conf_files/parameters.yml'):
+    """
+    Расчет в отдельном процессе для окна программы (design.py): сообщения журнала расчета передаются в очередь,
+    окно не блокируется на время расчета. Карты строятся без окон (backend Agg)
+    :param queue: очередь multiprocessing для сообщений журнала
+    :param path_parameters: путь к файлу параметров расчета
+    :return: None
+    """
+    init_render_process()
+    # сообщение передается вместе с текстом ошибки, если она есть
+    logger.add(lambda message: queue.put(str(message)), level='INFO', format="{message}")
+    try:
+        func_main(path_parameters)
+    except Exception:
+        logger.exception("Calculation error")
+        raise
+    pass
+
+
+if __name__ == '__main__':
+    # процессы построения карт запускаются и из собранного .exe
+    multiprocessing.freeze_support()
+    func_main()
@@ -0,0 +1,445 @@
+import hashlib
+import json
+import multiprocessing
+import os
+from collections import deque
+
+import matplotlib
+import numpy as np
+import shapely
+from loguru import logger
+from matplotlib.artist import Artist
+from matplotlib.collections import LineCollection, PathCollection
+from matplotlib.figure import Figure
+from matplotlib.font_manager import FontProperties
+from matplotlib.path import Path
+from matplotlib.transforms import offset_copy
+from tqdm import tqdm
+
+# примерный объем памяти одного процесса построения карты 20x20 дюймов при dpi=200 (буфер 4000x4000 RGBA,
+# геометрии объекта и библиотеки), Мб
+FIGURE_MEMORY = 500
+# настройки пула процессов построения карт (задаются из parameters.yml через set_render_processes)
+RENDER_POOL = {'processes': 1, 'memory': None, 'tasks_per_process': 50, 'cache': True}
+# версия оформления карт: входит в хэш задания карты, увеличить при изменении построения карт
+# (map_render, mapping, html_map), чтобы карты из кэша построились заново
+RENDER_VERSION = 1
+# файл кэша построения в папке карт: {имя файла карты: хэш задания}
+RENDER_CACHE_FILE = 'render_cache.json'
+# фигура текущего процесса, переиспользуется между картами
+RENDER_FIGURE = {}
+# средняя ширина символа подписи в долях размера шрифта (для проверки наложения подписей)
+LABEL_CHAR_WIDTH = 0.6
+
+
+def set_render_processes(processes, memory=None, cache=True):
+    """
+    Настройка пула процессов построения карт
+    :param processes: кол-во процессов (1 - построение в основном процессе, None - по числу ядер процессора)
+    :param memory: память под процессы построения, Мб: кол-во процессов уменьшается до memory // FIGURE_MEMORY
+    (оценка, фактическая память процессов не ограничивается), None - кол-во процессов не уменьшается
+    :param cache: не перестраивать карты, задания которых не изменились с прошлого построения
+    :return: кол-во процессов с учетом ограничения памяти
+    """
+    processes = max(int(processes if processes is not None else (os.cpu_count() or 1)), 1)
+    if memory is not None:
+        processes = max(min(processes, int(memory) // FIGURE_MEMORY), 1)
+    RENDER_POOL['processes'] = processes
+    RENDER_POOL['memory'] = memory
+    RENDER_POOL['cache'] = cache
+    return processes
+
+
+def render_maps(draw, tasks, description, folder=None):
+    """
+    Построение карт по заданиям: в основном процессе или в пуле процессов (backend Agg, без окон).
+    Задания передаются в пул по мере построения: одновременно готовится не больше двух заданий на процесс,
+    поэтому в памяти нет заданий по всем картам. Процесс пула перезапускается после tasks_per_process карт.
+    Если задана папка карт, карта строится только при изменении хэша задания (task_hash) с прошлого построения,
+    после построения из папки удаляются файлы, которых нет среди заданий
+    :param draw: функция построения одной карты по заданию (должна импортироваться из модуля)
+    :param tasks: итерируемый объект с заданиями (словари с массивами для карты)
+    :param description: подпись индикатора выполнения
+    :param folder: папка карт с кэшем построения (None - карты строятся все, папка не очищается)
+    :return: кол-во построенных карт
+    """
+    processes = RENDER_POOL['processes']
+    dict_cache = {}
+    if folder is not None:
+        os.makedirs(folder, exist_ok=True)
+        if RENDER_POOL['cache']:
+            dict_cache = load_render_cache(folder)
+    # хэши заданий построенных и неизмененных карт, в кэш записываются и при ошибке построения
+    dict_done = {}
+    tasks = tqdm(tasks, description, position=0, leave=True, colour='white')
+    count = 0
+    try:
+        if processes <= 1:
+            for task, name, key in changed_tasks(draw, tasks, folder, dict_cache, dict_done):
+                draw(task)
+                dict_done[name] = key
+                count += 1
+        else:
+            logger.info(f'Render maps in {processes} processes')
+            # spawn: процессы не наследуют потоки основного процесса (запись Excel в фоне, пул геометрий)
+            context = multiprocessing.get_context('spawn')
+            with context.Pool(processes, initializer=init_render_process,
+                              maxtasksperchild=RENDER_POOL['tasks_per_process']) as pool:
+                pending = deque()
+                for task, name, key in changed_tasks(draw, tasks, folder, dict_cache, dict_done):
+                    pending.append((name, key, pool.apply_async(draw, (task,))))
+                    if len(pending) >= 2 * processes:
+                        name, key, result = pending.popleft()
+                        result.get()
+                        dict_done[name] = key
+                        count += 1
+                while pending:
+                    name, key, result = pending.popleft()
+                    result.get()
+                    dict_done[name] = key
+                    count += 1
+    finally:
+        if folder is not None:
+            save_render_cache(folder, dict_done)
+    if folder is not None:
+        remove_stale_files(folder, dict_done)
+        logger.info(f'{description}: built {count}, unchanged {len(dict_done) - count}')
+    return count
+
+
+def changed_tasks(draw, tasks, folder, dict_cache, dict_done):
+    """
+    Задания карт, которые нужно построить: карта, файл которой есть, а хэш задания совпадает с кэшем,
+    пропускается и сразу отмечается построенной
+    :param draw: функция построения карты
+    :param tasks: итерируемый объект с заданиями
+    :param folder: папка карт (None - без кэша, строятся все задания)
+    :param dict_cache: кэш прошлого построения {имя файла: хэш задания}
+    :param dict_done: словарь построенных карт, дополняется неизмененными картами
+    :return: генератор (задание, имя файла, хэш задания)
+    """
+    for task in tasks:
+        if folder is None:
+            yield task, None, None
+            continue
+        name = os.path.basename(task['path'])
+        key = task_hash(draw, task)
+        if dict_cache.get(name) == key and os.path.exists(task['path']):
+            dict_done[name] = key
+            continue
+        yield task, name, key
+
+
+def task_hash(draw, task):
+    """
+    Хэш задания карты: содержимое слоев (геометрия в WKB, массивы и подписи), заголовок и легенда,
+    функция построения, версия оформления и matplotlib. Путь к файлу в хэш не входит
+    :param draw: функция построения карты
+    :param task: задание карты
+    :return: хэш (строка sha256)
+    """
+    digest = hashlib.sha256(f'{RENDER_VERSION}|{matplotlib.__version__}|{draw.__module__}.{draw.__qualname__}'
+                            .encode())
+    update_hash(digest, {key: value for key, value in task.items() if key != 'path'})
+    return digest.hexdigest()
+
+
+def update_hash(digest, value):
+    """
+    Добавление значения задания карты в хэш: словари, списки и кортежи обходятся рекурсивно по элементам,
+    геометрии переводятся в WKB, числовые массивы добавляются типом, размерностью и байтами, элементы массивов
+    объектов - каждый по отдельности. repr используется только для скаляров (repr массивов и геометрий
+    сокращается и не отражает изменение отдельных элементов)
+    :param digest: объект hashlib
+    :param value: значение
+    :return: None
+    """
+    if isinstance(value, dict):
+        digest.update(f'{{{len(value)}'.encode())
+        for key in sorted(value, key=str):
+            update_bytes(digest, repr(key).encode())
+            update_hash(digest, value[key])
+        digest.update(b'}')
+    elif isinstance(value, (list, tuple)):
+        digest.update(f'({type(value).__name__}{len(value)}'.encode())
+        for x in value:
+            update_hash(digest, x)
+        digest.update(b')')
+    elif isinstance(value, np.ndarray) and value.dtype == object:
+        digest.update(f'[object{value.shape}'.encode())
+        values = value.ravel()
+        is_geometry = shapely.is_geometry(values)
+        wkb = np.full(len(values), None, dtype=object)
+        wkb[is_geometry] = shapely.to_wkb(values[is_geometry])
+        for x, data in zip(values, wkb):
+            if data is None:
+                update_hash(digest, x)
+            else:
+                update_bytes(digest, data)
+        digest.update(b']')
+    elif isinstance(value, np.ndarray):
+        digest.update(f'[{value.dtype.str}{value.shape}'.encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+        digest.update(b']')
+    elif isinstance(value, shapely.Geometry):
+        update_bytes(digest, shapely.to_wkb(value))
+    else:
+        update_bytes(digest, repr(value).encode())
+    pass
+
+
+def update_bytes(digest, data):
+    """
+    Добавление в хэш байтов с их длиной, чтобы соседние значения не сливались ('1', '23' и '12', '3')
+    :param digest: объект hashlib
+    :param data: байты
+    :return: None
+    """
+    digest.update(len(data).to_bytes(8, 'little') + data)
+    pass
+
+
+def load_render_cache(folder):
+    """
+    Кэш прошлого построения карт папки
+    :param folder: папка карт
+    :return: словарь {имя файла карты: хэш задания} (пустой, если кэша нет или он поврежден)
+    """
+    try:
+        with open(os.path.join(folder, RENDER_CACHE_FILE), encoding='utf-8') as f:
+            return dict(json.load(f))
+    except (OSError, ValueError, TypeError):
+        return {}
+
+
+def save_render_cache(folder, dict_cache):
+    """
+    Запись кэша построения карт папки
+    :param folder: папка карт
+    :param dict_cache: словарь {имя файла карты: хэш задания}
+    :return: None
+    """
+    with open(os.path.join(folder, RENDER_CACHE_FILE), 'w', encoding='utf-8') as f:
+        json.dump(dict_cache, f, ensure_ascii=False, indent=0)
+    pass
+
+
+def remove_stale_files(folder, dict_done):
+    """
+    Удаление из папки карт файлов, которых нет среди заданий последнего построения (карты прошлых расчетов)
+    :param folder: папка карт
+    :param dict_done: словарь построенных и неизмененных карт {имя файла: хэш задания}
+    :return: None
+    """
+    for f in os.listdir(folder):
+        path = os.path.join(folder, f)
+        if f not in dict_done and f != RENDER_CACHE_FILE and os.path.isfile(path):
+            os.remove(path)
+    pass
+
+
+def init_render_process():
+    """
+    Инициализация процесса построения карт: построение без окон (backend Agg)
+    :return: None
+    """
+    matplotlib.use('Agg')
+    pass
+
+
+def map_figure(figsize=(20, 20)):
+    """
+    Фигура для построения карты: одна на процесс, перед каждой картой очищается. Фигура создается без pyplot,
+    поэтому не регистрируется в менеджере фигур и не накапливается в памяти
+    :param figsize: размер фигуры, дюймы
+    :return: фигура и оси карты
+    """
+    figure = RENDER_FIGURE.get('figure')
+    if figure is None:
+        figure = RENDER_FIGURE['figure'] = Figure(figsize=figsize)
+    figure.clear()
+    figure.set_size_inches(figsize)
+    return figure, figure.add_subplot()
+
+
+def save_figure(figure, path, dpi=200):
+    """
+    Сохранение карты и освобождение элементов фигуры
+    :param figure: фигура карты
+    :param path: путь к файлу
+    :param dpi: разрешение
+    :return: None
+    """
+    figure.savefig(path, dpi=dpi)
+    figure.clear()
+    pass
+
+
+def draw_areas(ax, geometries, color, edgecolor, ls='-'):
+    """
+    Зоны охвата одним слоем: заливка одной коллекцией контуров (PathCollection) и граница одной коллекцией линий
+    (LineCollection), построенными по массивам координат. Вид как у GeoSeries.plot и GeoSeries.boundary.plot
+    :param ax: оси карты
+    :param geometries: массив полигонов
+    :param color: цвет заливки
+    :param edgecolor: цвет границы
+    :param ls: тип линии границы
+    :return: None
+    """
+    paths, segments = polygon_paths(geometries)
+    if not paths:
+        return
+    ax.add_collection(PathCollection(paths, facecolor=color), autolim=True)
+    ax.add_collection(LineCollection(segments, color=edgecolor, ls=ls), autolim=True)
+    pass
+
+
+def draw_lines(ax, geometries, color):
+    """
+    Линии (границы полигонов, траектории скважин) одной коллекцией линий
+    :param ax: оси карты
+    :param geometries: массив геометрий (полигоны рисуются границами)
+    :param color: цвет линий
+    :return: None
+    """
+    geometries = geometry_parts(geometries)
+    is_polygon = shapely.get_type_id(geometries) == 3
+    segments = coordinate_parts(geometries[~is_polygon]) + polygon_paths(geometries[is_polygon])[1]
+    if segments:
+        ax.add_collection(LineCollection(segments, color=color), autolim=True)
+    pass
+
+
+def draw_wells(ax, geometries, color, marker='o', markersize=14):
+    """
+    Скважины: траектории горизонтальных скважин одной коллекцией линий, точки одной коллекцией маркеров (scatter)
+    :param ax: оси карты
+    :param geometries: массив точек и линий
+    :param color: цвет
+    :param marker: маркер точек
+    :param markersize: размер маркеров
+    :return: None
+    """
+    geometries = geometry_parts(geometries)
+    is_point = shapely.get_type_id(geometries) == 0
+    draw_lines(ax, geometries[~is_point], color)
+    if is_point.any():
+        ax.scatter(shapely.get_x(geometries[is_point]), shapely.get_y(geometries[is_point]), s=markersize,
+                   color=color, marker=marker)
+    pass
+
+
+def draw_labels(ax, list_labels, fontsize=6):
+    """
+    Подписи скважин одним слоем (LabelLayer) после построения всех слоев: подписи проверяются на наложение
+    в координатах рисунка, подпись, которая накладывается на уже размещенную, не выводится.
+    Порядок слоев задает приоритет
+    :param ax: оси карты
+    :param list_labels: слои подписей (словари с массивами x, y, label и цветом color) в порядке приоритета
+    :param fontsize: размер шрифта
+    :return: кол-во выведенных подписей
+    """
+    ax.autoscale_view()
+    ax.apply_aspect()
+    figure = ax.get_figure()
+    offset = offset_copy(ax.transData, fig=figure, x=3, y=3, units='points')
+    height = fontsize * figure.dpi / 72
+    cell = 4 * height
+    dict_cells = {}
+    list_x, list_y, list_text, list_color = [], [], [], []
+    for layer in list_labels:
+        if not len(layer['label']):
+            continue
+        labels = [str(label) for label in layer['label']]
+        xy = offset.transform(np.column_stack([layer['x'], layer['y']]).astype(float))
+        width = LABEL_CHAR_WIDTH * height * np.array([len(label) for label in labels])
+        for x, y, label, box_width, (px, py) in zip(layer['x'], layer['y'], labels, width, xy):
+            box = (px, py, px + box_width, py + height)
+            list_keys = [(i, j) for i in range(int(box[0] // cell), int(box[2] // cell) + 1)
+                         for j in range(int(box[1] // cell), int(box[3] // cell) + 1)]
+            if any(box[0] < other[2] and other[0] < box[2] and box[1] < other[3] and other[1] < box[3]
+                   for key in list_keys for other in dict_cells.get(key, [])):
+                continue
+            for key in list_keys:
+                dict_cells.setdefault(key, []).append(box)
+            list_x.append(x)
+            list_y.append(y)
+            list_text.append(label)
+            list_color.append(layer['color'])
+    if list_text:
+        ax.add_artist(LabelLayer(list_x, list_y, list_text, list_color, fontsize, offset))
+    return len(list_text)
+
+
+class LabelLayer(Artist):
+    """
+    Слой подписей: все подписи рисуются одним элементом рисунка напрямую через renderer.draw_text, без отдельного
+    matplotlib.text.Text на каждую скважину. Подпись выравнивается как у ax.annotate по умолчанию
+    (левый край по базовой линии со смещением transform)
+    """
+    zorder = 3
+
+    def __init__(self, x, y, labels, colors, fontsize, transform):
+        super().__init__()
+        self.xy = np.column_stack([x, y]).astype(float)
+        self.labels = labels
+        self.colors = colors
+        self.prop = FontProperties(size=fontsize)
+        self.set_transform(transform)
+
+    def draw(self, renderer):
+        if not self.get_visible():
+            return
+        gc = renderer.new_gc()
+        self._set_gc_clip(gc)
+        gc.set_antialiased(matplotlib.rcParams['text.antialiased'])
+        xy = self.get_transform().transform(self.xy)
+        if renderer.flipy():
+            xy[:, 1] = renderer.get_canvas_width_height()[1] - xy[:, 1]
+        for (px, py), label, color in zip(xy, self.labels, self.colors):
+            gc.set_foreground(color)
+            renderer.draw_text(gc, px, py, label, self.prop, 0)
+        gc.restore()
+        self.stale = False
+
+
+def polygon_paths(geometries):
+    """
+    Контуры полигонов для коллекции: контур полигона - составной путь из внешнего и внутренних колец
+    (как в geopandas), координаты берутся одним вызовом shapely для всего массива
+    :param geometries: массив полигонов/мультиполигонов
+    :return: список контуров (Path) и список массивов координат колец для границ
+    """
+    geometries = geometry_parts(geometries)
+    rings, ring_polygon = shapely.get_rings(geometries, return_index=True)
+    coords, coord_ring = shapely.get_coordinates(rings, return_index=True)
+    ring_bounds = np.searchsorted(coord_ring, np.arange(len(rings) + 1))
+    codes = np.full(len(coords), Path.LINETO, dtype=Path.code_type)
+    codes[ring_bounds[:-1]] = Path.MOVETO
+    polygon_bounds = ring_bounds[np.searchsorted(ring_polygon, np.arange(len(geometries) + 1))]
+    paths = [Path(coords[start:end], codes[start:end])
+             for start, end in zip(polygon_bounds[:-1], polygon_bounds[1:])]
+    return paths, np.split(coords, ring_bounds[1:-1]) if len(rings) else []
+
+
+def coordinate_parts(geometries):
+    """
+    Массивы координат линий для LineCollection
+    :param geometries: массив линий
+    :return: список массивов координат (n, 2)
+    """
+    if not len(geometries):
+        return []
+    coords, index = shapely.get_coordinates(geometries, return_index=True)
+    return np.split(coords, np.searchsorted(index, np.arange(1, len(geometries))))
+
+
+def geometry_parts(geometries):
+    """
+    Простые геометрии массива: мультигеометрии раскладываются на части, пустые значения отбрасываются
+    :param geometries: массив геометрий
+    :return: массив простых непустых геометрий
+    """
+    geometries = np.asarray(geometries, dtype=object)
+    geometries = shapely.get_parts(geometries[~shapely.is_missing(geometries)])
+    return geometries[~shapely.is_empty(geometries)]
@@ -1,302 +1,312 @@
-import os
-
-import geopandas as gpd
 import matplotlib.patches as mpatches
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 from loguru import logger
 from matplotlib.lines import Line2D
-from tqdm import tqdm
 
-from geometry import check_intersection_area
+from map_render import draw_areas, draw_labels, draw_lines, draw_wells, map_figure, render_maps, save_figure
+from well_registry import get_intersection_ids, select_contour
 
+# задание типов линий и цветов зон по годам исследования
+TYPE_LINES = {0: "-", 1: ":", 2: "-."}
+COLORS_PIEZ = {0: "darkgreen", 1: "green", 2: "limegreen"}
+COLORS_INJ = {0: "lightseagreen", 1: "turquoise", 2: "lightskyblue"}
+COLORS_PROD = {0: "orangered", 1: "tomato", 2: "coral"}
+# названия слоев по годам исследования (для интерактивной карты): 2 и 3 год - исследования скважин в слепых зонах
+YEAR_NAMES = {0: 'текущий год', 1: '2 год', 2: '3 год'}
 
-def clean_pictures_folder(path):
-    """
-    Функция очищает папку с рисунками предыдущего расчета
-    :param path: путь к папке с рисунками
-    :return: не возвращает объектов, удаляет содержимое папки
-    """
-    for f in os.listdir(path):
-        os.remove(os.path.join(path, f))
-    pass
 
-
-def visualization(df_input_prod, percent, dict_result):
+def visualization(df_input_prod, dict_result, map_tasks=None):
     """
     Функция визуализации полученных результатов
-    :param percent: процент длины траектории скважины, при котором она попадает в контур
     :param df_input_prod: DataFrame продуктивных скважин из исходного файла
     :param dict_result: словарь для записи результатов
+    :param map_tasks: готовые задания карт (well_map_tasks), если None - задания строятся здесь
     :return: Сохраняет график, построенный по итерируемому объекту, в указанную директорию
     """
-    # удаление старых графиков
-    logger.info("Clean pictures folder")
-    clean_pictures_folder('output/pictures/')
+    if map_tasks is None:
+        map_tasks = well_map_tasks(df_input_prod, dict_result)
+    # строятся только карты с измененными данными, карты прошлых расчетов удаляются
+    render_maps(draw_map, map_tasks, "Mapping for objects", 'output/pictures')
+    pass
+
 
+def well_map_tasks(df_input_prod, dict_result):
+    """
+    Задания для карт опорной сети: по каждому сценарию и объекту из результата и исходных данных отбираются
+    только массивы, нужные для карты объекта
+    :param df_input_prod: DataFrame продуктивных скважин из исходного файла
+    :param dict_result: словарь результатов расчета
+    :return: генератор заданий для draw_map
+    """
+    dict_horizon = horizon_positions(df_input_prod)
     for key, value in dict_result.items():
         mult_coef = float(list(key.replace(' = ', ', ').split(', '))[2])
         contour_name = list(key.replace(' = ', ', ').split(', '))[0]
         logger.info(f'Plot for {contour_name} with k = {mult_coef}')
 
         polygon = value[1]
+        contour_ids = value[2]
         df_result = value[0]
         if df_result.empty:
             continue
         list_objects = df_result.workHorizon.str.split(', ').explode().unique()
 
-        for horizon in tqdm(list_objects, "Mapping for objects", position=0, leave=True, colour='white'):
-            hor_prod_wells = df_input_prod[
-                list(map(lambda x: len(set(x.replace(" ", "").split(",")) & set([horizon])) > 0,
-                         df_input_prod.workHorizon))]
-            try:
-                contour_prod_wells = hor_prod_wells[hor_prod_wells.wellName.isin(
-                    set(check_intersection_area(polygon, hor_prod_wells, percent, calc_option=True)))]
-            except TypeError:
-                # из всего загруженного добывающего фонда отбираются скважины из столбца пересечений df_result, а также
-                # идет отбор по текущему объекту расчета
-                contour_prod_wells = hor_prod_wells[
-                    hor_prod_wells["wellName"].isin(list(
-                        set(df_result[df_result['current_horizon'] == horizon]["intersection"].explode().unique())))]
+        for horizon in list_objects:
             df_current_calc = df_result.loc[df_result.current_horizon == horizon]
-            # division production wells on two parts
-            list_exception = list(set(
-                df_current_calc[df_current_calc['intersection'].map(str) == 'Не охвачены исследованием!!!'].wellName))
-            contour_prod_nonexception = list(set(contour_prod_wells.wellName.explode().unique()).difference(
-                set(list_exception)))
-            contour_prod_exception = list(set(contour_prod_wells.wellName.explode().unique())
-                                          .intersection(set(list_exception)))
-            df_prod_nonexception = contour_prod_wells[contour_prod_wells['wellName'].isin(contour_prod_nonexception)]
-            df_prod_exception = contour_prod_wells[contour_prod_wells['wellName'].isin(contour_prod_exception)]
-
             if df_current_calc.empty:
                 continue
-
+            hor_prod_wells = df_input_prod.iloc[dict_horizon.get(horizon, np.empty(0, dtype=int))]
+            if contour_ids is not None:
+                # добывающие скважины контура по индексу, сохраненному в результате расчета
+                contour_prod_wells = select_contour(hor_prod_wells, contour_ids)
             else:
-                mean_radius = df_current_calc.iloc[0]['mean_radius']
-            # задание типов линий по годам исследования
-            type_lines = {0: "-", 1: ":", 2: "-."}
-            colors_piez = {0: "darkgreen", 1: "green", 2: "limegreen"}
-            colors_inj = {0: "lightseagreen", 1: "turquoise", 2: "lightskyblue"}
-            colors_prod = {0: "orangered", 1: "tomato", 2: "coral"}
+                # из всего загруженного добывающего фонда отбираются скважины из столбца пересечений df_result, а также
+                # идет отбор по текущему объекту расчета
+                contour_prod_wells = hor_prod_wells[hor_prod_wells["well_id"].isin(get_intersection_ids(
+                    df_current_calc["intersection"]))]
+            # division production wells on two parts
+            list_exception = set(
+                df_current_calc[df_current_calc['intersection'].map(str) == 'Не охвачены исследованием!!!'].wellName)
+            is_exception = contour_prod_wells['wellName'].isin(list_exception)
+            df_prod_nonexception = contour_prod_wells[~is_exception]
+            df_prod_exception = contour_prod_wells[is_exception]
+            mean_radius = df_current_calc.iloc[0]['mean_radius']
+
+            list_layers = []
             years_list = [0]
             if mult_coef > 1.5:
                 years_list += [1, 2]
             for year in years_list:
-                try:
+                df_current_year = df_current_calc
+                if 'year_of_survey' in df_current_calc:
                     df_current_year = df_current_calc[df_current_calc['year_of_survey'] == year]
-                    if df_current_year.empty:
-                        continue
-                except KeyError:
-                    df_current_year = df_current_calc
-
                 if df_current_year.empty:
                     continue
-
-                # geodataframe
-                gdf_measuring_wells = gpd.GeoDataFrame(df_current_year)
-                gdf_piez = gdf_measuring_wells.loc[gdf_measuring_wells['fond'] == 'ПЬЕЗ']
-                gdf_inj = gdf_measuring_wells.loc[gdf_measuring_wells['fond'] == 'НАГ']
-                gdf_prod = gdf_measuring_wells.loc[gdf_measuring_wells['fond'] == 'ДОБ']
-                if year == 0:
-                    ax = gpd.GeoSeries(gdf_piez.AREA).plot(color="springgreen", figsize=[20, 20])
-                else:
-                    # Piezometric well areas drawing
-                    gpd.GeoSeries(gdf_piez.AREA).plot(ax=ax, color="springgreen")
-                gpd.GeoSeries(gdf_piez.AREA).boundary.plot(ax=ax, ls=type_lines[year],
-                                                           color=colors_piez[year])
-
-                # production well areas drawing
-                gpd.GeoSeries(gdf_prod[~(gdf_prod['wellName'].isin(list_exception))]["AREA"]).plot(ax=ax,
-                                                                                                   color="lightsalmon")
-                gpd.GeoSeries(gdf_prod[~(gdf_prod['wellName'].isin(list_exception))]["AREA"]).boundary.plot(ax=ax, ls=
-                type_lines[year],
-                                                                                                            color=
-                                                                                                            colors_prod[
-                                                                                                                year])
-
-                # Injection well areas drawing
-                gpd.GeoSeries(gdf_inj["AREA"]).plot(ax=ax, color="azure")
-                gpd.GeoSeries(gdf_inj["AREA"]).boundary.plot(ax=ax, ls=type_lines[year],
-                                                             color=colors_inj[year])
-
+                df_piez = df_current_year.loc[df_current_year['fond'] == 'ПЬЕЗ']
+                df_inj = df_current_year.loc[df_current_year['fond'] == 'НАГ']
+                df_prod = df_current_year.loc[df_current_year['fond'] == 'ДОБ']
+                df_prod = df_prod[~df_prod['wellName'].isin(list_exception)]
+                list_layers += [area_layer(df_piez, "springgreen", COLORS_PIEZ[year], TYPE_LINES[year],
+                                           f'Пьезометры, {YEAR_NAMES[year]}'),
+                                area_layer(df_prod, "lightsalmon", COLORS_PROD[year], TYPE_LINES[year],
+                                           f'Добывающие(с исследованием), {YEAR_NAMES[year]}'),
+                                area_layer(df_inj, "azure", COLORS_INJ[year], TYPE_LINES[year],
+                                           f'Нагнетательные, {YEAR_NAMES[year]}')]
+            if polygon is not None:
                 # Boundary contour
-                gpd.GeoSeries(polygon).boundary.plot(ax=ax, color='saddlebrown')
-
-            # Signature of piezometric wells
-            gdf_measuring_all = gpd.GeoDataFrame(df_current_calc)
-            for x, y, label in zip(gdf_measuring_all.coordinateX.values,
-                                   gdf_measuring_all.coordinateY.values,
-                                   gdf_measuring_all.wellName):
-                ax.annotate(label, xy=(x, y), xytext=(3, 3), textcoords="offset points", color="red", fontsize=6)
-            # Signature of production wells
-            for x, y, label in zip(df_prod_nonexception.coordinateX.values,
-                                   df_prod_nonexception.coordinateY.values,
-                                   df_prod_nonexception.wellName):
-                ax.annotate(label, xy=(x, y), xytext=(3, 3), textcoords="offset points", color="navy", fontsize=6)
-            # Signature of excluded production wells
-            if len(contour_prod_exception):
-                for x, y, label in zip(df_prod_exception.coordinateX.values,
-                                       df_prod_exception.coordinateY.values,
-                                       df_prod_exception.wellName):
-                    ax.annotate(label, xy=(x, y), xytext=(3, 3), textcoords="offset points", color="navy", fontsize=6)
-            # Trajectory of wells
-            contour_prod_wells = contour_prod_wells.set_geometry(contour_prod_wells["GEOMETRY"])
-            contour_prod_wells.plot(ax=ax, color="black", markersize=14)
-            gdf_measuring_all = gdf_measuring_all.set_geometry(df_result["GEOMETRY"])
-            gdf_measuring_all.plot(ax=ax, color="blue", markersize=14, marker="^")
-
-            # Black points is production, blue triangle is piezometric
-            df_prod_nonexception = df_prod_nonexception.set_geometry(df_prod_nonexception["POINT"])
-            df_prod_nonexception.plot(ax=ax, color="black", markersize=14)
-            gdf_measuring_all = gdf_measuring_all.set_geometry(df_result["POINT"])
-            gdf_measuring_all.plot(ax=ax, color="blue", markersize=14, marker="^")
-            if len(contour_prod_exception):
-                df_prod_exception = df_prod_exception.set_geometry(df_prod_exception["POINT"])
-                df_prod_exception.plot(ax=ax, color="gray", markersize=14)
-                df_prod_exception = df_prod_exception.set_geometry(df_prod_exception["GEOMETRY"])
-                df_prod_exception.plot(ax=ax, color="gray", markersize=14, marker="^")
-
-            piez = mpatches.Patch(color='black', fc='springgreen', label='Пьезометры')
-            inj = mpatches.Patch(color='black', fc='azure', label='Нагнетательные')
-            prod = mpatches.Patch(color='black', fc='lightsalmon', label='Добыващие(с исследованием)')
-            piez_point = Line2D([0], [0], marker='^', color='white', label='Скважины опорной сети',
-                                markerfacecolor='blue', markersize=14)
-            prod_point = Line2D([0], [0], marker='.', color='white', label='Добывающий фонд',
-                                markerfacecolor='black', markersize=14)
-            prod_point_exception = Line2D([0], [0], marker='.', color='white', label='Не охвачены исследованием',
-                                          markerfacecolor='gray', markersize=14)
-            line_1_year = Line2D([0], [0], color='gray', linestyle="-", lw=1, label='Исследования на текущий год')
-            line_2_year = Line2D([0], [0], color='gray', linestyle=":", lw=1, label='На 2 год')
-            line_3_year = Line2D([0], [0], color='gray', linestyle="-.", lw=1, label='На 3 год')
-
-            if polygon is None:
-                plt.legend(
-                    handles=[piez, inj, prod, piez_point, prod_point, prod_point_exception, line_1_year, line_2_year,
-                             line_3_year])
-                plt.savefig(
-                    f'output/pictures/{horizon.replace('/', '_')}, out contour, R = {int(mean_radius)}, k = {mult_coef}.png',
-                    dpi=200)
-                plt.title(
-                    f'Объект: {horizon.replace('/', '_')}, out contour, (R = {int(mean_radius)}, k = {mult_coef})')
-
-            else:
-                plt.legend(
-                    handles=[piez, inj, prod, piez_point, prod_point, prod_point_exception, line_1_year, line_2_year,
-                             line_3_year])
-                plt.savefig(
-                    f'output/pictures/{horizon.replace('/', '_')}, {contour_name}, R = {int(mean_radius)}, k = {mult_coef}.png',
-                    dpi=200)
-                plt.title(
-                    f'Объект: {horizon.replace('/', '_')}, контур: {contour_name}, (R = {int(mean_radius)}, k = {mult_coef})')
-
+                list_layers += [{'kind': 'boundary', 'geometry': [polygon], 'color': 'saddlebrown', 'name': 'Контур'}]
+            # Signature of piezometric and production wells (при наложении выводятся скважины опорной сети)
+            list_layers += [label_layer(df_current_calc, "red", 'Подписи скважин опорной сети'),
+                            label_layer(contour_prod_wells, "navy", 'Подписи добывающих скважин')]
+            # Trajectory of wells, black points is production, blue triangle is piezometric
+            list_layers += [well_layer(contour_prod_wells, 'GEOMETRY', "black", name='Добывающий фонд'),
+                            well_layer(df_current_calc, 'GEOMETRY', "blue", "^", 'Скважины опорной сети'),
+                            well_layer(df_prod_nonexception, 'POINT', "black", name='Добывающий фонд'),
+                            well_layer(df_current_calc, 'POINT', "blue", "^", 'Скважины опорной сети'),
+                            well_layer(df_prod_exception, 'POINT', "gray", name='Не охвачены исследованием'),
+                            well_layer(df_prod_exception, 'GEOMETRY', "gray", "^", 'Не охвачены исследованием')]
+
+            name = 'out contour' if polygon is None else contour_name
+            title = (f'Объект: {horizon.replace('/', '_')}, out contour, (R = {int(mean_radius)}, k = {mult_coef})'
+                     if polygon is None else
+                     f'Объект: {horizon.replace('/', '_')}, контур: {contour_name}, '
+                     f'(R = {int(mean_radius)}, k = {mult_coef})')
+            yield {'layers': list_layers, 'legend': 'optimize', 'title': title,
+                   'path': f'output/pictures/{horizon.replace('/', '_')}, {name}, R = {int(mean_radius)}, '
+                           f'k = {mult_coef}.png'}
+
+
+def mesh_visualization(df_input, dict_mesh, map_tasks=None):
+    """
+    Визуализация регулярной сетки скважин
+    :param df_input: DataFrame скважин
+    :param dict_mesh: словарь результатов расчета регулярной сетки
+    :param map_tasks: готовые задания карт (mesh_map_tasks), если None - задания строятся здесь
+    :return: Сохраняет карты объектов в директорию output/mesh
+    """
+    if map_tasks is None:
+        map_tasks = mesh_map_tasks(df_input, dict_mesh)
+    render_maps(draw_map, map_tasks, "Meshing for objects", 'output/mesh')
     pass
 
 
-def mesh_visualization(df_input, dict_mesh):
-    logger.info("Clean pictures folder")
-    clean_pictures_folder('output/mesh/')
-
+def mesh_map_tasks(df_input, dict_mesh):
+    """
+    Задания для карт регулярной сетки по каждому сценарию и объекту
+    :param df_input: DataFrame скважин
+    :param dict_mesh: словарь результатов расчета регулярной сетки
+    :return: генератор заданий для draw_map
+    """
+    dict_horizon = horizon_positions(df_input)
+    list_objects = df_input.workHorizon.str.split(', ').explode().unique()  # все объекты месторождения
     for key, value in dict_mesh.items():
         mult_coef = float(list(key.replace(' = ', ', ').split(', '))[2])
         contour_name = list(key.replace(' = ', ', ').split(', '))[0]
         df_result = value[0]
         if df_result.empty:
             continue
-        list_objects = df_input.workHorizon.str.split(', ').explode().unique()  # все объекты месторождения
-        # list_objects = ['БС12']
-        for obj in tqdm(list_objects, "Meshing for objects", position=0, leave=True, colour='white'):
+        for obj in list_objects:
             df_result_obj = df_result[df_result['current_horizon'] == obj]
-            gdf_result_obj = gpd.GeoDataFrame(df_result_obj)
-            gdf_piez = gdf_result_obj[df_result_obj['fond'] == 'ПЬЕЗ']
-            gdf_inj = gdf_result_obj[df_result_obj['fond'] == 'НАГ']
-            gdf_prod = gdf_result_obj[df_result_obj['fond'] == 'ДОБ']
-            gdf_research = gpd.GeoDataFrame(df_input[list(map(lambda x: len(set(x.replace(" ", "").split(",")) &
-                                                                            set([obj])) > 0, df_input.workHorizon))])
-            gdf_research = gdf_research[~gdf_research['wellName'].isin(gdf_result_obj['wellName'].explode().unique())]
-            gdf_research = gdf_research.loc[gdf_research['oilRate'] <= gdf_result_obj['mean_oilrate'].iloc[0]]
+            if df_result_obj.empty:
+                continue
+            df_research = df_input.iloc[dict_horizon.get(obj, np.empty(0, dtype=int))]
+            df_research = df_research[~df_research['wellName'].isin(df_result_obj['wellName'].explode().unique())]
+            df_research = df_research.loc[df_research['oilRate'] <= df_result_obj['mean_oilrate'].iloc[0]]
+
+            list_layers = [area_layer(df_result_obj[df_result_obj['fond'] == 'ПЬЕЗ'], "springgreen", "green",
+                                      name='Пьезометры'),
+                           area_layer(df_result_obj[df_result_obj['fond'] == 'НАГ'], "azure", "lightseagreen",
+                                      name='Нагнетательные'),
+                           area_layer(df_result_obj[df_result_obj['fond'] == 'ДОБ'], "lightsalmon", "orangered",
+                                      name='Добыващие(с исследованием)'),
+                           # добавление названий скважин на картинках (при наложении выводятся скважины сетки)
+                           label_layer(df_result_obj, "red", 'Подписи скважин регулярной сети'),
+                           label_layer(df_research, "navy", 'Подписи скважин'),
+                           # построение траекторий скважин
+                           well_layer(df_research, 'POINT', 'black', name='Скважины, охваченные исследованиями'),
+                           well_layer(df_research, 'GEOMETRY', 'black', name='Скважины, охваченные исследованиями'),
+                           well_layer(df_result_obj, 'POINT', 'blue', '^', 'Скважины регулярной сети'),
+                           well_layer(df_result_obj, 'GEOMETRY', 'blue', '^', 'Скважины регулярной сети')]
+            yield {'layers': list_layers, 'legend': 'mesh',
+                   'title': f'Объект: {obj.replace('/', '_')}, {contour_name}, (k = {mult_coef})',
+                   'path': f'output/mesh/MESH {obj.replace('/', '_')}, {contour_name}, k = {mult_coef}.png'}
+
+
+def horizon_positions(df):
+    """
+    Позиции скважин DataFrame по объектам работы (скважина нескольких объектов входит в каждый из них)
+    :param df: DataFrame скважин
+    :return: словарь {объект: массив позиций скважин}
+    """
+    horizons = pd.Series(df['workHorizon'].values).str.replace(" ", "").str.split(",").explode()
+    positions, values = horizons.index.values, horizons.values
+    return {horizon: np.unique(positions[values == horizon]) for horizon in pd.unique(values)}
 
-            ax = gpd.GeoSeries(gdf_piez.AREA).plot(color="springgreen", figsize=[20, 20])
-            gpd.GeoSeries(gdf_piez.AREA).boundary.plot(ax=ax, color="green")
 
-            gpd.GeoSeries(gdf_inj.AREA).plot(ax=ax, color="azure")
-            gpd.GeoSeries(gdf_inj.AREA).boundary.plot(ax=ax, color="lightseagreen")
+def area_layer(df, color, edgecolor, ls='-', name=''):
+    """
+    Слой зон охвата скважин: заливка и граница
+    :param df: DataFrame скважин со столбцом AREA
+    :param color: цвет заливки
+    :param edgecolor: цвет границы
+    :param ls: тип линии границы
+    :param name: название слоя (для интерактивной карты)
+    :return: словарь слоя
+    """
+    return {'kind': 'areas', 'geometry': np.asarray(df['AREA'].values, dtype=object), 'color': color,
+            'edgecolor': edgecolor, 'ls': ls, 'name': name}
 
-            gpd.GeoSeries(gdf_prod.AREA).plot(ax=ax, color="lightsalmon")
-            gpd.GeoSeries(gdf_prod.AREA).boundary.plot(ax=ax, color="orangered")
 
-            # добавление названий скважин на картинках
-            for x, y, label in zip(gdf_research.coordinateX.values,
-                                   gdf_research.coordinateY.values,
-                                   gdf_research.wellName):
-                ax.annotate(label, xy=(x, y), xytext=(3, 3), textcoords="offset points", color="navy",
-                            fontsize=6)
+def label_layer(df, color, name=''):
+    """
+    Слой подписей скважин у устья
+    :param df: DataFrame скважин
+    :param color: цвет подписей
+    :param name: название слоя (для интерактивной карты)
+    :return: словарь слоя
+    """
+    return {'kind': 'labels', 'x': df.coordinateX.values, 'y': df.coordinateY.values,
+            'label': df.wellName.values, 'color': color, 'name': name}
 
-            for x, y, label in zip(gdf_result_obj.coordinateX.values,
-                                   gdf_result_obj.coordinateY.values,
-                                   gdf_result_obj.wellName):
-                ax.annotate(label, xy=(x, y), xytext=(3, 3), textcoords="offset points", color="red", fontsize=6)
 
-            # построение траекторий скважин
-            gdf_research = gdf_research.set_geometry('POINT')
-            gdf_research.plot(ax=ax, color='black', markersize=14)
-            gdf_research = gdf_research.set_geometry('GEOMETRY')
-            gdf_research.plot(ax=ax, color='black', markersize=14)
-            gdf_result_obj = gdf_result_obj.set_geometry('POINT')
-            gdf_result_obj.plot(ax=ax, color="blue", markersize=14, marker='^')
-            gdf_result_obj = gdf_result_obj.set_geometry('GEOMETRY')
-            gdf_result_obj.plot(ax=ax, color='blue', markersize=14, marker='^')
+def well_layer(df, column, color, marker='o', name=''):
+    """
+    Слой скважин: устья (POINT) или траектории (GEOMETRY)
+    :param df: DataFrame скважин
+    :param column: столбец геометрии
+    :param color: цвет
+    :param marker: маркер точек
+    :param name: название слоя (для интерактивной карты)
+    :return: словарь слоя
+    """
+    return {'kind': 'wells', 'geometry': np.asarray(df[column].values, dtype=object), 'color': color,
+            'marker': marker, 'name': name}
 
-            piez = mpatches.Patch(color='black', fc='springgreen', label='Пьезометры')
-            inj = mpatches.Patch(color='black', fc='azure', label='Нагнетательные')
-            prod = mpatches.Patch(color='black', fc='lightsalmon', label='Добыващие(с исследованием)')
-            piez_point = Line2D([0], [0], marker='^', color='white', label='Скважины регулярной сети',
-                                markerfacecolor='blue', markersize=14)
-            prod_point = Line2D([0], [0], marker='.', color='white', label='Скважины, охваченные исследованиями',
-                                markerfacecolor='black', markersize=14)
 
-            plt.legend(handles=[piez, inj, prod, piez_point, prod_point])
-            plt.savefig(
-                f'output/mesh/MESH {obj.replace('/', '_')}, {contour_name}, k = {mult_coef}.png',
-                dpi=200)
-            plt.title(
-                f'Объект: {obj.replace('/', '_')}, {contour_name}, (k = {mult_coef})')
+def draw_map(task):
+    """
+    Построение и сохранение одной карты по заданию (выполняется в основном процессе или в пуле процессов).
+    Каждый слой строится одной коллекцией matplotlib, подписи выводятся после всех слоев с прореживанием
+    наложений
+    :param task: задание карты: слои, вид легенды, заголовок и путь к файлу
+    :return: путь к сохраненной карте
+    """
+    figure, ax = map_figure()
+    ax.set_aspect('equal')
+    for layer in task['layers']:
+        draw_layer(ax, layer)
+    draw_labels(ax, [layer for layer in task['layers'] if layer['kind'] == 'labels'])
+    ax.legend(handles=legend_handles(task['legend']))
+    ax.set_title(task['title'])
+    save_figure(figure, task['path'])
+    return task['path']
+
+
+def draw_layer(ax, layer):
+    """
+    Построение слоя карты (подписи строятся отдельно в draw_labels)
+    :param ax: оси карты
+    :param layer: словарь слоя (area_layer, well_layer или контур)
+    :return: None
+    """
+    if layer['kind'] == 'areas':
+        draw_areas(ax, layer['geometry'], layer['color'], layer['edgecolor'], layer['ls'])
+    elif layer['kind'] == 'boundary':
+        draw_lines(ax, np.asarray(layer['geometry'], dtype=object), layer['color'])
+    elif layer['kind'] == 'wells':
+        draw_wells(ax, layer['geometry'], layer['color'], layer['marker'])
+    pass
 
-            # list_fonds = df_result_obj.fond.explode().unique()  # все фонды скважин, в результирующем DataFrame
-            # for fond in tqdm(list_fonds, "Meshing for fonds", position=0, leave=True, colour='white'):
-            #     df_result_fond = df_result_obj[df_result_obj['fond'] == fond]
-            #     if df_result_fond.empty:
-            #         continue
-            #     gdf_result_fond = gpd.GeoDataFrame(df_result_fond)
-            #     gdf_current_research = gpd.GeoDataFrame(df_input[list(map(lambda x:
-            #                                                               len(set(x.replace(" ", "").split(",")) &
-            #                                                                   set([obj])) > 0, df_input.workHorizon))])
-            #     gdf_current_research = gdf_current_research[gdf_current_research['fond'] == fond]
-            #
-            #     ax = gpd.GeoSeries(gdf_result_fond.AREA).plot(color="springgreen", figsize=[20, 20])
-            #     gpd.GeoSeries(gdf_result_fond.AREA).boundary.plot(ax=ax, color='green')
-            #
-            #     for x, y, label in zip(gdf_current_research.coordinateX.values,
-            #                            gdf_current_research.coordinateY.values,
-            #                            gdf_current_research.wellName):
-            #         ax.annotate(label, xy=(x, y), xytext=(3, 3), textcoords="offset points", color="navy",
-            #                     fontsize=6)
-            #
-            #     for x, y, label in zip(gdf_result_fond.coordinateX.values,
-            #                            gdf_result_fond.coordinateY.values,
-            #                            gdf_result_fond.wellName):
-            #         ax.annotate(label, xy=(x, y), xytext=(3, 3), textcoords="offset points", color="red", fontsize=6)
-            #
-            #     gdf_current_research = gdf_current_research.set_geometry('POINT')
-            #     gdf_current_research.plot(ax=ax, color='black', markersize=14, marker='^')
-            #     gdf_current_research = gdf_current_research.set_geometry('GEOMETRY')
-            #     gdf_current_research.plot(ax=ax, color='black', markersize=14, marker='^')
-            #     gdf_result_fond = gdf_result_fond.set_geometry('POINT')
-            #     gdf_result_fond.plot(ax=ax, color="blue", markersize=14, marker='^')
-            #     gdf_result_fond = gdf_result_fond.set_geometry('GEOMETRY')
-            #     gdf_result_fond.plot(ax=ax, color='blue', markersize=14, marker='^')
-            #
-            #     plt.savefig(
-            #         f'output/mesh/MESH {obj.replace('/', '_')}, {contour_name}, fond = {fond}, k = {mult_coef}.png',
-            #         dpi=200)
-            #     plt.title(
-            #         f'Объект: {obj.replace('/', '_')}, {contour_name}, (fond = {fond}, k = {mult_coef})')
+
+def legend_handles(legend):
+    """
+    Элементы легенды карты
+    :param legend: вид карты: optimize - опорная сеть, mesh - регулярная сетка
+    :return: список элементов легенды
+    """
+    piez = mpatches.Patch(color='black', fc='springgreen', label='Пьезометры')
+    inj = mpatches.Patch(color='black', fc='azure', label='Нагнетательные')
+    prod = mpatches.Patch(color='black', fc='lightsalmon', label='Добыващие(с исследованием)')
+    if legend == 'mesh':
+        piez_point = Line2D([0], [0], marker='^', color='white', label='Скважины регулярной сети',
+                            markerfacecolor='blue', markersize=14)
+        prod_point = Line2D([0], [0], marker='.', color='white', label='Скважины, охваченные исследованиями',
+                            markerfacecolor='black', markersize=14)
+        return [piez, inj, prod, piez_point, prod_point]
+    piez_point = Line2D([0], [0], marker='^', color='white', label='Скважины опорной сети',
+                        markerfacecolor='blue', markersize=14)
+    prod_point = Line2D([0], [0], marker='.', color='white', label='Добывающий фонд',
+                        markerfacecolor='black', markersize=14)
+    prod_point_exception = Line2D([0], [0], marker='.', color='white', label='Не охвачены исследованием',
+                                  markerfacecolor='gray', markersize=14)
+    line_1_year = Line2D([0], [0], color='gray', linestyle="-", lw=1, label='Исследования на текущий год')
+    line_2_year = Line2D([0], [0], color='gray', linestyle=":", lw=1, label='На 2 год')
+    line_3_year = Line2D([0], [0], color='gray', linestyle="-.", lw=1, label='На 3 год')
+    return [piez, inj, prod, piez_point, prod_point, prod_point_exception, line_1_year, line_2_year, line_3_year]
+
+
+def curve_visualization(df_curve, contour_name):
+    """
+    Графики охвата добывающего фонда, размера опорной сети и потерь нефти в зависимости от коэффициента k
+    :param df_curve: DataFrame кривых охвата по объектам контура
+    :param contour_name: имя контура
+    :return: Сохраняет график в директорию output
+    """
+    fig, axes = plt.subplots(3, 1, figsize=[12, 15], sharex=True)
+    for horizon, df_horizon in df_curve.groupby('current_horizon'):
+        axes[0].plot(df_horizon['coef'], df_horizon['coverage'] * 100, label=horizon)
+        axes[1].plot(df_horizon['coef'], df_horizon['well_count'], label=horizon)
+        axes[2].plot(df_horizon['coef'], df_horizon['oil_loss'], label=horizon)
+    axes[0].set_ylabel('Охват добывающего фонда, %')
+    axes[1].set_ylabel('Кол-во скважин в опорной сети')
+    axes[2].set_ylabel('Потери нефти, т')
+    axes[2].set_xlabel('Коэффициент k')
+    for ax in axes:
+        ax.grid(True)
+        ax.legend(fontsize=8)
+    axes[0].set_title(f'Кривые охвата, контур: {contour_name}')
+    fig.savefig(f"output/coverage_curve_{str(contour_name).replace('/', ' ')}.png", dpi=100)
+    plt.close(fig)
+    pass
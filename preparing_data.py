@@ -6,10 +6,12 @@ from datetime import timedelta
 import numpy as np
 import pandas as pd
 from loguru import logger
-from shapely.geometry import Point, LineString
+import shapely
 
 from dictionaries import dict_geobd_columns, dict_names_column
 from functions import get_path, clean_work_horizon, unpack_status, exception_marker
+from geometry import well_geometries
+from well_registry import register_wells
 
 
 def upload_input_data(dict_constant, dict_parameters):
@@ -314,20 +316,15 @@ def preparing(dict_constant, df_input, count_of_hor, watercut, fluid_rate, list_
 
     # add to input dataframe columns for shapely types of coordinates
 
-    df_input.insert(loc=df_input.shape[1], column="POINT", value=list(map(lambda x, y: Point(x, y),
-                                                                          df_input.coordinateX,
-                                                                          df_input.coordinateY)))
-
-    df_input.insert(loc=df_input.shape[1], column="POINT3", value=list(map(lambda x, y: Point(x, y),
-                                                                           df_input.coordinateX3,
-                                                                           df_input.coordinateY3)))
-    df_input.insert(loc=df_input.shape[1], column="GEOMETRY", value=0)
-    df_input["GEOMETRY"] = df_input["GEOMETRY"].where(df_input["well type"] != "vertical",
-                                                      list(map(lambda x: x, df_input.POINT)))
-    df_input["GEOMETRY"] = df_input["GEOMETRY"].where(df_input["well type"] != "horizontal",
-                                                      list(map(lambda x, y: LineString(
-                                                          tuple(x.coords) + tuple(y.coords)),
-                                                               df_input.POINT, df_input.POINT3)))
+    df_input.insert(loc=df_input.shape[1], column="POINT",
+                    value=shapely.points(df_input.coordinateX.values.astype(float),
+                                         df_input.coordinateY.values.astype(float)))
+    df_input.insert(loc=df_input.shape[1], column="POINT3",
+                    value=shapely.points(df_input.coordinateX3.values.astype(float),
+                                         df_input.coordinateY3.values.astype(float)))
+    df_input.insert(loc=df_input.shape[1], column="GEOMETRY", value=well_geometries(df_input))
+    # целочисленные идентификаторы скважин для хранения пересечений
+    df_input = register_wells(df_input)
 
     date = pd.to_datetime(df_input['nameDate'].iloc[0], format='%d.%m.%Y')
 
@@ -1,19 +1,38 @@
-import geopandas as gpd
+import threading
+
+import numpy as np
 import pandas as pd
-import xlwings as xw
+from loguru import logger
+from openpyxl import Workbook
 from tqdm import tqdm
 
 from functions import unpack_status
-from geometry import check_intersection_area
+from well_registry import get_intersection_ids, get_well_names, join_well_names, select_contour, well_registry
 
 
-def write_cluster_mesh(df_input, dict_result, percent):
+def write_cluster_mesh(df_input, dict_result, backend='xlwings', result_queue=None):
     """
     Запись результатов расчета регулярной сетки в Excel
     :param df_input: исходный DataFrame скважин, очищенный от некорректных данных
     :param dict_result: словарь, по ключам которого содержится результирующий DataFrame для каждого контура
+    :param backend: способ записи файла: 'xlwings' - через Excel, 'openpyxl' - потоковая запись без Excel
+    :param result_queue: очередь словарей результатов контуров (result_items), если задана - листы пишутся по мере
+    расчета контуров, а dict_result заполняется из очереди
     :return: функция сохраняет файл в указанную директорию
     """
+    save_workbook(mesh_sheets(df_input, dict_result, result_items(dict_result, result_queue)),
+                  "output/out_file_mesh.xlsx", backend)
+    pass
+
+
+def mesh_sheets(df_input, dict_result, items=None):
+    """
+    Подготовка листов файла регулярной сетки: по одному листу на каждый ключ результата
+    :param df_input: исходный DataFrame скважин, очищенный от некорректных данных
+    :param dict_result: словарь, по ключам которого содержится результирующий DataFrame для каждого контура
+    :param items: пары (ключ, результат) в порядке записи листов, если None - dict_result.items()
+    :return: генератор пар (имя листа, DataFrame листа)
+    """
     dict_rename = {
         'wellName': '№ скважины',
         'nameDate': 'Дата',
@@ -56,64 +75,64 @@ def write_cluster_mesh(df_input, dict_result, percent):
         'percent_inj_wells': 'Доля нагнетательных в опорной сети',
         'percent_prod_wells': 'Доля добывающих в опорной сети',
         'year_of_survey': 'Год исследования',
+        'count_basic_wells': 'Кол-во скважин регулярной сети по фонду',
+        'count_of_search': 'Кол-во охваченных скважин по фонду',
+        'specific_area': 'Удельная площадь на скважину регулярной сети, м2',
         'wellNet': 'Статус по опорной сети'
     }
 
-    app1 = xw.App(visible=False)
-    new_wb = xw.Book()
+    registry = well_registry(df_input)
 
-    for key, value in dict_result.items():
+    for key, value in dict_result.items() if items is None else items:
         name = str(key).replace("/", " ")
-
-        if f"{name}" in new_wb.sheets:
-            xw.Sheet[f"{name}"].delete()
-
         if value[0].empty:
             continue
-        else:
-            new_wb.sheets.add(f"{name}")
 
-        sht = new_wb.sheets(f"{name}")
-
-        df = value[0]
-        polygon = value[1]
-        if polygon is None:
-            df_in_contour = df_input.copy()
-        else:
-            df_points = gpd.GeoDataFrame(df_input, geometry="POINT")
-            wells_in_contour = set(check_intersection_area(polygon, df_points, percent, calc_option=True))
-            df_in_contour = df_input[df_input.wellName.isin(wells_in_contour)]
-        df_in_contour.drop(columns=['POINT', 'POINT3', 'GEOMETRY', 'gasStatus'], axis=1, inplace=True)
-        df["intersection"] = list(
-            map(lambda x: " ".join(str(y) for y in x) if type(x) != str else x, df["intersection"]))
-        df.drop(columns=['POINT', 'POINT3', 'GEOMETRY', 'AREA', 'mean_oilrate', 'gasStatus', 'min_dist'],
-                axis=1, inplace=True)
+        df = value[0].copy()
+        # скважины контура по индексу, сохраненному в результате расчета
+        df_in_contour = select_contour(df_input, value[2]).drop(
+            columns=['POINT', 'POINT3', 'GEOMETRY', 'gasStatus', 'well_id'], axis=1)
+        df["intersection"] = list(map(lambda x: join_well_names(registry, x), df["intersection"]))
+        df.drop(columns=['POINT', 'POINT3', 'GEOMETRY', 'AREA', 'area_radius', 'mean_oilrate', 'gasStatus', 'min_dist',
+                         'well_id'], axis=1, inplace=True)
         df['wellNet'] = 'Выбрана в опорную сеть'
         list_wellnet = list(df['wellName'].explode().unique())
         df_not_wellnet = df_in_contour[~df_in_contour['wellName'].isin(list_wellnet)]
         list_research = df_not_wellnet['wellName'].explode().unique()
         df = pd.concat([df, df_not_wellnet], ignore_index=True, sort=False)
         df['wellNet'] = df.apply(lambda x: 'Исследуемый фонд' if x.wellName in list_research else x.wellNet, axis=1)
-        df.columns = dict_rename.values()
-
-        sht.range('A1').options().value = pd.DataFrame(df)
-
-    new_wb.save("output/out_file_mesh.xlsx")
-    # End print
-    app1.kill()
-    pass
+        df = df.rename(columns=dict_rename)
+        yield name, df
 
 
-def write_to_excel(percent, df_input, dict_result, **dict_constant):
+def write_to_excel(df_input, dict_result, backend='xlwings', result_queue=None, **dict_constant):
     """
     Для записи результата расчетов в Excel подается словарь
     Для каждого ключа создается отдельный лист в документе
     :param df_input: исходный DataFrame скважин, очищенный от некорректных данных
-    :param percent: процент длины ГС для включения в зону охвата для сценария с опорной сеткой
     :param dict_constant: словарь со статусами скважин
     :param dict_result: словарь, по ключам которого содержится результирующий DataFrame для каждого контура
+    :param backend: способ записи файла: 'xlwings' - через Excel, 'openpyxl' - потоковая запись без Excel
+    :param result_queue: очередь словарей результатов контуров (result_items), если задана - листы пишутся по мере
+    расчета контуров, а dict_result заполняется из очереди; лист отчета пишется последним
     :return: функция сохраняет файл в указанную директорию
     """
+    save_workbook(geometry_sheets(df_input, dict_result, result_items(dict_result, result_queue), **dict_constant),
+                  "output/out_file_geometry.xlsx", backend)
+    # os.startfile(str(get_path() + 'output/out_file_geometry.xlsx'))
+    pass
+
+
+def geometry_sheets(df_input, dict_result, items=None, **dict_constant):
+    """
+    Подготовка листов файла опорной сети: по одному листу на каждый ключ результата и лист отчета report
+    :param df_input: исходный DataFrame скважин, очищенный от некорректных данных
+    :param dict_result: словарь, по ключам которого содержится результирующий DataFrame для каждого контура
+    :param items: пары (ключ, результат) в порядке записи листов, если None - dict_result.items();
+    отчет строится по dict_result после записи всех листов
+    :param dict_constant: словарь со статусами скважин
+    :return: генератор пар (имя листа, DataFrame листа)
+    """
     # result dict rename columns in russian
     dict_rename_columns = {
         'wellName': '№ скважины',
@@ -159,63 +178,131 @@ def write_to_excel(percent, df_input, dict_result, **dict_constant):
         'year_of_survey': 'Год исследования',
         'wellNet': 'Статус по опорной сети'
     }
-    df_main = df_input.copy()
-    df_main.drop(columns=['POINT', 'POINT3', 'GEOMETRY', 'gasStatus'], axis=1, inplace=True)
-    app1 = xw.App(visible=False)
-    new_wb = xw.Book()
+    registry = well_registry(df_input)
 
-    for key, value in tqdm(dict_result.items(), "Write to excel file", position=0, leave=True,
-                           colour='white', ncols=80):
+    for key, value in tqdm(dict_result.items() if items is None else items, "Write to excel file", position=0,
+                           leave=True, colour='white', ncols=80):
         name = str(key).replace("/", " ")
-
-        if f"{name}" in new_wb.sheets:
-            xw.Sheet[f"{name}"].delete()
-
         if value[0].empty:
             continue
-        else:
-            new_wb.sheets.add(f"{name}")
 
-        sht = new_wb.sheets(f"{name}")
         df = value[0].copy()
-        polygon = value[1]
-        if polygon is None:
-            df_in_contour = df_main.copy()
-        else:
-            df_points = gpd.GeoDataFrame(df_input, geometry="POINT")
-            wells_in_contour = set(check_intersection_area(polygon, df_points, percent, calc_option=True))
-            df_in_contour = df_main[df_main.wellName.isin(wells_in_contour)]
-        df["intersection"] = list(
-            map(lambda x: " ".join(str(y) for y in x) if type(x) != str else x, df["intersection"]))
-        df.drop(columns=['min_dist', 'POINT', 'POINT3', 'GEOMETRY', 'AREA', 'gasStatus', 'mean_oilrate'],
-                axis=1,
-                inplace=True)
+        # скважины контура по индексу, сохраненному в результате расчета
+        df_in_contour = select_contour(df_input, value[2]).drop(
+            columns=['POINT', 'POINT3', 'GEOMETRY', 'gasStatus', 'well_id'], axis=1)
+        list_research = list(get_well_names(registry, get_intersection_ids(df['intersection'])))  # список скважин,
+        # охваченных исследованием
+        df["intersection"] = list(map(lambda x: join_well_names(registry, x), df["intersection"]))
+        df.drop(columns=['min_dist', 'POINT', 'POINT3', 'GEOMETRY', 'AREA', 'area_radius', 'gasStatus', 'mean_oilrate',
+                         'well_id'], axis=1, inplace=True)
         df.insert(loc=df.shape[1], column='wellNet', value='Выбрана в опорную сеть')
 
         list_wellnet = list(df['wellName'].explode().unique())  # список исследуемых скважин
-        list_research = list(df['intersection'].explode().unique())  # список скважин, охваченных исследованием
         df_not_wellnet = df_in_contour[~df_in_contour['wellName'].isin(list_wellnet)]  # скважины не попали в сеть
         df = pd.concat([df, df_not_wellnet], ignore_index=True, sort=False)
         df['wellNet'] = df.apply(lambda x: 'Исследуемый фонд' if x.wellName in list_research else x.wellNet, axis=1)
         df['wellNet'] = df.apply(lambda x: 'Вне опорной сети' if x.wellNet != x.wellNet else x.wellNet, axis=1)
         df.columns = dict_rename_columns.values()
-        sht.range('A1').options().value = df
+        yield name, df
     df_report = get_report(dict_result, **dict_constant)
-    if "report" in new_wb.sheets:
-        xw.Sheet["report"].delete()
-    new_wb.sheets.add("report")
-    sht = new_wb.sheets("report")
-    sht.range('A1').options().value = df_report
-    new_wb.save("output/out_file_geometry.xlsx")
+    write_report_table(df_report, "output/report")
+    yield "report", df_report
+
+
+def save_workbook(sheets, path, backend='xlwings'):
+    """
+    Сохранение листов в файл Excel
+    :param sheets: пары (имя листа, DataFrame листа)
+    :param path: путь к файлу
+    :param backend: 'xlwings' - запись через скрытый экземпляр Excel, 'openpyxl' - потоковая построчная запись
+    без Excel (write-only режим, в памяти держится только готовящийся лист)
+    :return: функция сохраняет файл в указанную директорию
+    """
+    if backend == 'openpyxl':
+        new_wb = Workbook(write_only=True)
+        for name, df in sheets:
+            sht = new_wb.create_sheet(title=name)
+            for row in sheet_rows(df):
+                sht.append(row)
+        new_wb.save(path)
+        return
+
+    import xlwings as xw
+    app1 = xw.App(visible=False)
+    new_wb = xw.Book()
+    for name, df in sheets:
+        if f"{name}" in new_wb.sheets:
+            xw.Sheet[f"{name}"].delete()
+        new_wb.sheets.add(f"{name}")
+        sht = new_wb.sheets(f"{name}")
+        sht.range('A1').options().value = df
+    new_wb.save(path)
     # End print
     app1.kill()
-    # os.startfile(str(get_path() + 'output/out_file_geometry.xlsx'))
-    pass
+
+
+def sheet_rows(df):
+    """
+    Построчная выгрузка DataFrame в том же виде, что и запись через xlwings: строка заголовков и строки значений,
+    первым столбцом идет индекс
+    :param df: DataFrame листа
+    :return: генератор строк листа
+    """
+    yield [None] + [cell_value(column) for column in df.columns]
+    for row in df.itertuples(index=True, name=None):
+        yield [cell_value(value) for value in row]
+
+
+def cell_value(value):
+    """
+    Перевод значения DataFrame в значение ячейки: пустые значения - пустая ячейка, массивы - строка,
+    типы numpy - типы python
+    :param value: значение DataFrame
+    :return: значение ячейки
+    """
+    if isinstance(value, (list, tuple, set, np.ndarray)):
+        return str(value)
+    if pd.isna(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def write_in_background(func, *args, **kwargs):
+    """
+    Запуск записи результатов в отдельном потоке. При записи с очередью результатов (result_queue) поток
+    запускается до расчета и пишет листы по мере расчета контуров, иначе - одновременно с построением карт.
+    Поток фоновый: при ошибке расчета процесс не ждет его завершения. Исключения в потоке записываются в лог
+    :param func: функция записи (write_to_excel, write_cluster_mesh)
+    :return: запущенный поток записи
+    """
+    thread = threading.Thread(target=logger.catch(func), args=args, kwargs=kwargs, name='excel_writer', daemon=True)
+    thread.start()
+    return thread
+
+
+def result_items(dict_result, result_queue=None):
+    """
+    Пары (ключ, результат) для записи листов. Из очереди результаты берутся по мере расчета контуров
+    и добавляются в dict_result, очередь завершается значением None
+    :param dict_result: словарь результатов расчета
+    :param result_queue: очередь словарей результатов контуров, если None - пары берутся из dict_result
+    :return: генератор пар (ключ, результат)
+    """
+    if result_queue is None:
+        yield from dict_result.items()
+        return
+    while (result := result_queue.get()) is not None:
+        dict_result.update(result)
+        yield from result.items()
 
 
 def get_report(dict_result, **dict_constant):
     """
-    Функция для создания краткого отчета по всем контурам с разными коэффициентами для радиусов охвата
+    Функция для создания краткого отчета по всем контурам с разными коэффициентами для радиусов охвата.
+    Результаты всех сценариев объединяются в одну таблицу (сценарий x год исследования), показатели считаются
+    группировкой по ней
     :param dict_result: словарь с результатами расчетов по всем объектам
     :param dict_constant: словарь со статусами скважин
     :return: возвращает DataFrame с отчетом по каждому контуру с определенным коэффициентом увеличения радиуса
@@ -240,53 +327,121 @@ def get_report(dict_result, **dict_constant):
                          'injection_loss1': 'Потери закачки 2 год, м3',
                          'injection_loss2': 'Потери закачки 3 год, м3',
                          'percent_of_default': 'Процент объектов по умолчанию'}
+    list_columns = ['workHorizon', 'mean_radius', 'research_time', 'wellStatus', 'workMarker', 'year_of_survey',
+                    'intersection', 'oil_loss', 'injection_loss', 'default_count', 'obj_count']
+    list_years = [0, 1, 2]
 
     PROD_STATUS, PROD_MARKER, PIEZ_STATUS, INJ_MARKER, INJ_STATUS, DELETE_STATUS = unpack_status(dict_constant)
-    dict_report = {}
+    list_keys = [key for key, value in dict_result.items() if not value[0].empty]
+    if not list_keys:
+        return pd.DataFrame()
+    # результаты всех сценариев в одной таблице (по массивам столбцов, без копирования DataFrame сценариев)
+    list_frames = [dict_result[key][0] for key in list_keys]
+    df = pd.DataFrame({column: np.concatenate([df_key[column].values if column in df_key else
+                                               np.full(df_key.shape[0], np.nan) for df_key in list_frames])
+                       for column in list_columns})
+    df.insert(0, 'contour_k', np.repeat(list_keys, [df_key.shape[0] for df_key in list_frames]))
+    # признаки фондов: проверка статусов идет по уникальным значениям, затем раздается по скважинам
+    status_codes, statuses = pd.factorize(df['wellStatus'].astype(str))
+    marker_codes, markers = pd.factorize(df['workMarker'].astype(str))
+    df['is_piez'] = np.asarray(statuses.str.contains(PIEZ_STATUS))[status_codes]
+    df['is_inj'] = (np.asarray(markers.str.contains(INJ_MARKER))[marker_codes] &
+                    np.asarray(statuses.str.contains(INJ_STATUS))[status_codes])
+    df['is_prod'] = (np.asarray(markers.str.contains(PROD_MARKER))[marker_codes] &
+                     np.asarray(statuses.str.contains(PROD_STATUS))[status_codes])
 
-    for key, value in tqdm(dict_result.items(), "Preparing report", position=0, leave=True,
-                           colour='white', ncols=80):
-        df = value[0]
-        if df.empty:
-            continue
-        dict_report['contour_k'] = dict_report.get('contour_k', []) + [key]
-        dict_report['obj_count'] = dict_report.get('obj_count', []) + [len(set(df['workHorizon'].explode().unique()))]
-        dict_report['mean_rad'] = dict_report.get('mean_rad', []) + [df['mean_radius'].mean()]
-        dict_report['mean_time'] = dict_report.get('mean_time', []) + [df['research_time'].mean()]
-        dict_report['piez_count'] = dict_report.get('piez_count', []) + [
-            len(df.loc[df.wellStatus.str.contains(PIEZ_STATUS)])]
-        dict_report['inj_count'] = dict_report.get('inj_count', []) + [len(
-            df.loc[(df.workMarker.str.contains(INJ_MARKER)) & (df.wellStatus.str.contains(INJ_STATUS))])]
-        dict_report['prod_count'] = dict_report.get('prod_count', []) + [len(
-            df.loc[(df.workMarker.str.contains(PROD_MARKER)) & (df.wellStatus.str.contains(PROD_STATUS))])]
-
-        dict_report['well_quantity0'] = dict_report.get('well_quantity0', []) + [df[df['year_of_survey'] == 0].shape[0]]
-        dict_report['well_quantity1'] = (dict_report.get('well_quantity1', []) +
-                                         [df[df['year_of_survey'] == 1].shape[0]])
-        dict_report['well_quantity2'] = (dict_report.get('well_quantity2', []) +
-                                         [df[df['year_of_survey'] == 2].shape[0]])
-
-        dict_report['research_wells0'] = (dict_report.get('research_wells0', []) +
-                                          [len(set(df[df['year_of_survey'] == 0]['intersection'].explode().unique()))])
-        dict_report['research_wells1'] = dict_report.get('research_wells1', []) + [
-            len(set(df[df['year_of_survey'] == 1]['intersection'].explode().unique()))]
-        dict_report['research_wells2'] = dict_report.get('research_wells2', []) + [
-            len(set(df[df['year_of_survey'] == 2]['intersection'].explode().unique()))]
-
-        dict_report['oil_loss0'] = dict_report.get('oil_loss0', []) + [df[df['year_of_survey'] == 0].oil_loss.sum()]
-        dict_report['oil_loss1'] = dict_report.get('oil_loss1', []) + [df[df['year_of_survey'] == 1].oil_loss.sum()]
-        dict_report['oil_loss2'] = dict_report.get('oil_loss2', []) + [df[df['year_of_survey'] == 2].oil_loss.sum()]
-
-        dict_report['injection_loss0'] = (dict_report.get('injection_loss0', []) +
-                                          [df[df['year_of_survey'] == 0].injection_loss.sum()])
-        dict_report['injection_loss1'] = (dict_report.get('injection_loss1', []) +
-                                          [df[df['year_of_survey'] == 1].injection_loss.sum()])
-        dict_report['injection_loss2'] = dict_report.get('injection_loss2', []) + [
-            df[df['year_of_survey'] == 2].injection_loss.sum()]
-        dict_report['percent_of_default'] = (dict_report.get('percent_of_default', []) +
-                                             [100 * df.default_count.sum() / df.obj_count.sum()])
-
-    df_report = pd.DataFrame.from_dict(dict_report, orient='columns')
+    grouped = df.groupby('contour_k', sort=False)
+    df_report = pd.DataFrame({'obj_count': grouped['workHorizon'].nunique(dropna=False),
+                              'mean_rad': grouped['mean_radius'].mean(),
+                              'mean_time': grouped['research_time'].mean(),
+                              'piez_count': grouped['is_piez'].sum(),
+                              'inj_count': grouped['is_inj'].sum(),
+                              'prod_count': grouped['is_prod'].sum()})
+
+    # показатели по годам исследования: сценарий x год
+    grouped_year = df.groupby(['contour_k', 'year_of_survey'], sort=False)
+    df_research = df[['contour_k', 'year_of_survey', 'intersection']].explode('intersection')
+    dict_year = {'well_quantity': grouped_year.size(),
+                 'research_wells': df_research.groupby(['contour_k', 'year_of_survey'],
+                                                       sort=False)['intersection'].nunique(dropna=False),
+                 'oil_loss': grouped_year['oil_loss'].sum(),
+                 'injection_loss': grouped_year['injection_loss'].sum()}
+    for name, series in dict_year.items():
+        df_name = series.unstack('year_of_survey').reindex(index=list_keys, columns=list_years).fillna(0)
+        for year in list_years:
+            df_report[f'{name}{year}'] = df_name[year].astype(series.dtype)
+    df_report['percent_of_default'] = 100 * grouped['default_count'].sum() / grouped['obj_count'].sum()
+
+    df_report = df_report.reindex(list_keys).rename_axis('contour_k').reset_index()
     df_report.rename(columns=dict_names_report, inplace=True)
 
     return df_report
+
+
+def write_report_table(df_report, path):
+    """
+    Выгрузка отчета по сценариям в CSV и Parquet (для Parquet нужен pyarrow, при его отсутствии файл не пишется)
+    :param df_report: DataFrame отчета (get_report)
+    :param path: путь к файлу без расширения
+    :return: функция сохраняет файлы в указанную директорию
+    """
+    df_report.to_csv(f"{path}.csv", index=False, encoding='utf-8-sig')
+    try:
+        df_report.to_parquet(f"{path}.parquet", index=False)
+    except ImportError as error:
+        logger.warning(f'Report is not written to Parquet: {error}')
+
+
+def write_coverage_curve(df_curve, contour_name):
+    """
+    Запись кривых охвата в зависимости от коэффициента k в Excel
+    :param df_curve: DataFrame кривых охвата по объектам контура
+    :param contour_name: имя контура
+    :return: функция сохраняет файл в директорию output
+    """
+    dict_names_curve = {'current_horizon': 'Объект расчета',
+                        'coef': 'Коэффициент k',
+                        'radius': 'Радиус исследования, м',
+                        'coverage': 'Доля охваченных добывающих скважин',
+                        'well_count': 'Кол-во скважин в опорной сети',
+                        'piez_count': 'Кол-во пьезометров',
+                        'inj_count': 'Кол-во нагн',
+                        'prod_count': 'Кол-во доб',
+                        'invisible_count': 'Кол-во скважин в слепых зонах',
+                        'mean_time': 'Среднее время исследования, сут',
+                        'oil_loss': 'Потери нефти, т',
+                        'gas_loss': 'Потери газа',
+                        'injection_loss': 'Потери закачки, м3'}
+    df_curve = df_curve.rename(columns=dict_names_curve)
+    df_curve.to_excel(f"output/coverage_curve_{str(contour_name).replace('/', ' ')}.xlsx", index=False)
+    pass
+
+
+def write_first_row_comparison(df_compare, contour_name):
+    """
+    Запись сравнения первого ряда скважин по секторам и по триангуляции Делоне в Excel
+    :param df_compare: DataFrame сравнения по скважинам объектов контура
+    :param contour_name: имя контура
+    :return: функция сохраняет файл в директорию output
+    """
+    dict_names_compare = {'current_horizon': 'Объект расчета',
+                          'wellName': '№ скважины',
+                          'count_angular': 'Кол-во скважин первого ряда (angular)',
+                          'mean_dist_angular': 'Среднее расстояние первого ряда (angular), м',
+                          'min_dist_angular': 'Минимальное расстояние первого ряда (angular), м',
+                          'count_delaunay': 'Кол-во скважин первого ряда (delaunay)',
+                          'mean_dist_delaunay': 'Среднее расстояние первого ряда (delaunay), м',
+                          'min_dist_delaunay': 'Минимальное расстояние первого ряда (delaunay), м',
+                          'count_common': 'Кол-во общих скважин первого ряда',
+                          'jaccard': 'Доля совпадения первого ряда (Жаккар)'}
+    df_total = df_compare.groupby('current_horizon').agg(
+        wells=('wellName', 'count'),
+        mean_rad_angular=('mean_dist_angular', 'mean'),
+        mean_rad_delaunay=('mean_dist_delaunay', 'mean'),
+        jaccard=('jaccard', 'mean')).reset_index()
+    df_total.columns = ['Объект расчета', 'Кол-во скважин', 'Средний радиус (angular), м',
+                        'Средний радиус (delaunay), м', 'Средняя доля совпадения первого ряда']
+    with pd.ExcelWriter(f"output/first_row_comparison_{str(contour_name).replace('/', ' ')}.xlsx") as writer:
+        df_total.to_excel(writer, sheet_name='Объекты', index=False)
+        df_compare.rename(columns=dict_names_compare).to_excel(writer, sheet_name='Скважины', index=False)
+    pass
@@ -0,0 +1,145 @@
+import numpy as np
+
+from geometry import point_segment_distance, well_segments
+
+
+def coverage_grid(df_wells, radius, cell_size):
+    """
+    Создание растровой сетки охвата по объекту: сетка покрывает стволы скважин с запасом radius,
+    в каждой ячейке хранится кратность охвата (кол-во зон скважин, в которые попадает центр ячейки)
+    :param df_wells: DataFrame скважин, зоны которых могут наноситься на сетку
+    :param radius: максимальный радиус зон скважин
+    :param cell_size: размер ячейки сетки, м
+    :return: словарь сетки: координаты начала, размер ячейки и массив кратности охвата
+    """
+    x1, y1, x3, y3 = well_segments(df_wells)
+    if len(x1) == 0:
+        x1 = y1 = x3 = y3 = np.zeros(1)
+    x0 = min(x1.min(), x3.min()) - radius - cell_size
+    y0 = min(y1.min(), y3.min()) - radius - cell_size
+    nx = int(np.ceil((max(x1.max(), x3.max()) + radius + cell_size - x0) / cell_size)) + 1
+    ny = int(np.ceil((max(y1.max(), y3.max()) + radius + cell_size - y0) / cell_size)) + 1
+    return {'x0': x0, 'y0': y0, 'cell_size': cell_size, 'counts': np.zeros((ny, nx), dtype=np.int32)}
+
+
+def add_coverage(grid, df_wells, radius, batch_cells=2 ** 18):
+    """
+    Нанесение зон скважин (круги для вертикальных, области вокруг ствола для горизонтальных) на сетку:
+    кратность охвата увеличивается на 1 в ячейках, центр которых находится не дальше radius от ствола.
+    Окна сетки по габаритам зон обрабатываются пачками (скважины сортируются по размеру окна, окна пачки
+    дополняются до общего размера). Зона выпуклая, поэтому в каждой строке окна охвачен отрезок ячеек -
+    на сетку наносятся только его границы, кратность восстанавливается накопленной суммой по строкам
+    :param grid: сетка охвата (изменяется на месте)
+    :param df_wells: DataFrame добавляемых скважин
+    :param radius: радиус зон скважин
+    :param batch_cells: максимальное кол-во ячеек окон в одной пачке
+    :return: сетка охвата
+    """
+    cell_size = grid['cell_size']
+    ny, nx = grid['counts'].shape
+    x1, y1, x3, y3 = well_segments(df_wells)
+    # окна сетки по габаритам зон скважин
+    i0 = np.maximum(((np.minimum(x1, x3) - radius - grid['x0']) // cell_size).astype(int), 0)
+    i1 = np.minimum(((np.maximum(x1, x3) + radius - grid['x0']) // cell_size).astype(int) + 1, nx)
+    j0 = np.maximum(((np.minimum(y1, y3) - radius - grid['y0']) // cell_size).astype(int), 0)
+    j1 = np.minimum(((np.maximum(y1, y3) + radius - grid['y0']) // cell_size).astype(int) + 1, ny)
+    width, height = np.maximum(i1 - i0, 0), np.maximum(j1 - j0, 0)
+    order = np.lexsort((width, height))
+
+    # границы охваченных отрезков строк (индексы в строках длиной nx + 1) и отдельные ячейки
+    list_begin, list_end, list_cells = [], [], []
+    start = 0
+    while start < len(order):
+        # пачка растет, пока окна, дополненные до общего размера, помещаются в batch_cells
+        stop, max_width, max_height = start + 1, width[order[start]], height[order[start]]
+        while stop < len(order):
+            new_width, new_height = max(max_width, width[order[stop]]), max(max_height, height[order[stop]])
+            if (stop - start + 1) * new_width * new_height > batch_cells:
+                break
+            stop, max_width, max_height = stop + 1, new_width, new_height
+        batch = order[start:stop, np.newaxis, np.newaxis]
+        start = stop
+
+        i = i0[batch] + np.arange(max_width)[np.newaxis, np.newaxis, :]
+        j = j0[batch] + np.arange(max_height)[np.newaxis, :, np.newaxis]
+        distance = point_segment_distance(grid['x0'] + (i + 0.5) * cell_size, grid['y0'] + (j + 0.5) * cell_size,
+                                          x1[batch], y1[batch], x3[batch], y3[batch])
+        mask = (distance <= radius) & (i < i1[batch]) & (j < j1[batch])
+        first = mask.argmax(axis=2)
+        last = max_width - 1 - mask[:, :, ::-1].argmax(axis=2)
+        count = mask.sum(axis=2)
+        row = j[:, :, 0] * (nx + 1) + i0[batch][:, :, 0]
+        run = (count > 0) & (count == last - first + 1)
+        list_begin.append((row + first)[run])
+        list_end.append((row + last + 1)[run])
+        # строки с разрывом (равные расстояния на границе зоны) наносятся по ячейкам
+        gap = (count > 0) & ~run
+        if gap.any():
+            list_cells.append((j * nx + i)[mask & gap[:, :, np.newaxis]])
+
+    size = ny * (nx + 1)
+    diff = (np.bincount(np.concatenate(list_begin + [np.array([], dtype=int)]), minlength=size)
+            - np.bincount(np.concatenate(list_end + [np.array([], dtype=int)]), minlength=size))
+    grid['counts'] += np.cumsum(diff.reshape(ny, nx + 1), axis=1)[:, :nx].astype(np.int32)
+    if list_cells:
+        grid['counts'] += np.bincount(np.concatenate(list_cells), minlength=ny * nx).reshape(ny, nx).astype(np.int32)
+    return grid
+
+
+def covered_area(grid, previous_counts=None):
+    """
+    Площадь объединения зон, нанесенных на сетку
+    :param grid: сетка охвата
+    :param previous_counts: кратность охвата до нанесения новых зон, если задана - считается площадь
+    объединения только новых зон (ячейки, кратность которых увеличилась)
+    :return: площадь охвата, м2
+    """
+    if previous_counts is None:
+        return np.count_nonzero(grid['counts']) * grid['cell_size'] ** 2
+    return np.count_nonzero(grid['counts'] > previous_counts) * grid['cell_size'] ** 2
+
+
+def uncovered_mask(grid):
+    """
+    Маска неохваченных ячеек сетки (для карт неохваченной площади)
+    :param grid: сетка охвата
+    :return: булев массив размера сетки
+    """
+    return grid['counts'] == 0
+
+
+def trajectory_coverage(grid, df_wells, calc_option=True):
+    """
+    Доля ствола скважин, попадающая в охваченные ячейки сетки (аналог check_intersection_area для объединения зон).
+    Ствол разбивается на точки с шагом не больше размера ячейки
+    :param grid: сетка охвата
+    :param df_wells: DataFrame проверяемых скважин
+    :param calc_option: флаг переключения сценария охвата скважин (False - учитывается только точка T1)
+    :return: массив долей ствола в охваченных ячейках для каждой скважины
+    """
+    x1, y1, x3, y3 = well_segments(df_wells)
+    if not calc_option:
+        x3, y3 = x1, y1
+    count = np.maximum(np.ceil(np.hypot(x3 - x1, y3 - y1) / grid['cell_size']).astype(int) + 1, 1)
+    well = np.repeat(np.arange(len(x1)), count)
+    # параметр точки вдоль ствола от 0 до 1
+    t = (np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)) / np.maximum(count[well] - 1, 1)
+    i = ((x1[well] + t * (x3[well] - x1[well]) - grid['x0']) // grid['cell_size']).astype(int)
+    j = ((y1[well] + t * (y3[well] - y1[well]) - grid['y0']) // grid['cell_size']).astype(int)
+    ny, nx = grid['counts'].shape
+    inside = (i >= 0) & (i < nx) & (j >= 0) & (j < ny)
+    covered = np.zeros(len(well), dtype=bool)
+    covered[inside] = grid['counts'][j[inside], i[inside]] > 0
+    return np.bincount(well, weights=covered, minlength=len(x1)) / count
+
+
+def coverage_area(df_wells, radius, cell_size):
+    """
+    Растровая сетка охвата зонами скважин: кратность охвата по ячейкам (counts), площадь объединения зон
+    (covered_area) и маска неохваченной площади (uncovered_mask) берутся из нее
+    :param df_wells: DataFrame скважин
+    :param radius: радиус зон скважин
+    :param cell_size: размер ячейки сетки, м
+    :return: сетка охвата
+    """
+    return add_coverage(coverage_grid(df_wells, radius, cell_size), df_wells, radius)
@@ -1,198 +1,192 @@
 import numpy as np
 import pandas as pd
-from loguru import logger
 from shapely.ops import unary_union
 from tqdm import tqdm
 
-from FirstRowWells import mean_radius
-from functions import dict_keys
-from geometry import add_shapely_types, check_intersection_area
+from coverage_engine import get_covered_wells, get_covering_zones
+from distance_store import distance_store, get_distances
+from functions import get_property
+from geometry import point_segment_distance, well_segments
+from raster_coverage import coverage_area, covered_area
+from research_metrics import fond_percentages, research_metrics
+from result_builder import add_result, build_result
 
 
-def calc_mesh_by_holes(df_input, dict_parameters, contour_name):
+def calc_mesh_by_holes(df_horizon, horizon, path_property, dict_parameters, obj_square, mean_rad, coeff, df_coverage,
+                       store=None):
     """
-    Расчет регулярной сетки для каждого объекта/радиуса исследования/фонда
-    :param df_input: DataFrame исходных данных по скважинам
+    Расчет регулярной сетки по алгоритму "дырок" по объекту: выбор опорных скважин каждого фонда (holes_calc_fond)
+    и расчет показателей опорных скважин, как для регулярной сетки (calc_regular_mesh)
+    :param df_horizon: DataFrame скважин, выделенный из исходных данных на текущий объект работы
+    :param horizon: текущий объект расчета
+    :param path_property: путь к файлу с PVT свойствами
     :param dict_parameters: словарь с параметрами расчета
-    :param contour_name: имя контура, по которому идет расчет
-    :return: словарь с названиями ключей в виде сценариев расчета и готовыми DataFrame c опорными скважинами
+    :param obj_square: площадь текущего объекта расчета по крайним скважинам
+    :param mean_rad: средний радиус исследования по текущему объекту
+    :param coeff: коэффициент кратного увеличения радиуса исследования
+    :param df_coverage: DataFrame критических коэффициентов охвата по парам скважин объекта
+    (должен содержать пары до 3 * coeff)
+    :param store: хранилище расстояний объекта (distance_store)
+    :return: результирующий DataFrame с опорными скважинами
     """
-    list_horizon = list(set(df_input.workHorizon.str.replace(" ", "").str.split(",").explode()))
-    list_horizon.sort()
-    # словарь для записи результатов
-    dict_holes_result = dict_keys(dict_parameters['mult_coef'], contour_name)
-    for horizon in tqdm(list_horizon, "Calculation mesh by holes", position=0, leave=True,
-                        colour='white', ncols=80):
-        logger.info(f'Current horizon: {horizon}')
-        # отбираю скважины на объект
-        df_horizon = df_input[
-            list(map(lambda x: len(set(x.replace(" ", "").split(",")) & set([horizon])) > 0, df_input.workHorizon))]
-        mean_rad, df_horizon = mean_radius(df_horizon, dict_parameters['verticalWellAngle'],
-                                           dict_parameters['MaxOverlapPercent'],
-                                           dict_parameters['angle_horizontalT1'],
-                                           dict_parameters['angle_horizontalT3'], dict_parameters['max_distance'])
-        df_horizon['current_horizon'] = horizon
-        for key, coeff in zip(dict_holes_result, dict_parameters['mult_coef']):
-            logger.info(f'Calculate by key {key} with coefficient {coeff}')
-            df_horizon = add_shapely_types(df_horizon, mean_rad, coeff)
-            df_result = holes_calc_fond(df_horizon, dict_parameters, mean_rad, coeff)
-            dict_holes_result[key] = pd.concat([dict_holes_result[key], df_result], axis=0, sort=False).reset_index(
-                drop=True)
-    return dict_holes_result
-
-
-def holes_calc_fond(df_horizon, dict_parameters, mean_rad, coeff):
+    df_horizon['current_horizon'] = horizon
+    df_result = holes_calc_fond(df_horizon, dict_parameters, mean_rad, coeff, df_coverage, store)
+    if df_result.empty:
+        return df_result
+    df_result = research_metrics(df_result, get_property(path_property), mean_rad, coeff, horizon)
+    # процент охвата площади объекта опорными скважинами каждого фонда
+    cell_size = dict_parameters['raster_cell_size']
+    dict_area = {}
+    for fond, df_fond in df_result.groupby('fond'):
+        if cell_size is not None:
+            dict_area[fond] = covered_area(coverage_area(df_fond, mean_rad * coeff, cell_size))
+        else:
+            dict_area[fond] = unary_union(list(df_fond['AREA'].explode())).area
+    df_result['coverage_percentage'] = df_result['fond'].map(dict_area) / obj_square
+    # процент скважин в опорной сети из скважин на объекте по каждому типу
+    df_result = fond_percentages(df_result, df_horizon['fond'].value_counts().to_dict())
+    df_result['year_of_survey'] = 0
+    return df_result
+
+
+def holes_calc_fond(df_horizon, dict_parameters, mean_rad, coeff, df_coverage, store=None):
     """
-    Расчет регулярной сети по обекту месторождения
+    Расчет регулярной сети по обекту месторождения. Кольца охвата R, 2R и 3R для каждой скважины фонда берутся
+    из таблицы критических коэффициентов (k_crit <= coeff, 2 * coeff, 3 * coeff), поэтому алгоритм идет
+    по индексам скважин без построения зон и повторных геометрических проверок
     :param df_horizon: DataFrame скважин, выделенный из исходных данных на текущий объект работы
     :param dict_parameters: словарь с параметрами расчета
     :param mean_rad: средний радиус по объекту расчета
     :param coeff: коэффициент кратного увеличения радиуса исследования
+    :param df_coverage: DataFrame критических коэффициентов охвата по парам скважин объекта
+    (должен содержать пары до 3 * coeff)
+    :param store: хранилище расстояний объекта (distance_store), если None - расстояния считаются по координатам
     :return: объединенный по фондам объекта DataFrame с регулярной сеткой скважин
     """
-    df_result = pd.DataFrame()
+    list_result = []
     list_fonds = list(set(df_horizon['fond'].explode().unique()))
     list_fonds.sort()
+    radius_2r = 2 * mean_rad * coeff
+    if store is None:
+        store = distance_store(df_horizon, 0)
 
     for fond in tqdm(list_fonds, "Holes algorithm for fond", position=0, leave=True,
                      colour='white', ncols=80):
         # выделение скважин для текущего фонда итерации
         df_fond_main = df_horizon[df_horizon['fond'] == fond]
-        df_fond_main['R'] = add_shapely_types(df_fond_main, mean_rad, coeff)['AREA']
-        df_fond_main['2R'] = add_shapely_types(df_fond_main, 2 * mean_rad, coeff)['AREA']
-        df_fond_main['3R'] = add_shapely_types(df_fond_main, 3 * mean_rad, coeff)['AREA']
-        df_fond = df_fond_main.copy()
+        well_ids = df_fond_main['well_id'].values
+        x1, y1, x3, y3 = well_segments(df_fond_main)
+        store_position = store['names'].get_indexer(df_fond_main['wellName'].values)
+        # кольца охвата: скважины фонда, охваченные зоной R, 2R, 3R каждой скважины,
+        # и скважины фонда, зона R которых охватывает каждую скважину
+        ring_R, ring_2R, ring_3R = [get_well_indices(get_covered_wells(df_coverage, well_ids, well_ids, k),
+                                                     well_ids) for k in [coeff, 2 * coeff, 3 * coeff]]
+        covering_R = get_well_indices(get_covering_zones(df_coverage, well_ids, well_ids, coeff), well_ids)
 
-        list_fond_wells = list(df_fond['wellName'].explode().unique())
-        length_list_wells = len(list_fond_wells)
+        alive = np.ones(len(well_ids), dtype=bool)
+        order_first = first_well_order(df_fond_main)
+        position = 0
         list_basic_wells = []
-        for i in range(length_list_wells):
-            if len(list_fond_wells) == 0:
-                break
-            # выбор первой опорной скважины из DataFrame
-            df_first_well = find_first_well(df_fond)
-            # поиск охваченных скважин
-            df_first_well['intersection'] = list(
-                map(lambda x, y: check_intersection_area(x, df_fond[df_fond['wellName'] != y],
-                                                         dict_parameters['percent'], True),
-                    df_first_well['R'], df_first_well['wellName']))
-            # список охваченных скважин в пределах расстояния 1*R
-            list_R = list(set(df_first_well['intersection'].iloc[0]))
-            list_basic_wells += [df_first_well['wellName'].iloc[0]]
-            df_first_well['intersection_2r'] = list(
-                map(lambda x, y: check_intersection_area(x, df_fond[df_fond['wellName'] != y],
-                                                         dict_parameters['percent'], True),
-                    df_first_well['2R'], df_first_well['wellName']))
-            list_2R = list(
-                set(df_first_well['intersection_2r'].iloc[0]) - set(df_first_well['intersection'].iloc[0]))
-            # проверка на охват выбранной скважины скважинами второго ряда
-            if list_2R:
-                # DataFrame из скважин второй зоны
-                df_2R = df_fond[df_fond['wellName'].isin(list_2R)]
-                # поиск скважин из второй зоны, которые охватывают с заданным радиусом выбранную
-                df_2R['intersection_first'] = list(
-                    map(lambda x: check_intersection_area(x, df_fond_main[
-                        df_fond_main['wellName'].isin([list_basic_wells[-1]])],
-                                                          dict_parameters['percent'], True), df_2R['R']))
-                # кол-во пересечений, но тк в функцию подается только одна скважина для проверки ее охвата, максимальное
-                # число пересечений равно 1
-                df_2R['count_intersect'] = df_2R['intersection_first'].apply(lambda x: np.size(x))
-                # список скважин, охватывающих текущую выбранную, из них далее берется первая и на нее переносится метка
-                list_replace_marker = list(df_2R.loc[df_2R['count_intersect'] > 0].wellName.explode())
-                if list_replace_marker:
-                    list_basic_wells += [list_replace_marker[0]]
-                    list_basic_wells = [x for x in list_basic_wells if x != df_first_well['wellName'].iloc[0]]
-                    df_first_well = df_fond_main.loc[df_fond_main['wellName'] == list_replace_marker[0]]
-                    df_first_well['intersection'] = list(
-                        map(lambda x, y: check_intersection_area(x, df_fond[df_fond['wellName'] != y],
-                                                                 dict_parameters['percent'], True),
-                            df_first_well['R'], df_first_well['wellName']))
-                    # список охваченных скважин в пределах расстояния 1*R
-                    list_R = list(set(df_first_well['intersection'].iloc[0]))
-                    df_first_well['intersection_2r'] = list(
-                        map(lambda x, y: check_intersection_area(x, df_fond[df_fond['wellName'] != y],
-                                                                 dict_parameters['percent'], True),
-                            df_first_well['2R'], df_first_well['wellName']))
-                    list_2R = list(
-                        set(df_first_well['intersection_2r'].iloc[0]) - set(df_first_well['intersection'].iloc[0]))
-
-            list_fond_wells = [x for x in list_fond_wells if x not in list_R + [df_first_well['wellName'].iloc[0]]]
-            df_fond = df_fond[df_fond['wellName'].isin(list_fond_wells)]
-            df_first_well['intersection_3r'] = list(
-                map(lambda x, y: check_intersection_area(x, df_fond[df_fond['wellName'] != y],
-                                                         dict_parameters['percent'], True),
-                    df_first_well['3R'], df_first_well['wellName']))
-            list_3R = list(
-                set(df_first_well['intersection_3r'].iloc[0]) - set(df_first_well['intersection_2r'].iloc[0]))
-            df_3R = df_fond[df_fond['wellName'].isin(list_3R)]
+        while alive.any():
+            # выбор первой опорной скважины из оставшихся
+            while not alive[order_first[position]]:
+                position += 1
+            first_well = order_first[position]
+            # скважины в пределах расстояния 1*R и во второй зоне (от R до 2R)
+            list_R = ring_R[first_well][alive[ring_R[first_well]]]
+            list_2R = np.setdiff1d(ring_2R[first_well][alive[ring_2R[first_well]]], list_R)
+            # проверка на охват выбранной скважины скважинами второго ряда: первая из них (в порядке фонда)
+            # становится опорной вместо выбранной
+            if list_2R.size:
+                list_replace_marker = covering_R[first_well][np.isin(covering_R[first_well], list_2R)]
+                if list_replace_marker.size:
+                    first_well = list_replace_marker[0]
+                    list_R = ring_R[first_well][alive[ring_R[first_well]]]
+                    list_2R = np.setdiff1d(ring_2R[first_well][alive[ring_2R[first_well]]], list_R)
+            list_basic_wells += [first_well]
+            alive[list_R] = False
+            alive[first_well] = False
+
             # идет расчет по зоне 3R, причем изначально рассматриваются скважины, расположенные ближе к полигону 2R
-            if not df_3R.empty:
-                df_3R['distance'] = df_3R.apply(lambda x: x['GEOMETRY'].distance(df_first_well['2R'].iloc[0]), axis=1)
-                df_3R = df_3R.sort_values(by=['distance'], axis=0, ascending=True)
-                # в процессе расчета удаляются охваченные скважины из list_2R
-                df_3R['intersection'] = list(
-                    map(lambda x, y: check_intersection_area(x, df_fond[df_fond['wellName'] != y],
-                                                             dict_parameters['percent'], True), df_3R['R'],
-                        df_3R['wellName']))
-                list_3R = list(df_3R['wellName'].explode())
-                while not df_3R.empty:
-                    current_well = list_3R[0]
-                    list_exception = list(set(df_3R[df_3R['wellName'] == current_well]['intersection'].iloc[0])) + [
-                        current_well]
-                    list_fond_wells = [x for x in list_fond_wells if x not in list_exception]
-                    list_3R = [x for x in list_3R if x not in list_exception]
-                    list_2R = [x for x in list_2R if x not in list_exception]
-
-                    list_basic_wells += [current_well]
-                    df_3R = df_3R[df_3R['wellName'].isin(list_3R)]
-            # переопределение DataFrame на фонд
-            df_fond = df_fond[df_fond['wellName'].isin(list_fond_wells)]
-            # создается DataFrame из фонда, содержащий скважины из list_2R. Если list_2R пустой, то есть условие
-            df_2R = df_fond[df_fond['wellName'].isin(list_2R)]
-            if not df_2R.empty:
-                df_2R['distance'] = df_2R.apply(
-                    lambda x: x['GEOMETRY'].distance(df_first_well['2R'].iloc[0].boundary), axis=1)
-                df_2R = df_2R.sort_values(by=['distance'], axis=0, ascending=True)
-                df_2R['intersection'] = list(
-                    map(lambda x, y: check_intersection_area(x, df_fond[df_fond['wellName'] != y],
-                                                             dict_parameters['percent'], True), df_2R['R'],
-                        df_2R['wellName']))
-                list_2R = list(df_2R['wellName'].explode())
-                while not df_2R.empty:
-                    current_well = list_2R[0]
-                    list_exception = list(set(df_2R[df_2R['wellName'] == current_well]['intersection'].iloc[0])) + [
-                        current_well]
-                    list_fond_wells = [x for x in list_fond_wells if x not in list_exception]
-                    list_2R = [x for x in list_2R if x not in list_exception]
-                    list_basic_wells += [current_well]
-                    df_2R = df_2R[df_2R['wellName'].isin(list_2R)]
-                    # переопределение DataFrame на фонд
-                df_fond = df_fond[df_fond['wellName'].isin(list_fond_wells)]
-        df_current_result = df_horizon[df_horizon['wellName'].isin(list_basic_wells)]
+            list_3R = np.setdiff1d(ring_3R[first_well][alive[ring_3R[first_well]]], ring_2R[first_well])
+            if list_3R.size:
+                distance = np.maximum(get_distances(store, store_position[first_well], store_position[list_3R])
+                                      - radius_2r, 0)
+                list_basic_wells += greedy_ring_selection(list_3R[np.argsort(distance, kind='stable')],
+                                                          ring_R, alive)
+            # далее по зоне 2R, начиная со скважин, расположенных ближе к границе полигона 2R
+            list_2R = list_2R[alive[list_2R]]
+            if list_2R.size:
+                distance = boundary_distance(get_distances(store, store_position[first_well], store_position[list_2R]),
+                                             x1[list_2R], y1[list_2R], x3[list_2R], y3[list_2R],
+                                             x1[first_well], y1[first_well], x3[first_well], y3[first_well],
+                                             radius_2r)
+                list_basic_wells += greedy_ring_selection(list_2R[np.argsort(distance, kind='stable')],
+                                                          ring_R, alive)
+
+        df_current_result = df_fond_main.iloc[np.sort(list_basic_wells)]
         df_current_result['intersection'], df_current_result['number'] = 0, 0
         df_current_result['count_basic_wells'] = df_current_result.shape[0]
         df_current_result['count_of_search'] = df_fond_main.shape[0] - df_current_result.shape[0]
         df_current_result['specific_area'] = (unary_union(list(df_current_result['AREA'].explode())).area
                                               / df_current_result.shape[0])
 
-        df_result = pd.concat([df_result, df_current_result], axis=0,
-                              sort=False).reset_index(drop=True)
-    return df_result
+        add_result(list_result, df_current_result)
+    return build_result(list_result)
+
+
+def greedy_ring_selection(list_ring, ring_R, alive):
+    """
+    Жадный выбор опорных скважин в кольце: в порядке list_ring выбирается первая оставшаяся скважина,
+    она и охваченные ее зоной R скважины исключаются из фонда
+    :param list_ring: индексы скважин кольца, упорядоченные по расстоянию
+    :param ring_R: индексы скважин, охваченных зоной R каждой скважины фонда
+    :param alive: маска оставшихся в расчете скважин фонда (изменяется на месте)
+    :return: список индексов выбранных скважин
+    """
+    list_selected = []
+    for well in list_ring:
+        if not alive[well]:
+            continue
+        list_selected += [well]
+        alive[ring_R[well]] = False
+        alive[well] = False
+    return list_selected
+
+
+def get_well_indices(list_ids, well_ids):
+    """
+    Перевод списков well_id скважин в массивы индексов скважин фонда
+    :param list_ids: списки well_id скважин
+    :param well_ids: well_id скважин фонда
+    :return: список массивов индексов
+    """
+    index = pd.Index(well_ids)
+    return [index.get_indexer(ids) for ids in list_ids]
+
+
+def boundary_distance(min_distance, x1, y1, x3, y3, fx1, fy1, fx3, fy3, radius):
+    """
+    Расстояние от траекторий скважин до границы зоны радиуса radius вокруг траектории выбранной скважины.
+    Расстояние до траектории выбранной скважины выпукло вдоль отрезка, поэтому максимум достигается на концах
+    :param min_distance: расстояния от траекторий скважин до траектории выбранной скважины
+    :param x1, y1, x3, y3: координаты траекторий скважин
+    :param fx1, fy1, fx3, fy3: координаты траектории выбранной скважины
+    :param radius: радиус зоны
+    :return: массив расстояний
+    """
+    max_distance = np.maximum(point_segment_distance(x1, y1, fx1, fy1, fx3, fy3),
+                              point_segment_distance(x3, y3, fx1, fy1, fx3, fy3))
+    return np.where(max_distance < radius, radius - max_distance, np.maximum(min_distance - radius, 0))
 
 
-def find_first_well(df):
+def first_well_order(df):
     """
-    Поиск основной скважины по минимальной кооринате Y для начала итерации
+    Порядок выбора основной скважины для начала итерации: по минимальной координате Y, затем по минимальной
+    координате X (по концам траектории), затем по порядку скважин в DataFrame
     :param df: DataFrame с данными по одному из фондов выделенный из исходного
-    :return: строчку DataFrame с данными по выбранной скважине
+    :return: массив индексов скважин в порядке выбора
     """
-    min_y = df[['coordinateY', 'coordinateY3']].values.min()
-    if df[(df['coordinateY'] == min_y) | (df['coordinateY3'] == min_y)].shape[0] != 1:
-        df = df[(df['coordinateY'] == min_y) | (df['coordinateY3'] == min_y)]
-        min_x = df[['coordinateX', 'coordinateX3']].values.min()
-        df = df[(df['coordinateX'] == min_x) | (df['coordinateX3'] == min_x)]
-        first_well = df[df['wellName'] == df['wellName'].iloc[0]]
-        return first_well
-    else:
-        first_well = df[(df['coordinateY'] == min_y) | (df['coordinateY3'] == min_y)]
-        return first_well
+    min_y = df[['coordinateY', 'coordinateY3']].values.min(axis=1)
+    min_x = df[['coordinateX', 'coordinateX3']].values.min(axis=1)
+    return np.lexsort((np.arange(df.shape[0]), min_x, min_y))
@@ -0,0 +1,38 @@
+import multiprocessing
+import sys
+import warnings
+
+import pandas as pd
+from loguru import logger
+
+from geometry_pool import set_geometry_threads
+from map_render import set_render_processes
+from main import write_results
+from run_store import load_run
+
+warnings.filterwarnings('ignore')
+pd.options.mode.chained_assignment = None  # default='warn'
+
+if __name__ == '__main__':
+    # процессы построения карт запускаются и из собранного .exe
+    multiprocessing.freeze_support()
+    # Построение карт и отчетов по сохраненному расчету без пересчета: python render.py [папка расчета]
+    path_run = sys.argv[1] if len(sys.argv) > 1 else 'output/run'
+
+    logger.add('output/logfile.log', level='INFO', format="{message}")
+    logger.info(f"Render saved calculation: {path_run}")
+    df_input, df_out_contour, dict_result, dict_parameters, dict_reports = load_run(path_run)
+    set_geometry_threads(dict_parameters['geometry_threads'])
+    # параметры, которых не было при сохранении расчета, берутся по умолчанию
+    dict_parameters.setdefault('render_processes', 1)
+    dict_parameters.setdefault('render_memory', None)
+    dict_parameters.setdefault('html_maps', False)
+    dict_parameters.setdefault('render_cache', True)
+    set_render_processes(dict_parameters['render_processes'], dict_parameters['render_memory'],
+                         dict_parameters['render_cache'])
+
+    write_results(df_input, df_out_contour, dict_result, dict_parameters, dict_reports)
+
+    logger.info("End of render")
+
+    pass
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from functions import get_time_coef
+
+# столбцы исходных данных, от которых зависит коэффициент времени исследования (get_time_coef)
+TIME_COEF_COLUMNS = ['workHorizon', 'water_cut', 'oilfield', 'gasStatus']
+# результаты get_time_coef, которые выгружаются в результирующий DataFrame: столбец - позиция в результате
+TIME_COEF_RESULT = {'time_coef': 0, 'k': 4, 'gas_visc': 5, 'pressure': 6, 'default_count': 7, 'obj_count': 8}
+# фонды для расчета доли скважин в опорной сети
+FOND_PERCENT = {'ПЬЕЗ': 'percent_piez_wells', 'НАГ': 'percent_inj_wells', 'ДОБ': 'percent_prod_wells'}
+
+
+def time_coef_table(df_wells, dict_property):
+    """
+    Расчет get_time_coef один раз на каждое уникальное сочетание объектов, обводненности, месторождения и
+    характера работы скважины, результат раздается по всем скважинам
+    :param df_wells: DataFrame скважин
+    :param dict_property: словарь PVT свойств (get_property)
+    :return: массив результатов get_time_coef размером (кол-во скважин, 9)
+    """
+    if df_wells.empty:
+        return np.empty((0, 9))
+    df_keys = df_wells[TIME_COEF_COLUMNS]
+    groups = df_keys.groupby(TIME_COEF_COLUMNS, dropna=False, sort=False)
+    codes = groups.ngroup().values
+    table = np.array([get_time_coef(dict_property, *key)
+                      for key in groups.head(1).itertuples(index=False, name=None)], dtype=float)
+    return table[codes]
+
+
+def research_metrics(df_result, dict_property, mean_rad, coeff, horizon):
+    """
+    Расчет показателей опорных скважин после выбора: средний радиус, коэффициент времени исследования и PVT
+    свойства, время исследования и потери добычи/закачки за время исследования. Расчет по массивам, общий для
+    оптимизации и регулярной сетки
+    :param df_result: DataFrame опорных скважин
+    :param dict_property: словарь PVT свойств (get_property)
+    :param mean_rad: средний радиус по объекту
+    :param coeff: коэффициент кратного увеличения радиуса исследования
+    :param horizon: объект, по которому идет расчет
+    :return: DataFrame опорных скважин с добавленными показателями
+    """
+    df_result['mean_radius'] = mean_rad * coeff  # текущий средний радиус по объекту, домножается на коэфф.
+    df_result['min_dist'] = df_result['min_dist'] * coeff
+    table = time_coef_table(df_result, dict_property)
+    for column, position in TIME_COEF_RESULT.items():
+        df_result[column] = table[:, position]
+    df_result['default_count'] = df_result['default_count'].astype(int)  # кол-во объектов со свойствами по умолч.
+    df_result['obj_count'] = df_result['obj_count'].astype(int)
+    # процент объектов со свойствами по умолчанию
+    df_result['percent_of_default'] = 100 * table[:, 5] / table[:, 6]
+    df_result['current_horizon'] = horizon  # объект, по которому идет расчет
+    # время исследования в сут через min расстояние
+    research_time = (df_result['min_dist'] * df_result['min_dist'] * df_result['time_coef']).values
+    df_result['research_time'] = research_time
+
+    gas_status = df_result['gasStatus'].astype(str).values
+    df_result['oil_loss'] = np.where(gas_status == 'газоконденсатная',
+                                     df_result['oilRate'].values + df_result['condRate'].values,
+                                     df_result['oilRate'].values) * research_time  # потери по нефти
+    df_result['gas_loss'] = np.where(gas_status == 'газонагнетательная', df_result['injectivity_day'].values,
+                                     df_result['gasRate'].values) * research_time  # потери по газу
+    df_result['injection_loss'] = df_result['injectivity'].values * research_time  # потери по закачке воды
+    return df_result
+
+
+def fond_percentages(df_result, dict_count):
+    """
+    Доля скважин каждого фонда в опорной сети от кол-ва скважин фонда на объекте
+    :param df_result: DataFrame опорных скважин
+    :param dict_count: кол-во скважин по фондам {'ПЬЕЗ': ..., 'НАГ': ..., 'ДОБ': ...}, для фонда без скважин - 0
+    :return: DataFrame опорных скважин со столбцами percent_piez_wells, percent_inj_wells, percent_prod_wells
+    """
+    selected = df_result['fond'].value_counts() if 'fond' in df_result else pd.Series(dtype=int)
+    for fond, column in FOND_PERCENT.items():
+        df_result[column] = selected.get(fond, 0) / dict_count[fond] if dict_count.get(fond) else 0
+    return df_result
@@ -0,0 +1,45 @@
+import pandas as pd
+import shapely
+from geopandas.array import GeometryDtype, from_shapely
+
+# столбцы геометрии скважин, которые в собранном DataFrame хранятся массивами геометрий (GeometryDtype)
+GEOMETRY_COLUMNS = ['POINT', 'POINT3', 'GEOMETRY', 'AREA']
+
+
+def result_builder(keys):
+    """
+    Накопитель результатов расчета: для каждого ключа (контур, коэффициент) собирается список частей DataFrame,
+    итоговый DataFrame строится одним concat в build_result вместо concat на каждом объекте/этапе
+    :param keys: ключи результирующего словаря
+    :return: словарь со списком частей по каждому ключу
+    """
+    return {key: [] for key in keys}
+
+
+def add_result(list_result, df_part):
+    """
+    Добавление части результата
+    :param list_result: список частей результата
+    :param df_part: DataFrame части результата
+    :return: список частей результата
+    """
+    list_result.append(df_part)
+    return list_result
+
+
+def build_result(list_result):
+    """
+    Сборка результирующего DataFrame из частей одним concat. Пустые части учитываются только если непустых нет
+    (чтобы сохранить столбцы), столбцы геометрии переводятся в массивы геометрий
+    :param list_result: список частей результата
+    :return: результирующий DataFrame
+    """
+    list_parts = [df_part for df_part in list_result if not df_part.empty] or list_result
+    if not list_parts:
+        return pd.DataFrame()
+    df_result = pd.concat(list_parts, axis=0, sort=False).reset_index(drop=True)
+    for column in GEOMETRY_COLUMNS:
+        if column in df_result and not isinstance(df_result[column].dtype, GeometryDtype) and \
+                shapely.is_geometry(df_result[column].values).all():
+            df_result[column] = from_shapely(df_result[column].values)
+    return df_result
@@ -0,0 +1,131 @@
+import os
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+from tqdm import tqdm
+
+from result_builder import GEOMETRY_COLUMNS
+from well_registry import join_well_names, well_registry
+
+
+def export_results(df_input, dict_result, list_formats, path='output/results'):
+    """
+    Выгрузка результатов всех сценариев для ГИС и сравнения расчетов без Excel. Запись идет по объектам расчета
+    (current_horizon): в памяти одновременно преобразуется только часть результата одного объекта
+    :param df_input: исходный DataFrame скважин (для имен скважин в столбце пересечений)
+    :param dict_result: словарь, по ключам которого содержится результирующий DataFrame для каждого контура
+    :param list_formats: список форматов: parquet (файл на сценарий), gpkg (слой на сценарий),
+    geojson (файл на сценарий)
+    :param path: папка для выгрузки
+    :return: функция сохраняет файлы в указанную директорию
+    """
+    os.makedirs(path, exist_ok=True)
+    registry = well_registry(df_input)
+    path_gpkg = os.path.join(path, 'results.gpkg')
+    if 'gpkg' in list_formats and os.path.exists(path_gpkg):
+        os.remove(path_gpkg)
+
+    for key, value in tqdm(dict_result.items(), "Export results", position=0, leave=True,
+                           colour='white', ncols=80):
+        df_result = value[0]
+        if df_result.empty:
+            continue
+        name = str(key).replace("/", " ")
+        path_geojson = os.path.join(path, f'{name}.geojson')
+        if 'geojson' in list_formats and os.path.exists(path_geojson):
+            os.remove(path_geojson)
+
+        parquet_writer = None
+        # схема Parquet по всему результату сценария: в части по объекту столбец может быть пустым
+        parquet_types = parquet_schema(df_result, registry) if 'parquet' in list_formats else None
+        for _, df_part in df_result.groupby('current_horizon', sort=False, dropna=False):
+            df_part = export_part(df_part, registry)
+            if 'gpkg' in list_formats:
+                geometry_layer(df_part).to_file(path_gpkg, layer=name, driver='GPKG', mode='a',
+                                                promote_to_multi=True)
+            if 'geojson' in list_formats:
+                geometry_layer(df_part).to_file(path_geojson, driver='GeoJSON', mode='a', promote_to_multi=True)
+            if 'parquet' in list_formats:
+                parquet_writer = write_parquet_part(parquet_writer, df_part, os.path.join(path, f'{name}.parquet'),
+                                                    parquet_types)
+        if parquet_writer is not None:
+            parquet_writer.close()
+    pass
+
+
+def export_part(df_part, registry):
+    """
+    Подготовка части результата к выгрузке: пересечения переводятся в имена скважин, как в Excel
+    :param df_part: часть результирующего DataFrame по одному объекту
+    :param registry: реестр скважин (well_registry)
+    :return: DataFrame части результата
+    """
+    df_part = pd.DataFrame(df_part).reset_index(drop=True)
+    if 'intersection' in df_part:
+        df_part['intersection'] = [join_well_names(registry, x) for x in df_part['intersection']]
+    return df_part
+
+
+def geometry_layer(df_part):
+    """
+    Слой для ГИС: геометрия слоя - зона охвата скважины (AREA, если ее нет - траектория GEOMETRY),
+    остальные столбцы геометрии не выгружаются (координаты траектории есть в атрибутах)
+    :param df_part: DataFrame части результата
+    :return: GeoDataFrame слоя
+    """
+    column = 'AREA' if 'AREA' in df_part else 'GEOMETRY'
+    geometry = gpd.GeoSeries(np.asarray(df_part[column].values, dtype=object), index=df_part.index)
+    return gpd.GeoDataFrame(df_part.drop(columns=[x for x in GEOMETRY_COLUMNS if x in df_part]), geometry=geometry)
+
+
+def parquet_schema(df_result, registry):
+    """
+    Схема файла Parquet по всему результату сценария: тип столбца определяется по dtype и первому непустому
+    значению столбца во всем результате, поэтому схема подходит всем частям по объектам
+    :param df_result: результирующий DataFrame сценария
+    :param registry: реестр скважин (well_registry)
+    :return: pyarrow.Schema
+    """
+    import pyarrow as pa
+
+    df_result = pd.DataFrame(df_result)
+    # строки с первым непустым значением каждого столбца
+    rows = sorted({position for column in df_result
+                   for position in np.flatnonzero(df_result[column].notna().values)[:1]})
+    table = pa.Table.from_pandas(wkb_part(export_part(df_result.iloc[rows or [0]], registry)), preserve_index=False)
+    # столбцы без значений во всем результате записываются как текстовые
+    return pa.schema([field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                      for field in table.schema], metadata=table.schema.metadata)
+
+
+def wkb_part(df_part):
+    """
+    Перевод столбцов геометрии части результата в WKB для записи в Parquet
+    :param df_part: DataFrame части результата
+    :return: копия DataFrame с геометрией в WKB
+    """
+    df_part = df_part.copy()
+    for column in GEOMETRY_COLUMNS:
+        if column in df_part:
+            df_part[column] = shapely.to_wkb(np.asarray(df_part[column].values, dtype=object))
+    return df_part
+
+
+def write_parquet_part(writer, df_part, path, schema):
+    """
+    Добавление части результата в файл Parquet (группа строк на объект), геометрия хранится в WKB
+    :param writer: открытый pyarrow.parquet.ParquetWriter или None для первой части (файл создается)
+    :param df_part: DataFrame части результата
+    :param path: путь к файлу
+    :param schema: схема файла по всему результату сценария (parquet_schema)
+    :return: ParquetWriter файла
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if writer is None:
+        writer = pq.ParquetWriter(path, schema)
+    writer.write_table(pa.Table.from_pandas(wkb_part(df_part), schema=writer.schema, preserve_index=False))
+    return writer
@@ -0,0 +1,177 @@
+import importlib.util
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import shapely
+import yaml
+from loguru import logger
+
+from geometry import well_geometries
+from geometry_pool import buffer_geometries
+from result_builder import GEOMETRY_COLUMNS, build_result
+from result_export import wkb_part
+from well_registry import from_csr, select_contour, to_csr
+
+
+def save_run(path, df_input, df_out_contour, dict_result, dict_parameters, dict_reports=None):
+    """
+    Сохранение расчета на диск для повторного построения карт и отчетов без пересчета (render.py).
+    Таблицы хранятся в Parquet (нужен pyarrow, при его отсутствии расчет не сохраняется). Геометрия скважин
+    не сохраняется, а восстанавливается по координатам: для зон охвата - по радиусу зоны (столбец area_radius,
+    add_shapely_types). Пересечения скважин хранятся в разреженном формате (CSR) массивов well_id
+    Файлы в папке path:
+        parameters.yml - параметры расчета (после upload_parameters)
+        run.yml - состав расчета: столбцы исходных данных, ключи сценариев и столбцы их результатов, отчеты
+        wells.parquet - исходный DataFrame скважин без столбцов геометрии
+        result_<номер>.parquet - опорные сети по сценариям (без геометрии и пересечений)
+        contours.parquet - контуры сценариев (WKB)
+        report_<номер>.parquet - отчеты по контурам (кривые охвата, сравнение первого ряда)
+        coverage.npz - пересечения скважин по сценариям, индексы скважин контуров (кроме расчета вне контуров)
+                       и скважин вне контуров
+    :param path: папка для сохранения расчета
+    :param df_input: исходный DataFrame скважин
+    :param df_out_contour: DataFrame скважин вне контуров
+    :param dict_result: словарь результатов расчета
+    :param dict_parameters: словарь с параметрами расчета
+    :param dict_reports: словарь отчетов по контурам (calculation)
+    :return: функция сохраняет файлы в указанную директорию
+    """
+    if importlib.util.find_spec('pyarrow') is None:
+        logger.warning('Run is not saved: pyarrow is not installed')
+        return
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, 'parameters.yml'), 'w', encoding='UTF-8') as f:
+        yaml.safe_dump(dict_parameters, f, allow_unicode=True)
+
+    write_frame(pd.DataFrame(df_input).drop(columns=[x for x in GEOMETRY_COLUMNS if x in df_input]),
+                os.path.join(path, 'wells.parquet'))
+
+    dict_run = {'well_columns': list(df_input.columns), 'keys': [], 'columns': [], 'reports': []}
+    dict_coverage = {'out_contour': df_out_contour['well_id'].values}
+    for number, (key, value) in enumerate(dict_result.items()):
+        df_result = pd.DataFrame(value[0]).copy()
+        dict_run['keys'].append(key)
+        dict_run['columns'].append(list(df_result.columns))
+        if value[2] is not None:
+            dict_coverage[f'contour_ids_{number}'] = value[2]
+        if 'intersection' in df_result:
+            is_array = np.array([isinstance(x, (np.ndarray, list)) for x in df_result['intersection']], dtype=bool)
+            dict_coverage[f'indptr_{number}'], dict_coverage[f'indices_{number}'] = to_csr(
+                [x if array else [] for x, array in zip(df_result['intersection'], is_array)])
+            dict_coverage[f'is_array_{number}'] = is_array
+            # текстовые отметки и пустые значения пересечений остаются в таблице
+            df_result['intersection'] = [None if array else x for x, array in zip(df_result['intersection'], is_array)]
+        write_frame(df_result.drop(columns=[x for x in GEOMETRY_COLUMNS if x in df_result]),
+                    os.path.join(path, f'result_{number}.parquet'))
+    write_frame(wkb_part(pd.DataFrame({'key': dict_run['keys'], 'GEOMETRY': [value[1] for value in
+                                                                            dict_result.values()]})),
+                os.path.join(path, 'contours.parquet'))
+    for contour_name, dict_report in (dict_reports or {}).items():
+        for name, df_report in dict_report.items():
+            write_frame(df_report, os.path.join(path, f'report_{len(dict_run["reports"])}.parquet'))
+            dict_run['reports'].append([contour_name, name])
+    with open(os.path.join(path, 'run.yml'), 'w', encoding='UTF-8') as f:
+        yaml.safe_dump(dict_run, f, allow_unicode=True)
+    np.savez_compressed(os.path.join(path, 'coverage.npz'), **dict_coverage)
+    pass
+
+
+def write_frame(df, path):
+    """
+    Запись DataFrame в Parquet без индекса. Столбцы со значениями разных типов (например, числа и строки)
+    записываются как JSON значений. Списки таких столбцов и столбцов с типом object хранятся в метаданных
+    файла, чтобы read_frame восстановил значения и типы столбцов
+    :param df: DataFrame
+    :param path: путь к файлу
+    :return: функция сохраняет файл
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = df.reset_index(drop=True)
+    object_columns = list(df.columns[(df.dtypes == object).values])
+    json_columns = []
+    for column in object_columns:
+        if len({type(x) for x in df[column].values if x is not None}) > 1:
+            df[column] = [json.dumps(x.item() if isinstance(x, np.generic) else x, default=str, ensure_ascii=False)
+                          for x in df[column].values]
+            json_columns.append(column)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**table.schema.metadata, b'json_columns': json.dumps(json_columns),
+                                           b'object_columns': json.dumps(object_columns)})
+    pq.write_table(table, path)
+    pass
+
+
+def read_frame(path):
+    """
+    Чтение DataFrame, записанного write_frame
+    :param path: путь к файлу
+    :return: DataFrame
+    """
+    import pyarrow.parquet as pq
+
+    table = pq.read_table(path)
+    df = table.to_pandas()
+    for column in json.loads(table.schema.metadata.get(b'object_columns', b'[]')):
+        df[column] = df[column].astype(object)
+    for column in json.loads(table.schema.metadata.get(b'json_columns', b'[]')):
+        df[column] = pd.Series([json.loads(x) for x in df[column].values], index=df.index, dtype=object)
+    return df
+
+
+def load_run(path):
+    """
+    Загрузка сохраненного расчета (save_run) с восстановлением геометрии скважин и зон охвата
+    :param path: папка сохраненного расчета
+    :return: исходный DataFrame скважин, DataFrame скважин вне контуров, словарь результатов, словарь параметров,
+    словарь отчетов по контурам
+    """
+    with open(os.path.join(path, 'parameters.yml'), encoding='UTF-8') as f:
+        dict_parameters = yaml.safe_load(f)
+    with open(os.path.join(path, 'run.yml'), encoding='UTF-8') as f:
+        dict_run = yaml.safe_load(f)
+
+    df_input = add_geometry(read_frame(os.path.join(path, 'wells.parquet')))[dict_run['well_columns']]
+    polygons = shapely.from_wkb(read_frame(os.path.join(path, 'contours.parquet'))['GEOMETRY'].values)
+    coverage = np.load(os.path.join(path, 'coverage.npz'))
+    dict_result = {}
+    for number, key in enumerate(dict_run['keys']):
+        df_result = read_frame(os.path.join(path, f'result_{number}.parquet'))
+        if f'indptr_{number}' in coverage:
+            list_ids = from_csr(coverage[f'indptr_{number}'], coverage[f'indices_{number}'])
+            df_result['intersection'] = [ids if array else x for ids, x, array in
+                                         zip(list_ids, df_result['intersection'], coverage[f'is_array_{number}'])]
+        if df_result.empty:
+            df_result = df_result.reindex(columns=dict_run['columns'][number])
+        else:
+            df_result = build_result([add_geometry(df_result)[dict_run['columns'][number]]])
+        contour_ids = coverage[f'contour_ids_{number}'] if f'contour_ids_{number}' in coverage else None
+        dict_result[key] = [df_result, polygons[number], contour_ids]
+
+    dict_reports = {}
+    for number, (contour_name, name) in enumerate(dict_run['reports']):
+        dict_reports.setdefault(contour_name, {})[name] = read_frame(
+            os.path.join(path, f'report_{number}.parquet'))
+    df_out_contour = select_contour(df_input, coverage['out_contour'])
+    return df_input, df_out_contour, dict_result, dict_parameters, dict_reports
+
+
+def add_geometry(df):
+    """
+    Восстановление столбцов геометрии по координатам скважин (как в preparing_data и add_shapely_types)
+    :param df: DataFrame скважин без столбцов геометрии, для зон охвата - со столбцом area_radius
+    :return: DataFrame со столбцами POINT, POINT3, GEOMETRY и AREA (при наличии area_radius)
+    """
+    df['POINT'] = shapely.points(df.coordinateX.values.astype(float), df.coordinateY.values.astype(float))
+    df['POINT3'] = shapely.points(df.coordinateX3.values.astype(float), df.coordinateY3.values.astype(float))
+    df['GEOMETRY'] = well_geometries(df)
+    if 'area_radius' in df:
+        radius = df['area_radius'].values.astype(float)
+        areas = np.full(len(radius), None, dtype=object)
+        mask = ~np.isnan(radius)
+        areas[mask] = buffer_geometries(df['GEOMETRY'].values[mask], radius[mask])
+        df['AREA'] = areas
+    return df
@@ -0,0 +1,194 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from dictionaries import dict_names_column
+
+# доли фонда синтетического месторождения: добывающие, нагнетательные, пьезометры, ликвидированные
+# (ликвидированные удаляются при подготовке данных, как в реальной выгрузке)
+FIELD_FONDS = {'ДОБ': 0.68, 'НАГ': 0.2, 'ПЬЕЗ': 0.1, 'ЛИК': 0.02}
+# характер работы и состояние скважин по фонду (как в выгрузке NGT)
+FIELD_STATUS = {'ДОБ': ('НЕФ', 'РАБ.'), 'НАГ': ('НАГ', 'РАБ.'), 'ПЬЕЗ': ('НЕФ', 'ПЬЕЗ'), 'ЛИК': ('НЕФ', 'ЛИК')}
+# кол-во скважин на кусте
+FIELD_PAD_SIZE = 8
+# дата выгрузки синтетического месторождения
+FIELD_DATE = '01.01.2024'
+# столбцы справочника PVT (как их выбирает preparing_reservoir_properties) и значения по умолчанию
+FIELD_PVT = {'Рпл.нач., кгс/см2          (карты изобар)': 250, 'μн. в пл. усл., сП': 2.5, 'μв. в пл. усл., сП': 0.5,
+             'm,     %': 20, 'β, 1/атм*10-5 породы': 1, 'β, 1/атм*10-5 нефть': 10, 'β, 1/атм*10-5 вода': 4.5,
+             'μг., сП в пласт. усл.': 0.02, 'Степень Krw  (для ОФП)': 2, 'Степень для функции Krw (доп)  (для ОФП)': 2,
+             'Степень Kro  (для ОФП)': 2, 'Степень для функции Kro (доп) (для ОФП)': 2, 'Swo (для ОФП)': 0.3,
+             'Swk  (для ОФП)': 0.8, 'Krwk  (для ОФП)': 0.3, 'Krok  (для ОФП)': 0.8, 'Кпрон (средняя) по нефти': 50}
+# параметры расчета синтетического месторождения (пути к файлам задаются в synthetic_field): первый ряд
+# по триангуляции Делоне, способ angular на десятках тысяч скважин считается несколько часов
+FIELD_PARAMETERS = {'list_order_fond': 'пьез, наг, доб', 'calculation_scenario': 'optimize',
+                    'gdis_option': '01.01.2022', 'separation_by_years': 2, 'calc_option': True, 'percent': 70,
+                    'horizon_count': 3, 'mult_coef': [1, 1.5, 2, 2.5], 'limit_radius_coef': 1.5,
+                    'coverage_curve': "нет", 'raster_cell_size': 25, 'geometry_threads': 1, 'render_processes': 1,
+                    'render_memory': "нет", 'html_maps': "нет", 'render_cache': "нет", 'excel_backend': 'openpyxl',
+                    'excel_background': "нет", 'export_formats': "нет", 'min_length_horWell': 150, 'water_cut': 0,
+                    'fluid_rate': 0, 'percent_oilrate': 50, 'limit_oilrate': 0, 'min_research_time': 1,
+                    'max_research_time': 100, 'max_distance': 1000, 'verticalWellAngle': 10, 'MaxOverlapPercent': 20,
+                    'angle_horizontalT1': 10, 'angle_horizontalT3': 10, 'first_row_method': 'delaunay'}
+
+
+def synthetic_field(path, wells=1000, horizons=3, share_horizontal=0.3, density=4, contours=2, seed=0,
+                    oilfield='СИНТЕТИЧЕСКОЕ', **parameters):
+    """
+    Синтетическое месторождение для проверки и замеров скорости расчета: файлы в формате исходных данных
+    в папке path (структура как у папки программы)
+        files/<месторождение>_NGT.csv - выгрузка скважин NGT (столбцы dict_names_column)
+        files/<месторождение>_PVT.xlsx - справочник PVT по объектам
+        files/<месторождение>_ГДИС.xlsx - история ГДИС
+        files/<месторождение>_исключения.xlsx - исключаемые скважины
+        contours/Контур <номер>.txt - контуры
+        conf_files/parameters.yml - параметры расчета с путями к файлам
+    :param path: папка месторождения
+    :param wells: кол-во скважин
+    :param horizons: кол-во объектов разработки
+    :param share_horizontal: доля горизонтальных скважин
+    :param density: плотность сетки, скважин на км2
+    :param contours: кол-во контуров
+    :param seed: начальное значение генератора случайных чисел
+    :param oilfield: название месторождения
+    :param parameters: параметры расчета, заменяющие FIELD_PARAMETERS
+    :return: путь к файлу параметров
+    """
+    rng = np.random.default_rng(seed)
+    for folder in ['files', 'contours', 'conf_files', 'output']:
+        os.makedirs(os.path.join(path, folder), exist_ok=True)
+    list_horizons = [f'БС{10 + i}' for i in range(horizons)]
+    side = np.sqrt(wells / density) * 1000
+
+    df_wells = field_wells(rng, wells, list_horizons, share_horizontal, side, oilfield)
+    dict_files = {'data_file': f'files/{oilfield}_NGT.csv', 'property_file': f'files/{oilfield}_PVT.xlsx',
+                  'gdis_file': f'files/{oilfield}_ГДИС.xlsx', 'exception_file': f'files/{oilfield}_исключения.xlsx'}
+    df_wells.to_csv(os.path.join(path, dict_files['data_file']), sep=';', index=False, encoding='utf-8')
+    field_properties(oilfield, list_horizons).to_excel(os.path.join(path, dict_files['property_file']),
+                                                       index=False)
+    field_gdis(rng, df_wells).to_excel(os.path.join(path, dict_files['gdis_file']), index=False)
+    pd.DataFrame(rng.choice(df_wells['№ скважины'].values, max(wells // 100, 1), replace=False)).to_excel(
+        os.path.join(path, dict_files['exception_file']), index=False, header=False)
+
+    for f in os.listdir(os.path.join(path, 'contours')):
+        os.remove(os.path.join(path, 'contours', f))
+    for number, df_contour in enumerate(field_contours(rng, contours, side)):
+        df_contour.to_csv(os.path.join(path, 'contours', f'Контур {number + 1}.txt'), sep=' ', decimal=',',
+                          index=False)
+
+    dict_parameters = dict(FIELD_PARAMETERS, **{key: os.path.abspath(os.path.join(path, value))
+                                                for key, value in dict_files.items()})
+    dict_parameters.update(parameters)
+    path_parameters = os.path.join(path, 'conf_files', 'parameters.yml')
+    with open(path_parameters, 'w', encoding='UTF-8') as f:
+        yaml.safe_dump(dict_parameters, f, allow_unicode=True, sort_keys=False)
+    return path_parameters
+
+
+def field_wells(rng, wells, list_horizons, share_horizontal, side, oilfield):
+    """
+    Скважины синтетического месторождения в формате выгрузки NGT: скважины собраны в кусты, у горизонтальных
+    скважин забой (T3) в стороне от T1 на 200-800 м, скважина работает на 1-2 объекта
+    :param rng: генератор случайных чисел numpy
+    :param wells: кол-во скважин
+    :param list_horizons: объекты разработки
+    :param share_horizontal: доля горизонтальных скважин
+    :param side: сторона квадрата месторождения, м
+    :param oilfield: название месторождения
+    :return: DataFrame в формате выгрузки NGT
+    """
+    pads = max(wells // FIELD_PAD_SIZE, 1)
+    pad = rng.integers(0, pads, wells)
+    pad_x, pad_y = rng.uniform(0, side, pads), rng.uniform(0, side, pads)
+    # скважины куста расходятся от куста на расстояние до половины шага сетки
+    step = side / np.sqrt(wells)
+    x = pad_x[pad] + rng.normal(0, step / 2, wells)
+    y = pad_y[pad] + rng.normal(0, step / 2, wells)
+    is_horizontal = rng.random(wells) < share_horizontal
+    angle = rng.uniform(0, 2 * np.pi, wells)
+    length = rng.uniform(200, 800, wells)
+    x3 = np.where(is_horizontal, x + length * np.cos(angle), 0)
+    y3 = np.where(is_horizontal, y + length * np.sin(angle), 0)
+
+    fond = rng.choice(list(FIELD_FONDS), wells, p=list(FIELD_FONDS.values()))
+    is_inj = fond == 'НАГ'
+    horizon_count = rng.integers(1, min(2, len(list_horizons)) + 1, wells)
+    work_horizons = [', '.join(sorted(rng.choice(list_horizons, count, replace=False))) for count in horizon_count]
+    fluid_rate = rng.lognormal(4, 0.8, wells)
+    water_cut = rng.uniform(20, 98, wells)
+    injectivity = np.where(is_inj, rng.lognormal(5, 0.5, wells), 0)
+    values = [[f'{10000 + i}' for i in range(wells)], FIELD_DATE, [FIELD_STATUS[x][0] for x in fond],
+              [FIELD_STATUS[x][1] for x in fond], oilfield, work_horizons, [f'К{x + 1}' for x in pad],
+              np.round(x, 2), np.round(y, 2), np.round(x3, 2), np.round(y3, 2),
+              np.round(np.where(is_inj, 0, fluid_rate * (1 - water_cut / 100) * 0.85), 3),
+              np.round(np.where(is_inj, 0, fluid_rate), 3), np.round(injectivity, 3),
+              np.round(np.where(is_inj, 0, water_cut), 2), np.where(is_inj, '', 'ЭЦН'), 0., np.round(injectivity, 3),
+              0.]
+    return pd.DataFrame(dict(zip(dict_names_column, values)))
+
+
+def field_properties(oilfield, list_horizons):
+    """
+    Справочник PVT синтетического месторождения: строка заголовка (пропускается при загрузке) и по строке
+    на объект
+    :param oilfield: название месторождения
+    :param list_horizons: объекты разработки
+    :return: DataFrame справочника
+    """
+    df_property = pd.DataFrame({'Месторождение': oilfield, 'Пласт OIS': list_horizons, **FIELD_PVT})
+    header = pd.DataFrame([df_property.columns], columns=df_property.columns)
+    return pd.concat([header, df_property], ignore_index=True).set_axis(
+        ['Справочник PVT'] + [''] * (df_property.shape[1] - 1), axis=1)
+
+
+def field_gdis(rng, df_wells, share=0.1):
+    """
+    История ГДИС синтетического месторождения: исследования на доле скважин за 3 года до даты выгрузки
+    :param rng: генератор случайных чисел numpy
+    :param df_wells: скважины в формате выгрузки NGT
+    :param share: доля исследованных скважин
+    :return: DataFrame истории ГДИС (первая строка - заголовок, пропускается при загрузке)
+    """
+    df_research = df_wells.sample(frac=share, random_state=int(rng.integers(2 ** 31)))
+    date = pd.to_datetime(FIELD_DATE, format='%d.%m.%Y')
+    end = date - pd.to_timedelta(rng.integers(10, 3 * 365, len(df_research)), unit='D')
+    begin = end - pd.to_timedelta(rng.integers(1, 30, len(df_research)), unit='D')
+    columns = ['Скважина', 'Пласты', 'Вид исследования', 'Начальная дата', 'Дата окончания', 'Оценка']
+    df_gdis = pd.DataFrame({'Скважина': df_research['№ скважины'].values,
+                            'Пласты': df_research['Объекты работы'].str.replace(', ', '; ').values,
+                            'Вид исследования': rng.choice(['КВД', 'КПД', 'КВУ'], len(df_research)),
+                            'Начальная дата': begin, 'Дата окончания': end,
+                            'Оценка': rng.choice(['результат достоверный', 'результат оценочный',
+                                                  'результат ненадежен'], len(df_research), p=[0.6, 0.3, 0.1])})
+    header = pd.DataFrame([columns], columns=columns)
+    return pd.concat([header, df_gdis], ignore_index=True).set_axis(['История ГДИС'] + [''] * 5, axis=1)
+
+
+def field_contours(rng, contours, side, vertices=24):
+    """
+    Контуры синтетического месторождения: неровные многоугольники в пределах месторождения
+    :param rng: генератор случайных чисел numpy
+    :param contours: кол-во контуров
+    :param side: сторона квадрата месторождения, м
+    :param vertices: кол-во вершин контура
+    :return: список DataFrame координат контуров
+    """
+    list_contours = []
+    for _ in range(contours):
+        center = rng.uniform(side / 4, 3 * side / 4, 2)
+        angle = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+        radius = side / 6 * rng.uniform(0.7, 1.3, vertices)
+        list_contours += [pd.DataFrame({'X': np.round(center[0] + radius * np.cos(angle), 2),
+                                        'Y': np.round(center[1] + radius * np.sin(angle), 2)})]
+    return list_contours
+
+
+if __name__ == '__main__':
+    # Синтетическое месторождение: python synthetic_field.py <папка> [кол-во скважин] [кол-во объектов]
+    path_field = sys.argv[1] if len(sys.argv) > 1 else 'synthetic'
+    count_wells = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    count_horizons = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+    print(synthetic_field(path_field, count_wells, count_horizons))
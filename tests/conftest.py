@@ -0,0 +1,36 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+
+# модули программы лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geometry import well_geometries  # noqa: E402
+
+
+@pytest.fixture
+def df_wells():
+    """
+    Небольшой набор скважин объекта: вертикальные и горизонтальные, две скважины с совпадающими стволами
+    :return: DataFrame скважин со столбцами координат, well_id, GEOMETRY и POINT
+    """
+    rng = np.random.default_rng(1)
+    count = 80
+    x1, y1 = rng.uniform(0, 3000, count), rng.uniform(0, 3000, count)
+    horizontal = rng.random(count) < 0.3
+    angle, length = rng.uniform(0, 2 * np.pi, count), rng.uniform(300, 800, count)
+    x3 = np.where(horizontal, x1 + length * np.cos(angle), x1)
+    y3 = np.where(horizontal, y1 + length * np.sin(angle), y1)
+    x1[1], y1[1], x3[1], y3[1], horizontal[1] = x1[0], y1[0], x3[0], y3[0], horizontal[0]
+    df = pd.DataFrame({'wellName': [f'W{i}' for i in range(count)],
+                       'well_id': np.arange(count, dtype=np.int32),
+                       'well type': np.where(horizontal, 'horizontal', 'vertical'),
+                       'workHorizon': np.where(rng.random(count) < 0.5, 'БС10', 'БС10, БС11'),
+                       'coordinateX': x1, 'coordinateY': y1, 'coordinateX3': x3, 'coordinateY3': y3})
+    df['GEOMETRY'] = well_geometries(df)
+    df['POINT'] = shapely.points(x1, y1)
+    return df
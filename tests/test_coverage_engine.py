@@ -0,0 +1,59 @@
+import numpy as np
+
+from coverage_engine import critical_coefficients, greedy_selection, intersect_number_by_coverage
+from geometry import add_shapely_types, intersect_number
+
+MEAN_RADIUS = 300
+PERCENT = 70
+
+
+def boundary_pairs(df_coverage, coeff, tolerance=0.005):
+    """
+    Пары, охват которых на границе зоны: буфер shapely - многоугольник, вписанный в окружность (отклонение
+    до 0.5% радиуса), поэтому при k_crit в пределах tolerance от coeff проверка по геометрии может дать другой ответ
+    :return: множество пар (zone, well)
+    """
+    df_pairs = df_coverage[np.abs(df_coverage['k_crit'] / coeff - 1) < tolerance]
+    return set(zip(df_pairs['zone'], df_pairs['well']))
+
+
+def pairs_of(df, column='intersection'):
+    return {(well_id, other) for well_id, ids in zip(df['well_id'], df[column]) for other in np.atleast_1d(ids)}
+
+
+def test_intersect_number_by_coverage_matches_geometry(df_wells):
+    df_coverage = critical_coefficients(df_wells, MEAN_RADIUS, PERCENT, 3)
+    for coeff in [1, 1.5, 2.5]:
+        df_areas = add_shapely_types(df_wells.copy(), MEAN_RADIUS, coeff)
+        df_prod, df_inj_piez = df_areas.iloc[::2].copy(), df_areas.iloc[1::2].copy()
+        prod, inj_piez = intersect_number(df_prod.copy(), df_inj_piez.copy(), PERCENT)
+        prod_k, inj_piez_k = intersect_number_by_coverage(df_prod.copy(), df_inj_piez.copy(), df_coverage, coeff)
+
+        boundary = boundary_pairs(df_coverage, coeff)
+        assert pairs_of(inj_piez) ^ pairs_of(inj_piez_k) <= boundary
+        assert {(zone, well) for well, zone in pairs_of(prod) ^ pairs_of(prod_k)} <= boundary
+        assert len(pairs_of(inj_piez_k)) > len(boundary)
+
+
+def test_critical_coefficients_point_option(df_wells):
+    # calc_option=False: охват по точке T1 скважины-цели
+    df_coverage = critical_coefficients(df_wells, MEAN_RADIUS, PERCENT, 2, calc_option=False)
+    df_areas = add_shapely_types(df_wells.copy(), MEAN_RADIUS, 2)
+    expected = {(zone, well) for zone, area in zip(df_areas['well_id'], df_areas['AREA'])
+                for well, point in zip(df_areas['well_id'], df_areas['POINT'])
+                if zone != well and area.intersects(point)}
+    assert set(zip(df_coverage['zone'], df_coverage['well'])) ^ expected <= boundary_pairs(df_coverage, 2)
+
+
+def test_greedy_selection_matches_loop():
+    rng = np.random.default_rng(2)
+    well_ids = rng.permutation(200).astype(np.int32)
+    list_intersection = [rng.choice(200, rng.integers(0, 6), replace=False) for _ in well_ids]
+
+    selected, excluded = [], set()
+    for well_id, ids in zip(well_ids, list_intersection):
+        if well_id in excluded:
+            continue
+        selected.append(well_id)
+        excluded.update(ids)
+    assert greedy_selection(well_ids, list_intersection) == selected
@@ -0,0 +1,45 @@
+import numpy as np
+import shapely
+
+from FirstRowWells import get_neighbour_subgraph, neighbour_graph
+from distance_store import distance_store, get_distances, get_neighbours
+
+RADIUS = 600
+
+
+def shapely_distances(df_wells):
+    """
+    Матрица расстояний между стволами скважин по shapely (точки и отрезки T1-T3)
+    """
+    geometries = df_wells['GEOMETRY'].values
+    return shapely.distance(geometries[:, None], geometries[None, :])
+
+
+def test_distance_store_matches_shapely(df_wells):
+    store = distance_store(df_wells, RADIUS)
+    expected = shapely_distances(df_wells)
+    np.fill_diagonal(expected, np.inf)
+    for position in range(len(df_wells)):
+        indices, distance = get_neighbours(store, position)
+        assert list(indices) == list(np.flatnonzero(expected[position] <= RADIUS))
+        np.testing.assert_allclose(distance, expected[position, indices], atol=1e-2)
+    # совпадающие стволы хранятся с нулевым расстоянием
+    indices, distance = get_neighbours(store, 0)
+    assert distance[list(indices).index(1)] == 0
+
+
+def test_distance_store_from_graph(df_wells):
+    graph = neighbour_graph(df_wells, 1000)
+    df_horizon = df_wells[df_wells['workHorizon'].str.contains('БС11')]
+    store = distance_store(df_horizon, RADIUS)
+    store_graph = distance_store(df_horizon, RADIUS, get_neighbour_subgraph(graph, df_horizon.wellName, 'БС11'))
+    assert (store['matrix'] != store_graph['matrix']).nnz == 0
+    np.testing.assert_array_equal(store['matrix'].indptr, store_graph['matrix'].indptr)
+
+
+def test_get_distances_outside_radius(df_wells):
+    store = distance_store(df_wells, RADIUS)
+    expected = shapely_distances(df_wells)
+    positions = np.arange(len(df_wells))
+    for position in [0, 5, 40]:
+        np.testing.assert_allclose(get_distances(store, position, positions), expected[position], atol=1e-2)
@@ -0,0 +1,43 @@
+import numpy as np
+import shapely
+
+from map_render import task_hash
+from mapping import draw_map
+
+
+def map_task(x, y, points):
+    """
+    Задание карты со слоем подписей и слоем скважин
+    :param x: координаты подписей по X
+    :param y: координаты подписей по Y
+    :param points: массив точек скважин
+    :return: задание карты
+    """
+    labels = np.array([f'{i}' for i in range(len(x))], dtype=object)
+    return {'layers': [{'kind': 'labels', 'x': x, 'y': y, 'label': labels, 'color': 'red', 'name': 'Подписи'},
+                       {'kind': 'wells', 'geometry': points, 'color': 'black', 'marker': 'o', 'name': 'Скважины'}],
+            'legend': 'optimize', 'title': 'Объект: БС10', 'path': 'output/pictures/map.png'}
+
+
+def test_task_hash_changes_with_one_element_of_large_layer():
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(0, 50000, 5000), rng.uniform(0, 50000, 5000)
+    points = shapely.points(x, y)
+    key = task_hash(draw_map, map_task(x, y, points))
+    assert task_hash(draw_map, map_task(x.copy(), y.copy(), points.copy())) == key
+
+    # подпись одной скважины смещена на 100 м
+    moved_x = x.copy()
+    moved_x[2500] += 100
+    assert task_hash(draw_map, map_task(moved_x, y, points)) != key
+
+    # точка одной скважины смещена на 100 м
+    moved_points = points.copy()
+    moved_points[2500] = shapely.points(x[2500] + 100, y[2500])
+    assert task_hash(draw_map, map_task(x, y, moved_points)) != key
+
+
+def test_task_hash_separates_nested_values():
+    assert task_hash(draw_map, {'layers': [[1], [2, 3]]}) != task_hash(draw_map, {'layers': [[1, 2], [3]]})
+    assert task_hash(draw_map, {'layers': ['1', '23']}) != task_hash(draw_map, {'layers': ['12', '3']})
+    assert task_hash(draw_map, {'title': 'a', 'path': 'a.png'}) == task_hash(draw_map, {'title': 'a', 'path': 'b.png'})
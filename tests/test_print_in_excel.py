@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from dictionaries import dict_constant
+from print_in_excel import get_report
+
+STATUSES = [('РАБ.', 'НЕФ'), ('ПЬЕЗ', 'НЕФ'), ('РАБ.', 'НАГ'), ('ОСТ.', 'НЕФ'), ('РАБ.', 'ГАЗ')]
+
+
+def report_by_loop(dict_result):
+    """
+    Отчет по сценариям циклом по словарю результатов, как до группировки в get_report
+    :return: DataFrame показателей (без переименования столбцов)
+    """
+    list_rows = []
+    for key, value in dict_result.items():
+        df = value[0]
+        if df.empty:
+            continue
+        row = {'contour_k': key,
+               'obj_count': len(set(df['workHorizon'].explode().unique())),
+               'mean_rad': df['mean_radius'].mean(),
+               'mean_time': df['research_time'].mean(),
+               'piez_count': len(df.loc[df.wellStatus.str.contains(dict_constant['PIEZ_STATUS'])]),
+               'inj_count': len(df.loc[df.workMarker.str.contains(dict_constant['INJ_MARKER']) &
+                                       df.wellStatus.str.contains(dict_constant['INJ_STATUS'])]),
+               'prod_count': len(df.loc[df.workMarker.str.contains(dict_constant['PROD_MARKER']) &
+                                        df.wellStatus.str.contains(dict_constant['PROD_STATUS'])])}
+        list_years = [df[df['year_of_survey'] == year] for year in [0, 1, 2]]
+        for year, df_year in enumerate(list_years):
+            row[f'well_quantity{year}'] = df_year.shape[0]
+        for year, df_year in enumerate(list_years):
+            row[f'research_wells{year}'] = len(set(df_year['intersection'].explode().unique()))
+        for year, df_year in enumerate(list_years):
+            row[f'oil_loss{year}'] = df_year.oil_loss.sum()
+        for year, df_year in enumerate(list_years):
+            row[f'injection_loss{year}'] = df_year.injection_loss.sum()
+        row['percent_of_default'] = 100 * df.default_count.sum() / df.obj_count.sum()
+        list_rows.append(row)
+    return pd.DataFrame(list_rows)
+
+
+def scenario_result(rng, count, years):
+    """
+    Результат сценария: скважины со статусами, годами исследования и пересечениями (массивы well_id
+    и текстовые отметки)
+    """
+    status = [STATUSES[i] for i in rng.integers(0, len(STATUSES), count)]
+    intersection = [rng.choice(50, rng.integers(1, 5), replace=False).astype(np.int32) for _ in range(count)]
+    intersection[0] = 'Не охвачены исследованием!!!'
+    return pd.DataFrame({'workHorizon': rng.choice(['БС10', 'БС11', 'ЮС1'], count),
+                         'mean_radius': rng.uniform(200, 400, count), 'research_time': rng.uniform(1, 100, count),
+                         'wellStatus': [x[0] for x in status], 'workMarker': [x[1] for x in status],
+                         'year_of_survey': rng.choice(years, count), 'intersection': intersection,
+                         'oil_loss': rng.uniform(0, 50, count), 'injection_loss': rng.uniform(0, 80, count),
+                         'default_count': rng.integers(0, 2, count), 'obj_count': np.ones(count, dtype=int)})
+
+
+def test_get_report_matches_loop():
+    rng = np.random.default_rng(3)
+    dict_result = {'Контур 1, R = 300, k = 1.0': [scenario_result(rng, 30, [0]), None, None],
+                   'Контур 1, R = 600, k = 2.0': [scenario_result(rng, 40, [0, 1, 2]), None, None],
+                   'Контур 2, R = 450, k = 1.5': [pd.DataFrame(), None, None],
+                   'out_contour, R = 900, k = 3.0': [scenario_result(rng, 25, [0, 2]), None, None]}
+    df_report = get_report(dict_result, **dict_constant)
+    df_expected = report_by_loop(dict_result)
+    df_expected.columns = df_report.columns
+    pd.testing.assert_frame_equal(df_report, df_expected, check_dtype=False)
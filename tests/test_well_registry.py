@@ -0,0 +1,28 @@
+import numpy as np
+
+from well_registry import from_csr, get_intersection_ids, join_well_names, to_csr, well_registry
+
+
+def test_csr_round_trip():
+    list_intersection = [np.array([3, 1], dtype=np.int32), [], np.array([], dtype=np.int32), [7], np.int32(5),
+                         np.arange(10, dtype=np.int32)]
+    indptr, indices = to_csr(list_intersection)
+    assert indptr.dtype == np.int64 and indices.dtype == np.int32
+    assert list(indptr) == [0, 2, 2, 2, 3, 4, 14]
+    rows = from_csr(indptr, indices)
+    assert len(rows) == len(list_intersection)
+    for row, ids in zip(rows, list_intersection):
+        assert list(row) == list(np.atleast_1d(ids))
+
+
+def test_csr_empty():
+    indptr, indices = to_csr([])
+    assert list(indptr) == [0] and len(indices) == 0
+    assert from_csr(indptr, indices) == []
+
+
+def test_intersection_ids_and_names(df_wells):
+    registry = well_registry(df_wells)
+    intersection = [np.array([4, 2], dtype=np.int32), 'Не охвачены исследованием!!!', 0, [2, 9], np.nan]
+    assert list(get_intersection_ids(intersection)) == [2, 4, 9]
+    assert [join_well_names(registry, x) for x in intersection[:2]] == ['W4 W2', 'Не охвачены исследованием!!!']
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+
+def register_wells(df_input):
+    """
+    Добавление в DataFrame исходных данных целочисленного идентификатора скважины (well_id, int32).
+    Пересечения скважин в расчете хранятся массивами well_id, имена восстанавливаются только при выгрузке
+    :param df_input: DataFrame исходных данных по скважинам
+    :return: DataFrame со столбцом well_id
+    """
+    df_input['well_id'] = pd.factorize(df_input['wellName'])[0].astype(np.int32)
+    return df_input
+
+
+def well_registry(df_wells):
+    """
+    Реестр скважин: массив имен, в котором позиция соответствует well_id
+    :param df_wells: DataFrame скважин со столбцами wellName и well_id
+    :return: массив имен скважин
+    """
+    ids = df_wells['well_id'].values
+    registry = np.empty(ids.max() + 1 if len(ids) else 0, dtype=object)
+    registry[ids] = df_wells['wellName'].values
+    return registry
+
+
+def get_well_names(registry, ids):
+    """
+    Перевод well_id в имена скважин
+    :param registry: реестр скважин (well_registry)
+    :param ids: массив well_id
+    :return: массив имен скважин
+    """
+    return registry[np.asarray(ids, dtype=np.int32)]
+
+
+def join_well_names(registry, intersection):
+    """
+    Строка имен скважин из столбца пересечений для выгрузки (текстовые отметки и пустые значения выгружаются
+    без изменений)
+    :param registry: реестр скважин (well_registry)
+    :param intersection: массив well_id или текстовая отметка
+    :return: имена скважин через пробел
+    """
+    if not isinstance(intersection, (np.ndarray, list)):
+        return intersection
+    return " ".join(str(name) for name in get_well_names(registry, np.atleast_1d(intersection)))
+
+
+def to_csr(list_intersection):
+    """
+    Упаковка списков пересечений в разреженный формат (CSR): смещения строк и общий массив well_id
+    :param list_intersection: списки/массивы well_id по каждой скважине
+    :return: массив смещений indptr (int64) и массив индексов indices (int32)
+    """
+    counts = np.fromiter((np.size(x) for x in list_intersection), dtype=np.int64, count=len(list_intersection))
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+    indices = np.concatenate([np.atleast_1d(np.asarray(x, dtype=np.int32)) for x in list_intersection] +
+                             [np.array([], dtype=np.int32)])
+    return indptr, indices
+
+
+def from_csr(indptr, indices):
+    """
+    Распаковка CSR в список массивов well_id по строкам (массивы - срезы общего массива indices без копирования)
+    :param indptr: массив смещений строк
+    :param indices: массив well_id
+    :return: список массивов well_id
+    """
+    return [indices[start:end] for start, end in zip(indptr[:-1], indptr[1:])]
+
+
+def get_intersection_ids(intersection):
+    """
+    Уникальные well_id из столбца пересечений (текстовые отметки и пустые значения пропускаются)
+    :param intersection: столбец пересечений результирующего DataFrame
+    :return: отсортированный массив well_id
+    """
+    list_ids = [x for x in intersection if isinstance(x, (np.ndarray, list))]
+    return np.unique(to_csr(list_ids)[1])
+
+
+def contour_members(df_in_contour, polygon):
+    """
+    Индекс скважин контура: well_id скважин, попавших в контур при отборе в main. Передается в словаре результатов,
+    чтобы выгрузка и карты не проверяли попадание скважин в контур повторно
+    :param df_in_contour: DataFrame скважин контура
+    :param polygon: контур, заданный пользователем (None - расчет вне контуров)
+    :return: отсортированный массив well_id или None, если контур не задан
+    """
+    if polygon is None:
+        return None
+    return np.sort(df_in_contour['well_id'].values.astype(np.int32))
+
+
+def select_contour(df_wells, contour_ids):
+    """
+    Отбор скважин контура по индексу скважин контура
+    :param df_wells: DataFrame скважин со столбцом well_id
+    :param contour_ids: индекс скважин контура (contour_members), None - все скважины
+    :return: DataFrame скважин контура
+    """
+    if contour_ids is None:
+        return df_wells
+    return df_wells[df_wells['well_id'].isin(contour_ids)]